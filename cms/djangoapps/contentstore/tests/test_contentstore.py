@@ -31,6 +31,7 @@ from xmodule.modulestore import Location, mongo
 from xmodule.modulestore.store_utilities import clone_course
 from xmodule.modulestore.store_utilities import delete_course
 from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.mongo.base import metadata_cache_key
 from xmodule.contentstore.django import contentstore, _CONTENTSTORE
 from xmodule.modulestore.xml_exporter import export_to_xml
 from xmodule.modulestore.xml_importer import import_from_xml, perform_xlint
@@ -1830,6 +1831,70 @@ class ContentStoreTest(ModuleStoreTestCase):
 
         self.assertEqual(timedelta(1), new_module.graceperiod)
 
+    def test_incremental_metadata_inheritance(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        cache = module_store.metadata_inheritance_cache_subsystem
+
+        chapter = module_store.get_item(Location(['i4x', 'edX', 'toy', 'chapter', 'Overview', None]))
+        sequential = module_store.get_item(chapter.children[0])
+        new_vertical_location = Location('i4x', 'edX', 'toy', 'vertical', 'new_vertical')
+
+        # none of these writes should recompute the whole tree
+        with mock.patch.object(module_store, '_get_inheritance_skeleton', side_effect=AssertionError):
+            chapter.xqa_key = 'chapter_xqa_key'
+            chapter.save()
+            module_store.update_metadata(chapter.location, own_metadata(chapter))
+
+            module_store.create_and_save_xmodule(new_vertical_location)
+            module_store.update_children(sequential.location, sequential.children + [new_vertical_location.url()])
+
+            tree = cache.get(metadata_cache_key(course_location))
+            self.assertEqual('chapter_xqa_key', tree[new_vertical_location.url()]['xqa_key'])
+            self.assertEqual('chapter_xqa_key', tree[sequential.location.url()]['xqa_key'])
+
+            module_store.update_children(chapter.location, chapter.children[1:])
+            tree = cache.get(metadata_cache_key(course_location))
+            self.assertNotIn(new_vertical_location.url(), tree)
+
+        self.assertEqual(module_store.compute_metadata_inheritance_tree(course_location), tree)
+
+    def test_racing_metadata_inheritance_updates(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        cache = module_store.metadata_inheritance_cache_subsystem
+
+        chapter = module_store.get_item(Location(['i4x', 'edX', 'toy', 'chapter', 'Overview', None]))
+        sequential = module_store.get_item(chapter.children[0])
+        module_store.get_cached_metadata_inheritance_tree(course_location)
+
+        # reading the tree from memcache mustn't write it back
+        if module_store.request_cache is not None:
+            module_store.request_cache.data.clear()
+        with mock.patch.object(cache, 'set', side_effect=AssertionError):
+            module_store.get_cached_metadata_inheritance_tree(course_location)
+
+        # a write to the sequential lands while the write to the chapter is patching the tree
+        patch_tree = module_store._patch_metadata_inheritance_tree
+
+        def racing_patch(location, tree, skeleton):
+            if location == chapter.location:
+                sequential.xqa_key = 'sequential_xqa_key'
+                sequential.save()
+                module_store.update_metadata(sequential.location, own_metadata(sequential))
+            patch_tree(location, tree, skeleton)
+
+        with mock.patch.object(module_store, '_patch_metadata_inheritance_tree', side_effect=racing_patch):
+            chapter.xqa_key = 'chapter_xqa_key'
+            chapter.save()
+            module_store.update_metadata(chapter.location, own_metadata(chapter))
+
+        tree = cache.get(metadata_cache_key(course_location))
+        self.assertEqual('sequential_xqa_key', tree[sequential.children[0]]['xqa_key'])
+        self.assertEqual(module_store.compute_metadata_inheritance_tree(course_location), tree)
+
     def test_default_metadata_inheritance(self):
         course = CourseFactory.create()
         vertical = ItemFactory.create(parent_location=course.location)
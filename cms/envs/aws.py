@@ -137,6 +137,8 @@ TECH_SUPPORT_EMAIL = ENV_TOKENS.get('TECH_SUPPORT_EMAIL', TECH_SUPPORT_EMAIL)
 
 COURSES_WITH_UNSAFE_CODE = ENV_TOKENS.get("COURSES_WITH_UNSAFE_CODE", [])
 
+STATIC_CONTENT_CACHE_MAX_AGE = ENV_TOKENS.get('STATIC_CONTENT_CACHE_MAX_AGE', STATIC_CONTENT_CACHE_MAX_AGE)
+
 #Timezone overrides
 TIME_ZONE = ENV_TOKENS.get('TIME_ZONE', TIME_ZONE)
 
@@ -172,6 +172,10 @@ MIDDLEWARE_CLASSES = (
     'ratelimitbackend.middleware.RateLimitMiddleware',
 )
 
+# The max-age, in seconds, of the Cache-Control header which contentserver sends w/ unlocked
+# course assets. None sends no Cache-Control header (locked assets are always private).
+STATIC_CONTENT_CACHE_MAX_AGE = None
+
 ############# XBlock Configuration ##########
 
 # This should be moved into an XBlock Runtime/Application object
@@ -1,5 +1,10 @@
+import calendar
+import re
+
+from django.conf import settings
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.contentstore.django import contentstore
@@ -8,6 +13,35 @@ from xmodule.modulestore import InvalidLocationError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
 
+# a single byte range: bytes=first-last, bytes=first- or bytes=-suffix_length
+BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(header, length):
+    """
+    Return the (first_byte, last_byte) inclusive range which the Range header asks for
+    within content of the given length. Returns None if the header should be ignored (it's malformed
+    or asks for more than one range, in which case the whole content is sent). Raises ValueError if the
+    range can't be satisfied.
+    """
+    match = BYTE_RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # the last N bytes
+        suffix_length = int(last)
+        if suffix_length == 0:
+            raise ValueError(header)
+        return max(length - suffix_length, 0), length - 1
+    first_byte = int(first)
+    last_byte = min(int(last), length - 1) if last else length - 1
+    if first_byte >= length or first_byte > last_byte:
+        raise ValueError(header)
+    return first_byte, last_byte
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -52,18 +86,82 @@ class StaticContentServer(object):
                         request.user, course_partial_id):
                     return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_at_str = http_date(last_modified_at)
+            # older cached content won't have a digest
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{}"'.format(content_digest) if content_digest else None
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            if self.is_not_modified(request, etag, last_modified_at):
+                response = HttpResponseNotModified()
+                self.set_caching_headers(response, content, etag, last_modified_at_str)
+                return response
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
-            response['Last-Modified'] = last_modified_at_str
+            byte_range = None
+            if 'HTTP_RANGE' in request.META and content.length is not None and \
+                    self.range_is_current(request, etag, last_modified_at):
+                try:
+                    byte_range = parse_byte_range(request.META['HTTP_RANGE'], content.length)
+                except ValueError:
+                    response = HttpResponse(status=416)
+                    response['Content-Range'] = 'bytes */{}'.format(content.length)
+                    return response
 
+            if byte_range is not None:
+                first_byte, last_byte = byte_range
+                response = HttpResponse(
+                    content.stream_data_in_range(first_byte, last_byte), content_type=content.content_type, status=206
+                )
+                response['Content-Range'] = 'bytes {}-{}/{}'.format(first_byte, last_byte, content.length)
+                response['Content-Length'] = str(last_byte - first_byte + 1)
+            else:
+                response = HttpResponse(content.stream_data(), content_type=content.content_type)
+                if content.length is not None:
+                    response['Content-Length'] = str(content.length)
+
+            response['Accept-Ranges'] = 'bytes'
+            self.set_caching_headers(response, content, etag, last_modified_at_str)
             return response
+
+    @staticmethod
+    def is_not_modified(request, etag, last_modified_at):
+        """
+        Whether the client's cached copy (per If-None-Match or, if that's absent, If-Modified-Since) is current
+        """
+        if 'HTTP_IF_NONE_MATCH' in request.META:
+            if etag is None:
+                return False
+            client_etags = [tag.strip() for tag in request.META['HTTP_IF_NONE_MATCH'].split(',')]
+            return '*' in client_etags or etag in client_etags
+
+        if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            if_modified_since = parse_http_date_safe(request.META['HTTP_IF_MODIFIED_SINCE'])
+            return if_modified_since is not None and last_modified_at <= if_modified_since
+
+        return False
+
+    @staticmethod
+    def range_is_current(request, etag, last_modified_at):
+        """
+        Whether the client's If-Range (if any) still matches the content, in which case it may be sent a range
+        """
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range is None:
+            return True
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return etag is not None and if_range == etag
+        return parse_http_date_safe(if_range) == last_modified_at
+
+    @staticmethod
+    def set_caching_headers(response, content, etag, last_modified_at_str):
+        """
+        Set the headers which let clients (and, for unlocked content, shared caches) cache the content
+        """
+        response['Last-Modified'] = last_modified_at_str
+        if etag is not None:
+            response['ETag'] = etag
+        if getattr(content, "locked", False):
+            # only enrolled users may see this; so, shared caches must not keep it
+            response['Cache-Control'] = 'private'
+        elif settings.STATIC_CONTENT_CACHE_MAX_AGE is not None:
+            response['Cache-Control'] = 'public, max-age={}'.format(settings.STATIC_CONTENT_CACHE_MAX_AGE)
@@ -134,3 +134,56 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
 
+
+    def test_range_request(self):
+        """
+        Test that a byte range of an asset is served as partial content.
+        """
+        full = self.client.get(self.url_unlocked).content  # pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206)  # pylint: disable=E1103
+        self.assertEqual(resp.content, full[10:20])  # pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{0}'.format(len(full)))
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-5')
+        self.assertEqual(resp.status_code, 206)  # pylint: disable=E1103
+        self.assertEqual(resp.content, full[-5:])  # pylint: disable=E1103
+
+    def test_unsatisfiable_range_request(self):
+        """
+        Test that a range starting past the end of the asset is refused.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416)  # pylint: disable=E1103
+
+    def test_etag(self):
+        """
+        Test that the asset's ETag lets clients revalidate their cached copy.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertIn('ETag', resp)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)  # pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"not-the-md5"')
+        self.assertEqual(resp.status_code, 200)  # pylint: disable=E1103
+
+    def test_if_modified_since(self):
+        """
+        Test that If-Modified-Since is compared as a date rather than a string.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 304)  # pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 1970 00:00:00 GMT')
+        self.assertEqual(resp.status_code, 200)  # pylint: disable=E1103
+
+    @override_settings(STATIC_CONTENT_CACHE_MAX_AGE=3600)
+    def test_cache_control(self):
+        """
+        Test that unlocked assets are publicly cacheable and locked ones are private.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['Cache-Control'], 'public, max-age=3600')
+
+        self.client.login(username=self.staff_usr, password=self.staff_pwd)
+        resp = self.client.get(self.url_locked)
+        self.assertEqual(resp['Cache-Control'], 'private')
@@ -78,6 +78,34 @@ class CourseMode(models.Model):
         """
         return {mode.slug: mode for mode in cls.modes_for_course(course_id)}
 
+    @classmethod
+    def modes_for_courses_dict(cls, course_ids):
+        """
+        Returns the non-expired modes for each of the given course ids, as a
+        dictionary of course id to a dictionary with the mode slug as the key,
+        fetching all of them with a single query.
+
+        Courses with no modes set in the table get the default mode
+        """
+        now = datetime.now(pytz.UTC)
+        found_course_modes = cls.objects.filter(Q(course_id__in=course_ids) &
+                                                (Q(expiration_datetime__isnull=True) |
+                                                Q(expiration_datetime__gte=now)))
+        modes = {course_id: {} for course_id in course_ids}
+        for mode in found_course_modes:
+            modes[mode.course_id][mode.mode_slug] = Mode(
+                mode.mode_slug,
+                mode.mode_display_name,
+                mode.min_price,
+                mode.suggested_prices,
+                mode.currency,
+                mode.expiration_datetime
+            )
+        for course_modes in modes.values():
+            if not course_modes:
+                course_modes[cls.DEFAULT_MODE.slug] = cls.DEFAULT_MODE
+        return modes
+
     @classmethod
     def mode_for_course(cls, course_id, mode_slug):
         """
@@ -112,3 +112,17 @@ class CourseModeModelTest(TestCase):
 
         modes = CourseMode.modes_for_course('second_test_course')
         self.assertEqual([CourseMode.DEFAULT_MODE], modes)
+
+    def test_modes_for_courses_dict(self):
+        expired_mode, _status = self.create_mode('verified', 'Verified Certificate')
+        expired_mode.expiration_datetime = datetime.now(pytz.UTC) + timedelta(days=-1)
+        expired_mode.save()
+        mode = Mode(u'honor', u'Honor Code Certificate', 0, '', 'usd', None)
+        self.create_mode(mode.slug, mode.name, mode.min_price, mode.suggested_prices)
+
+        modes = CourseMode.modes_for_courses_dict([self.course_id, 'second_test_course'])
+        self.assertEqual(modes, {
+            self.course_id: {u'honor': mode},
+            'second_test_course': {CourseMode.DEFAULT_MODE_SLUG: CourseMode.DEFAULT_MODE},
+        })
+        self.assertEqual(modes[self.course_id], CourseMode.modes_for_course_dict(self.course_id))
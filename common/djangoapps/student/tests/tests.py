@@ -30,7 +30,7 @@ from textwrap import dedent
 
 from student.models import anonymous_id_for_user, user_by_anonymous_id, CourseEnrollment, unique_id_for_user
 from student.views import (process_survey_link, _cert_info, password_reset, password_reset_confirm_wrapper,
-                           change_enrollment, complete_course_mode_info)
+                           change_enrollment, complete_course_mode_info, get_course_enrollment_pairs)
 from student.tests.factories import UserFactory, CourseModeFactory
 from student.tests.test_email import mock_render_to_string
 
@@ -284,6 +284,17 @@ class DashboardTest(TestCase):
         verified_mode.save()
         self.assertFalse(enrollment.refundable())
 
+    def test_course_enrollment_pairs(self):
+        other_course = CourseFactory.create(org=self.COURSE_ORG, display_name="other_course", number="200")
+        CourseEnrollment.enroll(self.user, self.course.id)
+        CourseEnrollment.enroll(self.user, other_course.id)
+        CourseEnrollment.enroll(self.user, 'EDX/999/missing_course')
+
+        pairs = get_course_enrollment_pairs(self.user)
+        self.assertEqual(
+            sorted((course.id, enrollment.course_id) for course, enrollment in pairs),
+            sorted([(self.course.id, self.course.id), (other_course.id, other_course.id)])
+        )
 
 
 class EnrollInCourseTest(TestCase):
@@ -46,7 +46,9 @@ from student.models import (
 from student.forms import PasswordResetFormNoActive
 
 from verify_student.models import SoftwareSecurePhotoVerification
-from certificates.models import CertificateStatuses, certificate_status_for_student
+from certificates.models import (
+    CertificateStatuses, certificate_status_for_student, certificate_statuses_for_student
+)
 
 from xmodule.course_module import CourseDescriptor
 from xmodule.modulestore.exceptions import ItemNotFoundError
@@ -156,10 +158,12 @@ def process_survey_link(survey_link, user):
     return survey_link.format(UNIQUE_ID=unique_id_for_user(user))
 
 
-def cert_info(user, course):
+def cert_info(user, course, cert_status=None):
     """
     Get the certificate info needed to render the dashboard section for the given
-    student and course.  Returns a dictionary with keys:
+    student and course.  If the student's certificate_status_for_student dictionary
+    for the course has already been fetched, it can be passed as cert_status.
+    Returns a dictionary with keys:
 
     'status': one of 'generating', 'ready', 'notpassing', 'processing', 'restricted'
     'show_download_url': bool
@@ -172,7 +176,9 @@ def cert_info(user, course):
     if not course.has_ended():
         return {}
 
-    return _cert_info(user, course, certificate_status_for_student(user, course.id))
+    if cert_status is None:
+        cert_status = certificate_status_for_student(user, course.id)
+    return _cert_info(user, course, cert_status)
 
 
 def _cert_info(user, course, cert_status):
@@ -269,16 +275,18 @@ def register_user(request, extra_context=None):
     return render_to_response('register.html', context)
 
 
-def complete_course_mode_info(course_id, enrollment):
+def complete_course_mode_info(course_id, enrollment, modes=None):
     """
     We would like to compute some more information from the given course modes
-    and the user's current enrollment
+    and the user's current enrollment.  If the course's modes have already been
+    fetched, they can be passed as modes.
 
     Returns the given information:
         - whether to show the course upsell information
         - numbers of days until they can't upsell anymore
     """
-    modes = CourseMode.modes_for_course_dict(course_id)
+    if modes is None:
+        modes = CourseMode.modes_for_course_dict(course_id)
     mode_info = {'show_upsell': False, 'days_for_upsell': None}
     # we want to know if the user is already verified and if verified is an
     # option
@@ -292,21 +300,43 @@ def complete_course_mode_info(course_id, enrollment):
     return mode_info
 
 
-@login_required
-@ensure_csrf_cookie
-def dashboard(request):
-    user = request.user
+def get_course_enrollment_pairs(user):
+    """
+    Build our (course, enrollment) list for the user, but ignore any courses that no
+    longer exist (because the course IDs have changed). Still, we don't delete those
+    enrollments, because it could have been a data push snafu.
+
+    The courses are loaded from the modulestore all at once when it supports that.
+    """
+    enrollments = list(CourseEnrollment.enrollments_for_user(user))
+    store = modulestore()
+    courses = None
+    if hasattr(store, 'get_courses_by_id'):
+        courses = store.get_courses_by_id([enrollment.course_id for enrollment in enrollments])
 
-    # Build our (course, enrollment) list for the user, but ignore any courses that no
-    # longer exist (because the course IDs have changed). Still, we don't delete those
-    # enrollments, because it could have been a data push snafu.
     course_enrollment_pairs = []
-    for enrollment in CourseEnrollment.enrollments_for_user(user):
+    for enrollment in enrollments:
         try:
-            course_enrollment_pairs.append((course_from_id(enrollment.course_id), enrollment))
+            if courses is None:
+                course = course_from_id(enrollment.course_id)
+            elif enrollment.course_id in courses:
+                course = courses[enrollment.course_id]
+            else:
+                raise ItemNotFoundError(enrollment.course_id)
+            course_enrollment_pairs.append((course, enrollment))
         except ItemNotFoundError:
             log.error("User {0} enrolled in non-existent course {1}"
                       .format(user.username, enrollment.course_id))
+    return course_enrollment_pairs
+
+
+@login_required
+@ensure_csrf_cookie
+def dashboard(request):
+    user = request.user
+
+    course_enrollment_pairs = get_course_enrollment_pairs(user)
+    course_ids = [course.id for course, _enrollment in course_enrollment_pairs]
 
     course_optouts = Optout.objects.filter(user=user).values_list('course_id', flat=True)
 
@@ -325,23 +355,32 @@ def dashboard(request):
     show_courseware_links_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
                                           if has_access(request.user, course, 'load'))
 
-    course_modes = {course.id: complete_course_mode_info(course.id, enrollment) for course, enrollment in course_enrollment_pairs}
-    cert_statuses = {course.id: cert_info(request.user, course) for course, _enrollment in course_enrollment_pairs}
+    # Fetch the modes and certificates of all of the courses at once
+    modes_by_course = CourseMode.modes_for_courses_dict(course_ids)
+    course_modes = {
+        course.id: complete_course_mode_info(course.id, enrollment, modes_by_course[course.id])
+        for course, enrollment in course_enrollment_pairs
+    }
+    cert_status_by_course = certificate_statuses_for_student(user, course_ids)
+    cert_statuses = {
+        course.id: cert_info(request.user, course, cert_status_by_course[course.id])
+        for course, _enrollment in course_enrollment_pairs
+    }
 
     # only show email settings for Mongo course and when bulk email is turned on
-    show_email_settings_for = frozenset(
-        course.id for course, _enrollment in course_enrollment_pairs if (
-            settings.FEATURES['ENABLE_INSTRUCTOR_EMAIL'] and
-            modulestore().get_modulestore_type(course.id) == MONGO_MODULESTORE_TYPE and
-            CourseAuthorization.instructor_email_enabled(course.id)
+    show_email_settings_for = frozenset()
+    if settings.FEATURES['ENABLE_INSTRUCTOR_EMAIL']:
+        show_email_settings_for = frozenset(
+            course_id for course_id in CourseAuthorization.instructor_email_enabled_for(course_ids)
+            if modulestore().get_modulestore_type(course_id) == MONGO_MODULESTORE_TYPE
         )
-    )
 
     # Verification Attempts
     verification_status, verification_msg = SoftwareSecurePhotoVerification.user_status(user)
 
-    show_refund_option_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
-                                       if _enrollment.refundable())
+    # Equivalent to CourseEnrollment.refundable, using the modes fetched above
+    show_refund_option_for = frozenset(course_id for course_id in course_ids
+                                       if 'verified' in modes_by_course[course_id])
 
     # get info w.r.t ExternalAuthMap
     external_auth_map = None
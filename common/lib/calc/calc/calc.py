@@ -7,10 +7,13 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
 import numpy
 import scipy.constants
 import functions
 
+from collections import OrderedDict
+
 from pyparsing import (
     Word, Literal, CaselessLiteral, ZeroOrMore, MatchFirst, Optional, Forward,
     Group, ParseResults, stringEnd, Suppress, Combine, alphas, nums, alphanums
@@ -73,6 +76,10 @@ SUFFIXES = {
 }
 
 
+# How many compiled expressions `compile_expression` keeps around.
+COMPILED_EXPRESSION_CACHE_SIZE = 1000
+
+
 class UndefinedVariable(Exception):
     """
     Indicate when a student inputs a variable which was not expected.
@@ -224,38 +231,230 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+_compiled_expressions = OrderedDict()
+_compiled_expressions_lock = threading.Lock()
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
-
-    return math_interpreter.reduce_tree(evaluate_actions)
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return a `CompiledExpression` for `math_expr`.
+
+    The most recently used expressions are kept, so an expression that is
+    evaluated over and over (e.g. an instructor's answer) is only parsed once.
+    """
+    key = (math_expr, case_sensitive)
+    with _compiled_expressions_lock:
+        compiled = _compiled_expressions.pop(key, None)
+        if compiled is not None:
+            # Re-insert it to mark it as the most recently used.
+            _compiled_expressions[key] = compiled
+            return compiled
+
+    compiled = CompiledExpression(math_expr, case_sensitive)
+    with _compiled_expressions_lock:
+        _compiled_expressions[key] = compiled
+        while len(_compiled_expressions) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _compiled_expressions.popitem(last=False)
+    return compiled
+
+
+class CompiledExpression(object):
+    """
+    A math expression parsed once, which can then be evaluated many times.
+
+    The parse tree is turned into nested Python functions of
+    `(all_variables, all_functions)`, so evaluating doesn't touch pyparsing.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+
+        # No need to go further.
+        if math_expr.strip() == "":
+            self.variables_used = set()
+            self.functions_used = set()
+            self._evaluate = lambda variables, functions: float('nan')
+            return
+
+        # Parse the tree.
+        math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        math_interpreter.parse_algebra()
+        self._math_interpreter = math_interpreter
+        self.variables_used = math_interpreter.variables_used
+        self.functions_used = math_interpreter.functions_used
+
+        if case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+
+        compile_actions = {
+            'number': compile_number,
+            'variable': lambda x: compile_variable(casify(x[0])),
+            'function': lambda x: compile_function(casify(x[0]), x[1]),
+            'atom': compile_atom,
+            'power': compile_power,
+            'parallel': compile_parallel,
+            'product': compile_product,
+            'sum': compile_sum
+        }
+        self._evaluate = math_interpreter.reduce_tree(compile_actions)
+
+    def _prepare(self, variables, functions):
+        """
+        Add the defaults to `variables` and `functions`, and check that they
+        define everything the expression uses.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        if self.variables_used or self.functions_used:
+            self._math_interpreter.check_variables(all_variables, all_functions)
+        return all_variables, all_functions
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions, as
+        `evaluator` does.
+        """
+        all_variables, all_functions = self._prepare(variables, functions)
+        return self._evaluate(all_variables, all_functions)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Evaluate the expression once per dictionary of variables in `samples`,
+        and return the list of results.
+
+        Every sample must define the same variables. They are first evaluated
+        together, as NumPy arrays, in one pass. If that fails in any way (e.g. a
+        function that only takes scalars, or a sample that divides by zero), each
+        sample is evaluated on its own instead, so results and errors are the
+        same as calling `evaluate` for each sample.
+        """
+        if not samples:
+            return []
+
+        arrays = dict(
+            (name, numpy.array([sample[name] for sample in samples]))
+            for name in samples[0]
+        )
+        all_variables, all_functions = self._prepare(arrays, functions)
+
+        try:
+            with numpy.errstate(all='raise'):
+                result = self._evaluate(all_variables, all_functions)
+            shape = numpy.shape(result)
+        except Exception:  # pylint: disable=broad-except
+            shape = None
+
+        if shape == ():
+            # The expression doesn't depend on the sampled variables.
+            return [result] * len(samples)
+        if shape == (len(samples),):
+            return list(result)
+        return [self.evaluate(sample, functions) for sample in samples]
+
+
+# The following functions build the functions that `CompiledExpression`
+# evaluates. Like the evaluation actions above, each one is run on the list of
+# results from a parse component, but those results are strings and compiled
+# functions of `(all_variables, all_functions)`.
+
+def compile_number(parse_result):
+    """
+    Numbers are constants, so work them out right away.
+    """
+    value = eval_number(parse_result)
+    return lambda variables, functions: value
+
+
+def compile_variable(name):
+    """
+    Look up the variable `name` (already casified).
+    """
+    return lambda variables, functions: variables[name]
+
+
+def compile_function(name, argument):
+    """
+    Apply the function `name` (already casified) to its compiled argument.
+    """
+    return lambda variables, functions: functions[name](argument(variables, functions))
+
+
+def compile_atom(parse_result):
+    """
+    Return the compiled function wrapped by the atom, ignoring parenthesis.
+    """
+    return next(k for k in parse_result if callable(k))
+
+
+def compile_power(parse_result):
+    """
+    Exponentiate, as `eval_power` does.
+    """
+    operands = [k for k in parse_result if callable(k)]  # Ignore the '^' marks.
+    if len(operands) == 1:
+        return operands[0]
+    # Unlike `eval_power`, don't filter the values on numbers.Number, since
+    # they may be NumPy arrays.
+    return lambda variables, functions: reduce(
+        lambda a, b: b ** a,
+        reversed([k(variables, functions) for k in operands])
+    )
+
+
+def compile_parallel(parse_result):
+    """
+    Apply the parallel resistors operator, as `eval_parallel` does.
+    """
+    operands = [k for k in parse_result if callable(k)]  # Ignore the '||' marks.
+    if len(operands) == 1:
+        return operands[0]
+    return lambda variables, functions: eval_parallel([k(variables, functions) for k in operands])
+
+
+def compile_operations(parse_result, operations, initial):
+    """
+    Turn a list like [ a, '+', b, '-', c ] into a function that folds the
+    operands onto `initial` with the operators in `operations`.
+    """
+    steps = []
+    current_op = operations[None]
+    for token in parse_result:
+        if callable(token):
+            steps.append((current_op, token))
+        else:
+            current_op = operations[token]
+
+    def evaluate(variables, functions):
+        """
+        Fold the operands.
+        """
+        total = initial
+        for op, operand in steps:
+            total = op(total, operand(variables, functions))
+        return total
+    return evaluate
+
+
+def compile_sum(parse_result):
+    """
+    Add the operands, as `eval_sum` does.
+    """
+    return compile_operations(
+        parse_result, {None: operator.add, '+': operator.add, '-': operator.sub}, 0.0
+    )
+
+
+def compile_product(parse_result):
+    """
+    Multiply the operands, as `eval_product` does.
+    """
+    return compile_operations(
+        parse_result, {None: operator.mul, '*': operator.mul, '/': operator.truediv}, 1.0
+    )
 
 
 class ParseAugmenter(object):
@@ -558,3 +558,41 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and CompiledExpression
+    """
+
+    def test_compiled_expressions_are_cached(self):
+        """
+        The same expression should only be parsed once
+        """
+        compiled = calc.compile_expression('x^2 + 1')
+        self.assertIs(compiled, calc.compile_expression('x^2 + 1'))
+        self.assertIsNot(compiled, calc.compile_expression('x^2 + 1', case_sensitive=True))
+
+    def test_evaluate_samples_matches_evaluator(self):
+        """
+        Evaluating all of the samples together should give the same results as
+        evaluating each one on its own
+        """
+        samples = [{'x': x, 'y': y} for x, y in [(1.0, 2.0), (-3.5, 0.25), (4.0, -1.0)]]
+        for expression in ['x^2 + 3*y', 'sin(x)/y - e^x', '2^x^2', '5', 'x || y', 'fact(3)*x']:
+            compiled = calc.compile_expression(expression)
+            expected = [calc.evaluator(sample, {}, expression) for sample in samples]
+            for result, value in zip(compiled.evaluate_samples(samples, {}), expected):
+                self.assertAlmostEqual(result, value)
+
+    def test_evaluate_samples_errors(self):
+        """
+        A sample that fails should raise the same error `evaluator` does
+        """
+        samples = [{'x': 3.0}, {'x': -1.5}]
+        with self.assertRaisesRegexp(ValueError, 'factorial'):
+            calc.compile_expression('fact(x)').evaluate_samples(samples, {})
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.compile_expression('x + y').evaluate_samples(samples, {})
+        with self.assertRaises(ZeroDivisionError):
+            calc.compile_expression('1/(x-3)').evaluate_samples(samples, {})
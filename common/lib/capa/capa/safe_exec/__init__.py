@@ -1,3 +1,4 @@
 """Capa's specialized use of codejail.safe_exec."""
 
 from .safe_exec import safe_exec, update_hash
+from .worker_pool import configure as configure_worker_pool
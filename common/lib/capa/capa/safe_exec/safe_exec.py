@@ -4,6 +4,7 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import worker_pool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -113,9 +114,13 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
+    # Decide which code executor to use.  Warm sandbox workers can't be handed
+    # the files on a python_path, so that needs a fresh jail.
+    pool = worker_pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None and not python_path:
+        exec_fn = pool.safe_exec
     else:
         exec_fn = codejail_safe_exec
 
@@ -4,12 +4,17 @@ import hashlib
 import os
 import os.path
 import random
+import subprocess
+import sys
 import textwrap
+import threading
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
 from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec.worker_pool import SandboxWorkerPool
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -72,6 +77,90 @@ class TestSafeExec(unittest.TestCase):
         self.assertIn("ZeroDivisionError", cm.exception.message)
 
 
+class TestWorkerPool(unittest.TestCase):
+    """
+    Test the warm sandbox workers.  They run an unsandboxed Python here, since
+    the pool works the same either way.
+    """
+    def setUp(self):
+        self.pool = SandboxWorkerPool(1, max_jobs=2, cmdline=[sys.executable, '-E', '-B'])
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'b': 5}
+        self.pool.safe_exec("a = b + 12", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_raising_exceptions(self):
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_jobs_are_isolated(self):
+        g = {}
+        self.pool.safe_exec("import sys; sys.leftover = 1", g)
+        self.pool.safe_exec("import sys; a = hasattr(sys, 'leftover')", g)
+        self.assertFalse(g['a'])
+
+    def test_workers_are_recycled(self):
+        pids = []
+        for _ in xrange(3):
+            g = {}
+            # Jobs run in a child of the worker.
+            self.pool.safe_exec("import os; worker = os.getppid()", g)
+            pids.append(g['worker'])
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+    def test_jobs_get_their_own_directory(self):
+        g = {}
+        self.pool.safe_exec("import os; os.mkdir('inside'); os.mkdir('../outside'); first = os.getcwd()", g)
+        self.pool.safe_exec("import os; second = os.getcwd(); seen = os.listdir('.') + os.listdir('..')", g)
+        self.assertNotEqual(g['first'], g['second'])
+        self.assertEqual(g['seen'], [os.path.basename(g['second'])])
+
+    def test_waiting_caller_starts_replacement_worker(self):
+        # The pool is full, so another caller has to wait...
+        worker = self.pool._checkout()
+        g = {}
+        waiter = threading.Thread(target=self.pool.safe_exec, args=("a = 1", g))
+        waiter.start()
+        waiter.join(0.5)
+        self.assertTrue(waiter.is_alive())
+
+        # ...until the worker is retired, which lets it start a new one
+        self.pool._retire(worker)
+        waiter.join(30)
+        self.assertFalse(waiter.is_alive())
+        self.assertEqual(g['a'], 1)
+
+    def test_real_time_limit_is_enforced_by_the_worker(self):
+        worker = self.pool._checkout()
+        self.pool._checkin(worker)
+        code = textwrap.dedent("""\
+            import signal, time
+            signal.alarm(0)
+            time.sleep(30)
+            """)
+        with patch.dict('capa.safe_exec.worker_pool.LIMITS', {'REALTIME': 1, 'CPU': 1}):
+            with self.assertRaises(SafeExecException) as cm:
+                self.pool.safe_exec(code, {})
+        self.assertIn("real time limit", cm.exception.message)
+
+        # the job's child was killed and reaped, and the worker is still usable
+        ps = subprocess.Popen(['ps', '-o', 'pid=', '--ppid', str(worker.process.pid)], stdout=subprocess.PIPE)
+        self.assertEqual(ps.communicate()[0].strip(), '')
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+        # retiring the worker kills its whole process group
+        self.pool.close()
+        with self.assertRaises(OSError):
+            os.killpg(worker.process.pid, 0)
+
+
 class TestSafeOrNot(unittest.TestCase):
     def test_cant_do_something_forbidden(self):
         # Can't test for forbiddenness if CodeJail isn't configured for python.
@@ -0,0 +1,455 @@
+"""
+A pool of warm sandbox workers for capa's safe_exec.
+
+Launching a fresh CodeJail process for every execution means paying for
+Python startup, and for importing numpy and friends, every time.  Instead,
+each worker here is a long-lived Python process, started with the same
+sandboxed command line CodeJail uses, that imports the modules capa code
+expects once and then waits for jobs on its stdin.
+
+A worker never runs submitted code itself.  For each job it forks a child,
+which applies the CodeJail resource limits (plus no files and no
+subprocesses), runs the code, reports the resulting globals, and exits.  So
+every job starts from the same pristine, pre-imported state and nothing one
+job does can be seen by the next: each job works in a scratch directory of
+its own, and the worker's directory is emptied after every job.  The worker
+kills a child that outlives the real time limit, since the code it runs
+could turn off its own alarm.
+
+Each worker runs in its own session, and its whole process group is killed
+when it is replaced: after `max_jobs` jobs, or as soon as anything goes
+wrong with it.
+"""
+
+import json
+import logging
+import os
+import select
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import resource
+import signal
+
+from codejail.jail_code import COMMANDS, LIMITS, is_configured
+from codejail.safe_exec import SafeExecException, json_safe
+
+log = logging.getLogger(__name__)
+
+# Modules the workers import up front, so that capa's lazy imports are free.
+PRELOAD_MODULES = [
+    "numpy", "math", "scipy", "calc", "eia",
+    "chem.chemcalc", "chem.chemtools", "chem.miller", "verifiers.draganddrop",
+]
+
+# Seconds a job may take, on top of its CPU and real time limits, before the
+# worker running it is considered stuck.
+JOB_TIMEOUT_SLACK = 5
+
+# The program each worker runs.  Messages in both directions are JSON,
+# preceded by their length as a 4-byte big-endian integer.
+WORKER_SOURCE = r'''
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+MAX_OUTPUT = 64 * 1024
+WORKDIR = os.getcwd()
+
+for modname in PRELOAD_MODULES:
+    try:
+        __import__(modname)
+    except Exception:
+        pass
+
+
+def read_exactly(fd, size):
+    data = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        data.append(chunk)
+        size -= len(chunk)
+    return "".join(data)
+
+
+def write_all(fd, data):
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def drain(result_r, output_r, deadline):
+    chunks = {result_r: [], output_r: []}
+    open_fds = [result_r, output_r]
+    while open_fds:
+        timeout = None if deadline is None else max(deadline - time.time(), 0)
+        readable, _, _ = select.select(open_fds, [], [], timeout)
+        if not readable:
+            break
+        for fd in readable:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                open_fds.remove(fd)
+                os.close(fd)
+            elif fd == result_r or sum(len(c) for c in chunks[fd]) < MAX_OUTPUT:
+                chunks[fd].append(chunk)
+    for fd in open_fds:
+        os.close(fd)
+    return "".join(chunks[result_r]), "".join(chunks[output_r])[:MAX_OUTPUT]
+
+
+def wait_child(pid, deadline):
+    # Returns the child's exit status, and whether it had to be killed.  The
+    # child's alarm can be turned off by the code it runs, so the real time
+    # limit is enforced from here.
+    if deadline is not None:
+        while time.time() < deadline:
+            waited, status = os.waitpid(pid, os.WNOHANG)
+            if waited:
+                return status, False
+            time.sleep(0.01)
+        os.kill(pid, signal.SIGKILL)
+        return os.waitpid(pid, 0)[1], True
+    return os.waitpid(pid, 0)[1], False
+
+
+def clean_workdir():
+    # Remove everything the last job left in the worker's directory: its
+    # scratch directory, and anything it made outside of it.
+    for name in os.listdir(WORKDIR):
+        path = os.path.join(WORKDIR, name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def run_child(job, scratch, result_w, output_w):
+    # Drop the protocol pipes, and send anything the code prints to output_w.
+    os.close(0)
+    os.chdir(scratch)
+    os.dup2(output_w, 1)
+    os.dup2(output_w, 2)
+
+    limits = job["limits"]
+    if limits.get("CPU"):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits["CPU"], limits["CPU"]))
+    if limits.get("VMEM"):
+        resource.setrlimit(resource.RLIMIT_AS, (limits["VMEM"], limits["VMEM"]))
+    if limits.get("REALTIME"):
+        signal.alarm(limits["REALTIME"])
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+    g_dict = job["globals"]
+    exec job["code"] in g_dict
+
+    ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+    ok_dict = {}
+    for key, value in g_dict.iteritems():
+        if key.startswith("__") or not isinstance(value, ok_types):
+            continue
+        try:
+            json.dumps(value)
+        except Exception:
+            continue
+        ok_dict[key] = value
+    write_all(result_w, json.dumps(ok_dict))
+
+
+def run_job(job):
+    realtime = job["limits"].get("REALTIME")
+    deadline = time.time() + realtime if realtime else None
+    result_r, result_w = os.pipe()
+    output_r, output_w = os.pipe()
+    # Each job gets a scratch directory of its own to work in
+    scratch = tempfile.mkdtemp(dir=WORKDIR)
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            os.close(result_r)
+            os.close(output_r)
+            run_child(job, scratch, result_w, output_w)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+    os.close(result_w)
+    os.close(output_w)
+    result, output = drain(result_r, output_r, deadline)
+    status, killed = wait_child(pid, deadline)
+    clean_workdir()
+    if killed:
+        return {"error": "Killed after exceeding the real time limit of %d seconds" % realtime}
+    if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+        try:
+            return {"globals": json.loads(result)}
+        except ValueError:
+            pass
+    if not output and os.WIFSIGNALED(status):
+        output = "Killed by signal %d" % os.WTERMSIG(status)
+    return {"error": output}
+
+
+while True:
+    header = read_exactly(0, 4)
+    if header is None:
+        break
+    job = json.loads(read_exactly(0, struct.unpack(">I", header)[0]))
+    response = json.dumps(run_job(job))
+    write_all(1, struct.pack(">I", len(response)) + response)
+'''.replace("PRELOAD_MODULES", repr(PRELOAD_MODULES))
+
+
+class SandboxWorkerError(Exception):
+    """
+    A worker failed, rather than the code it was running.
+    """
+    pass
+
+
+def _set_worker_limits():
+    """
+    preexec_fn for workers.  Workers need to fork, so the per-job limits are
+    applied by their children instead.  Each worker gets its own session, so
+    that it can be killed along with any job it is running.
+    """
+    os.setsid()
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+
+
+class SandboxWorker(object):
+    """
+    One warm sandboxed process, which runs one job at a time.
+
+    `user` is the sandbox user `cmdline` runs the worker as, if any.
+    """
+    def __init__(self, cmdline, user=None):
+        self.jobs = 0
+        self.user = user
+        self.tmpdir = tempfile.mkdtemp(prefix='codejail-')
+        # The sandbox user needs to be able to use this as its working directory.
+        os.chmod(self.tmpdir, 0775)
+        self.process = subprocess.Popen(
+            cmdline + ['-c', WORKER_SOURCE],
+            cwd=self.tmpdir, env={}, close_fds=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            preexec_fn=_set_worker_limits,
+        )
+
+    def run(self, code, globals_dict, limits):
+        """
+        Run `code` with `globals_dict`, and return the response: a dict with
+        either the resulting 'globals' or an 'error' message.
+        """
+        self.jobs += 1
+        timeout = (limits.get('REALTIME') or 0) + (limits.get('CPU') or 0) + JOB_TIMEOUT_SLACK
+        deadline = time.time() + timeout
+
+        request = json.dumps({'code': code, 'globals': globals_dict, 'limits': limits})
+        try:
+            self.process.stdin.write(struct.pack('>I', len(request)) + request)
+            self.process.stdin.flush()
+        except IOError as err:
+            raise SandboxWorkerError("Couldn't send a job to the sandbox worker: {0}".format(err))
+
+        length = struct.unpack('>I', self._read_exactly(4, deadline))[0]
+        return json.loads(self._read_exactly(length, deadline))
+
+    def _read_exactly(self, size, deadline):
+        """
+        Read `size` bytes from the worker, giving up at `deadline`.
+        """
+        stdout = self.process.stdout.fileno()
+        data = []
+        while size:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not select.select([stdout], [], [], remaining)[0]:
+                raise SandboxWorkerError("The sandbox worker timed out")
+            chunk = os.read(stdout, size)
+            if not chunk:
+                raise SandboxWorkerError("The sandbox worker exited")
+            data.append(chunk)
+            size -= len(chunk)
+        return ''.join(data)
+
+    def stop(self):
+        """
+        Shut the worker down, along with any job it is running, and clean up
+        after it.
+        """
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+        self._kill_process_group()
+        try:
+            self.process.wait()
+        except OSError:
+            pass
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _kill_process_group(self):
+        """
+        Kill every process in the worker's process group.  The worker leads its
+        own session, and isn't waited for until this is done, so its pid can't
+        have been reused as another group's id.
+        """
+        pgid = self.process.pid
+        if self.user:
+            # Processes running as the sandbox user can only be signalled by it.
+            with open(os.devnull, 'w') as devnull:
+                subprocess.call(
+                    ['sudo', '-u', self.user, 'kill', '-9', '--', '-{0}'.format(pgid)],
+                    stdout=devnull, stderr=devnull,
+                )
+        else:
+            try:
+                os.killpg(pgid, signal.SIGKILL)
+            except OSError:
+                # the group has already exited
+                pass
+
+
+class SandboxWorkerPool(object):
+    """
+    Up to `size` warm sandbox workers, each replaced after `max_jobs` jobs.
+
+    `cmdline` is the command that starts a sandboxed Python, and `user` the
+    sandbox user it runs as; they default to the ones CodeJail is configured
+    with.
+    """
+    def __init__(self, size, max_jobs=100, cmdline=None, user=None):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.cmdline = cmdline
+        self.user = user
+        self._idle = []
+        self._started = 0
+        # Notified whenever a worker is checked in or retired, so that callers
+        # waiting for a full pool can take the worker or start a replacement.
+        self._changed = threading.Condition()
+
+    def _checkout(self):
+        """
+        Return an idle worker, starting one if the pool isn't full yet, and
+        otherwise waiting for a worker to be checked in or retired.
+        """
+        with self._changed:
+            while not self._idle and self._started >= self.size:
+                self._changed.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+        try:
+            if self.cmdline:
+                return SandboxWorker(self.cmdline, self.user)
+            return SandboxWorker(COMMANDS['python']['cmdline_start'], COMMANDS['python'].get('user'))
+        except Exception:
+            with self._changed:
+                self._started -= 1
+                self._changed.notify()
+            raise
+
+    def _checkin(self, worker):
+        """
+        Make `worker` available to the next caller.
+        """
+        with self._changed:
+            self._idle.append(worker)
+            self._changed.notify()
+
+    def _retire(self, worker):
+        """
+        Stop `worker` for good, making room for a new one.
+        """
+        worker.stop()
+        with self._changed:
+            self._started -= 1
+            self._changed.notify()
+
+    def close(self):
+        """
+        Stop all of the idle workers.
+        """
+        with self._changed:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            self._retire(worker)
+
+    def safe_exec(self, code, globals_dict, python_path=None, slug=None):
+        """
+        Execute `code` in a warm worker, with the same signature and results as
+        codejail.safe_exec.safe_exec.  `python_path` isn't supported, since
+        the workers can't be given the files it points to.
+        """
+        if python_path:
+            raise ValueError("Sandbox workers can't add to the python path")
+
+        if slug:
+            log.debug("Executing jailed code %s in a sandbox worker", slug)
+
+        worker = self._checkout()
+        try:
+            response = worker.run(code, json_safe(globals_dict), dict(LIMITS))
+        except Exception as err:
+            self._retire(worker)
+            raise SafeExecException("Couldn't execute jailed code: {0}".format(err))
+
+        if worker.jobs >= self.max_jobs:
+            self._retire(worker)
+        else:
+            self._checkin(worker)
+
+        if 'error' in response:
+            raise SafeExecException("Couldn't execute jailed code: {0}".format(response['error']))
+        globals_dict.update(response['globals'])
+
+
+_pool_config = None
+_pool = None
+_pool_pid = None
+
+
+def configure(size=0, max_jobs=100):
+    """
+    Run sandboxed code in a pool of up to `size` warm workers per process,
+    each replaced after `max_jobs` jobs.  A size of 0 turns the pool off.
+    """
+    global _pool_config, _pool  # pylint: disable=global-statement
+    _pool_config = (size, max_jobs) if size else None
+    _pool = None
+
+
+def get_pool():
+    """
+    Return this process's SandboxWorkerPool, or None if there isn't one (the
+    pool isn't configured, or CodeJail isn't).
+    """
+    global _pool, _pool_pid  # pylint: disable=global-statement
+    if _pool_config is None or not is_configured('python'):
+        return None
+    # Worker pipes can't be shared with forked processes, so each gets its own pool.
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = SandboxWorkerPool(*_pool_config)
+        _pool_pid = os.getpid()
+    return _pool
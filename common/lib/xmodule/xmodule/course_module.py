@@ -675,20 +675,29 @@ class CourseDescriptor(CourseFields, SequenceDescriptor):
         flag = self.is_new
         if flag is None:
             # Use a heuristic if the course has not been flagged
-            announcement, start, now = self._sorting_dates()
-            if announcement and (now - announcement).days < 30:
-                # The course has been announced for less that month
-                return True
-            elif (now - start).days < 1:
-                # The course has not started yet
-                return True
-            else:
-                return False
+            announcement, start, _now = self._sorting_dates()
+            return self.is_newish_from_dates(announcement, start)
         elif isinstance(flag, basestring):
             return flag.lower() in ['true', 'yes', 'y']
         else:
             return bool(flag)
 
+    @staticmethod
+    def is_newish_from_dates(announcement, start):
+        """
+        The is_newish heuristic for a course that hasn't been flagged, given its
+        announcement date and (advertised) start date.
+        """
+        now = datetime.now(UTC())
+        if announcement and (now - announcement).days < 30:
+            # The course has been announced for less that month
+            return True
+        elif (now - start).days < 1:
+            # The course has not started yet
+            return True
+        else:
+            return False
+
     @property
     def sorting_score(self):
         """
@@ -699,10 +708,19 @@ class CourseDescriptor(CourseFields, SequenceDescriptor):
 
         The lower the number the "newer" the course.
         """
+        announcement, start, _now = self._sorting_dates()
+        return self.sorting_score_from_dates(announcement, start)
+
+    @staticmethod
+    def sorting_score_from_dates(announcement, start):
+        """
+        The sorting_score of a course with the given announcement date and
+        (advertised) start date.
+        """
         # Make courses that have an announcement date shave a lower
         # score than courses than don't, older courses should have a
         # higher score.
-        announcement, start, now = self._sorting_dates()
+        now = datetime.now(UTC())
         scale = 300.0  # about a year
         if announcement:
             days = (now - announcement).days
@@ -784,6 +802,47 @@ class CourseDescriptor(CourseFields, SequenceDescriptor):
         return {'graded_sections': graded_sections,
                 'all_descriptors': all_descriptors, }
 
+    @lazy
+    def grading_skeleton(self):
+        """
+        The grading context, reduced to locations and plain values, so that it
+        can be cached and shared between processes.  Descriptors can then be
+        loaded only for the sections that are actually graded.
+
+        The skeleton has two keys:
+        graded_sections - A dictionary keyed by section-type, like the one in
+            grading_context.  The values are arrays of dictionaries containing
+                "section_location" : The url of the section
+                "display_name" : The display_name_with_default of the section
+                "always_recalculate_grades" : Whether any module in the
+                    section must always be scored
+                "scorable" : An array of dictionaries with the "location" (url)
+                    and "weight" of each module that could possibly be scored
+                    in the section
+
+        all_locations - The urls of all_descriptors in grading_context.
+        """
+        grading_context = self.grading_context
+        graded_sections = {}
+        for section_format, sections in grading_context['graded_sections'].iteritems():
+            graded_sections[section_format] = [
+                {
+                    'section_location': section['section_descriptor'].location.url(),
+                    'display_name': section['section_descriptor'].display_name_with_default,
+                    'always_recalculate_grades': any(
+                        descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
+                    ),
+                    'scorable': [
+                        {'location': descriptor.location.url(), 'weight': getattr(descriptor, 'weight', None)}
+                        for descriptor in section['xmoduledescriptors']
+                    ],
+                }
+                for section in sections
+            ]
+
+        return {'graded_sections': graded_sections,
+                'all_locations': [descriptor.location.url() for descriptor in grading_context['all_descriptors']], }
+
     @staticmethod
     def make_id(org, course, url_name):
         return '/'.join([org, course, url_name])
@@ -2,7 +2,7 @@ import time
 import logging
 import re
 
-from xblock.fields import Field
+from xblock.fields import Dict, Field
 import datetime
 import dateutil.parser
 
@@ -218,3 +218,51 @@ class RelativeTime(Field):
         if len(stringified) == 7:
             stringified = '0' + stringified
         return stringified
+
+
+class CounterDict(Dict):
+    """
+    A dict of counts, such as the votes in a poll, that many users update at
+    once.  Meant for Scope.user_state_summary.
+
+    Change it with `increment`, and read it with `counts`, rather than through
+    the field itself.  If the runtime provides `summary_counters`, increments
+    are applied atomically to counters kept alongside the field, without
+    rewriting its value, and `counts` adds them to that value.  Otherwise,
+    increments read and rewrite the field.
+    """
+    def _summary_counters(self, block):
+        """
+        Return the runtime's summary counters, or None.
+        """
+        return getattr(block.runtime, 'summary_counters', None)
+
+    def counts(self, block):
+        """
+        Return the dict of counts for `block`.
+        """
+        counts = dict(getattr(block, self.name) or {})
+        summary_counters = self._summary_counters(block)
+        if summary_counters is not None:
+            for key, count in summary_counters.get(block.scope_ids.usage_id, self.name).iteritems():
+                counts[key] = counts.get(key, 0) + count
+        return counts
+
+    def increment(self, block, key, amount=1):
+        """
+        Add `amount` to the count for `key` in `block`.
+        """
+        self.increment_many(block, {key: amount})
+
+    def increment_many(self, block, deltas):
+        """
+        Add the amounts in the dict `deltas` to the counts for their keys in `block`.
+        """
+        summary_counters = self._summary_counters(block)
+        if summary_counters is not None:
+            summary_counters.increment(block.scope_ids.usage_id, self.name, deltas)
+        else:
+            counts = dict(getattr(block, self.name) or {})
+            for key, amount in deltas.iteritems():
+                counts[key] = counts.get(key, 0) + amount
+            setattr(block, self.name, counts)
@@ -8,11 +8,14 @@ from __future__ import absolute_import
 from importlib import import_module
 
 import re
+from uuid import uuid4
 
 from django.conf import settings
 from django.core.cache import get_cache, InvalidCacheBackendError
 from django.dispatch import Signal
+from xmodule.modulestore import XML_MODULESTORE_TYPE
 from xmodule.modulestore.loc_mapper_store import LocMapperStore
+from xmodule.modulestore.search import CourseParentIndex
 from xmodule.util.django import get_current_request_hostname
 
 # We may not always have the request_cache module available
@@ -38,6 +41,128 @@ def load_function(path):
     return getattr(import_module(module_path), name)
 
 
+def _metadata_inheritance_cache():
+    """
+    Return the cache shared by every process (LMS and CMS) that reads the
+    modulestore.
+    """
+    try:
+        return get_cache('mongo_metadata_inheritance')
+    except InvalidCacheBackendError:
+        return get_cache('default')
+
+
+# Seconds a course version token is kept for.  Data keyed on the token (e.g. stored
+# grades and course overviews) is rebuilt whenever it expires, so it must outlive the
+# cache's default timeout by far.
+COURSE_VERSION_TIMEOUT = 365 * 24 * 60 * 60
+
+
+def _course_version_cache_key(course_id):
+    """
+    Return the cache key under which the version of `course_id` is stored.
+
+    Modulestore update signals only carry 'org/course', so the run is ignored.
+    """
+    org, course = course_id.split('/')[:2]
+    return u'course_version.{0}/{1}'.format(org, course)
+
+
+def get_course_version(course_id):
+    """
+    Return an opaque version token for `course_id` ('org/course/run' or 'org/course').
+
+    The token changes whenever content in the course is written to the
+    modulestore, so it can be used to key or validate data derived from the
+    course structure. If the token is evicted from the cache a new one is
+    issued, which simply looks like a new version of the course.
+    """
+    cache = _metadata_inheritance_cache()
+    key = _course_version_cache_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        # Another process may have issued a version since our get
+        if not cache.add(key, version, COURSE_VERSION_TIMEOUT):
+            version = cache.get(key) or version
+    return version
+
+
+def get_course_versions(course_ids):
+    """
+    Return a dict mapping each of `course_ids` to its get_course_version token,
+    fetching the tokens that have already been issued all at once.
+    """
+    keys = dict((course_id, _course_version_cache_key(course_id)) for course_id in course_ids)
+    versions = _metadata_inheritance_cache().get_many(keys.values())
+    return dict(
+        (course_id, versions.get(key) or get_course_version(course_id))
+        for course_id, key in keys.items()
+    )
+
+
+def bump_course_version(course_id):
+    """
+    Issue a new version token for `course_id`.
+    """
+    _metadata_inheritance_cache().set(_course_version_cache_key(course_id), uuid4().hex, COURSE_VERSION_TIMEOUT)
+
+
+def _bump_course_version_on_update(sender, course_id=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Receiver for modulestore_update_signal
+    """
+    if course_id is not None:
+        bump_course_version(course_id)
+
+
+def get_course_parent_index(course_id, store=None):
+    """
+    Return a CourseParentIndex for `course_id`, for path_to_location, or None if
+    the modulestore can't list the course's children in one scan.
+
+    The index is cached per course version, so any write to the course (e.g. a
+    publish) makes the next call rebuild it.
+    """
+    if store is None:
+        store = modulestore()
+    if not hasattr(store, 'get_course_children'):
+        return None
+
+    cache = _metadata_inheritance_cache()
+    key = u'course_children.{0}.{1}'.format(course_id, get_course_version(course_id))
+    children = cache.get(key)
+    if children is None:
+        children = store.get_course_children(course_id)
+        if children is None:
+            return None
+        cache.set(key, children)
+    return CourseParentIndex(children)
+
+
+def get_grading_skeleton(course, store=None):
+    """
+    Return the grading_skeleton of the CourseDescriptor `course`.
+
+    Skeletons of courses that aren't loaded from XML are cached per course
+    version, so that the course tree is only walked again after the course
+    changes, rather than whenever the course descriptor is loaded anew.  XML
+    courses stay loaded, so their descriptors' own skeletons are used.
+    """
+    if store is None:
+        store = modulestore()
+    if store.get_modulestore_type(course.id) == XML_MODULESTORE_TYPE:
+        return course.grading_skeleton
+
+    cache = _metadata_inheritance_cache()
+    key = u'grading_skeleton.{0}.{1}'.format(course.id, get_course_version(course.id))
+    skeleton = cache.get(key)
+    if skeleton is None:
+        skeleton = course.grading_skeleton
+        cache.set(key, skeleton)
+    return skeleton
+
+
 def create_modulestore_instance(engine, doc_store_config, options):
     """
     This will return a new instance of a modulestore given an engine and options
@@ -56,15 +181,15 @@ def create_modulestore_instance(engine, doc_store_config, options):
     else:
         request_cache = None
 
-    try:
-        metadata_inheritance_cache = get_cache('mongo_metadata_inheritance')
-    except InvalidCacheBackendError:
-        metadata_inheritance_cache = get_cache('default')
+    metadata_inheritance_cache = _metadata_inheritance_cache()
+
+    modulestore_update_signal = Signal(providing_args=['modulestore', 'course_id', 'location'])
+    modulestore_update_signal.connect(_bump_course_version_on_update)
 
     return class_(
         metadata_inheritance_cache_subsystem=metadata_inheritance_cache,
         request_cache=request_cache,
-        modulestore_update_signal=Signal(providing_args=['modulestore', 'course_id', 'location']),
+        modulestore_update_signal=modulestore_update_signal,
         xblock_mixins=getattr(settings, 'XBLOCK_MIXINS', ()),
         doc_store_config=doc_store_config,
         **_options
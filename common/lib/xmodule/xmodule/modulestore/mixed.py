@@ -8,6 +8,7 @@ IMPORTANT: This modulestore only supports READONLY applications, e.g. LMS
 
 from . import ModuleStoreWriteBase
 from xmodule.modulestore.django import create_modulestore_instance
+from xmodule.modulestore.exceptions import ItemNotFoundError
 import logging
 
 log = logging.getLogger(__name__)
@@ -124,18 +125,68 @@ class MixedModuleStore(ModuleStoreWriteBase):
 
         return courses
 
+    def get_course_ids(self):
+        '''
+        Returns the ids of the courses in this modulestore, without loading them, or
+        None if any of the stores can't list its course ids.  As with get_courses,
+        courses in stores other than the default are only included if they are mapped
+        to that store.
+        '''
+        course_ids = []
+        for key, store in self.modulestores.items():
+            if not hasattr(store, 'get_course_ids'):
+                return None
+            for course_id in store.get_course_ids():
+                if key == 'default' or key == self.mappings.get(course_id, 'default'):
+                    course_ids.append(course_id)
+        return course_ids
+
     def get_course(self, course_id):
         """
         returns the course module associated with the course_id
         """
         return self._get_modulestore_for_courseid(course_id).get_course(course_id)
 
+    def get_courses_by_id(self, course_ids):
+        """
+        returns a dict mapping each of course_ids that exists to its course module,
+        asking each store for all of its courses at once
+        """
+        ids_by_store = {}
+        for course_id in set(course_ids):
+            ids_by_store.setdefault(self.mappings.get(course_id, 'default'), []).append(course_id)
+
+        courses = {}
+        for key, store_course_ids in ids_by_store.items():
+            store = self.modulestores[key]
+            if hasattr(store, 'get_courses_by_id'):
+                courses.update(store.get_courses_by_id(store_course_ids))
+                continue
+            for course_id in store_course_ids:
+                try:
+                    course = store.get_course(course_id)
+                except ItemNotFoundError:
+                    continue
+                if course is not None:
+                    courses[course_id] = course
+        return courses
+
     def get_parent_locations(self, location, course_id):
         """
         returns the parent locations for a given lcoation and course_id
         """
         return self._get_modulestore_for_courseid(course_id).get_parent_locations(location, course_id)
 
+    def get_course_children(self, course_id):
+        """
+        returns the parent url -> child urls map of the given course, or None if the
+        store serving it can't produce one
+        """
+        store = self._get_modulestore_for_courseid(course_id)
+        if not hasattr(store, 'get_course_children'):
+            return None
+        return store.get_course_children(course_id)
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
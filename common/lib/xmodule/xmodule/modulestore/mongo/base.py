@@ -15,7 +15,8 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
+
+from collections import defaultdict
 
 from bson.son import SON
 from fs.osfs import OSFS
@@ -250,6 +251,23 @@ def metadata_cache_key(location):
     return u"{0.org}/{0.course}".format(location)
 
 
+def inheritance_skeleton_cache_key(location):
+    """The cache key of the skeleton of the course containing `location`"""
+    return u"{0}/skeleton".format(metadata_cache_key(location))
+
+
+# Seconds that an incremental update of a course's cached metadata inheritance
+# tree may hold the course's update lock
+INHERITANCE_UPDATE_LOCK_TIMEOUT = 30
+
+
+# The categories of items whose children inherit metadata from them
+INHERITANCE_CONTAINER_CATEGORIES = [
+    'course', 'chapter', 'sequential', 'vertical', 'videosequence',
+    'wrapper', 'problemset', 'conditional', 'randomize'
+]
+
+
 class MongoModuleStore(ModuleStoreWriteBase):
     """
     A Mongodb backed ModuleStore
@@ -261,9 +279,12 @@ class MongoModuleStore(ModuleStoreWriteBase):
     def __init__(self, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
+                 check_metadata_inheritance=False,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param check_metadata_inheritance: if True, every incremental update of the cached metadata
+            inheritance tree is checked against a full recomputation, which replaces it if they differ.
         """
 
         super(MongoModuleStore, self).__init__(**kwargs)
@@ -309,19 +330,18 @@ class MongoModuleStore(ModuleStoreWriteBase):
         self.error_tracker = error_tracker
         self.render_template = render_template
         self.ignore_write_events_on_courses = []
+        self.check_metadata_inheritance = check_metadata_inheritance
 
-    def compute_metadata_inheritance_tree(self, location):
-        '''
-        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
-        '''
+    def _get_inheritance_records(self, query):
+        """
+        Return the containers matching `query`, as a dict mapping each one's
+        location url to {'children': [child urls], 'metadata': {inheritable metadata}}
 
-        # get all collections in the course, this query should not return any leaf nodes
-        # note this is a bit ugly as when we add new categories of containers, we have to add it here
-        query = {'_id.org': location.org,
-                 '_id.course': location.course,
-                 '_id.category': {'$in': ['course', 'chapter', 'sequential', 'vertical', 'videosequence',
-                                          'wrapper', 'problemset', 'conditional', 'randomize']}
-                 }
+        Draft and non-draft versions of an item are collated into one record:
+        draft verticals will have draft children but will have non-draft parents
+        currently, so the children of both versions are kept, along with the
+        metadata of the draft.
+        """
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
 
@@ -330,59 +350,101 @@ class MongoModuleStore(ModuleStoreWriteBase):
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
-
-        results_by_url = {}
-        root = None
-
-        # now go through the results and order them by the location url
-        for result in resultset:
+        records = {}
+        for result in self.collection.find(query, record_filter):
             location = Location(result['_id'])
-            # We need to collate between draft and non-draft
-            # i.e. draft verticals will have draft children but will have non-draft parents currently
-            location = location.replace(revision=None)
-            location_url = location.url()
-            if location_url in results_by_url:
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                results_by_url[location_url].setdefault('definition', {})['children'] = total_children
-            results_by_url[location.url()] = result
-            if location.category == 'course':
-                root = location.url()
-
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
+            location_url = location.replace(revision=None).url()
             # check for presence of metadata key. Note that a given module may not yet be fully formed.
             # example: update_item -> update_children -> update_metadata sequence on new item create
             # if we get called here without update_metadata called first then 'metadata' hasn't been set
-            # as we're not fully transactional at the DB layer. Same comment applies to below key name
-            # check
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
+            # as we're not fully transactional at the DB layer. Same comment applies to children
+            children = result.get('definition', {}).get('children', [])
+            metadata = result.get('metadata', {})
+            if location_url in records:
+                existing = records[location_url]
+                children = existing['children'] + [child for child in children if child not in existing['children']]
+                if location.revision is None:
+                    metadata = existing['metadata']
+            records[location_url] = {'children': children, 'metadata': metadata}
+        return records
+
+    def _get_inheritance_skeleton(self, location):
+        """
+        Return the structure of the course containing `location` that is needed
+        to compute its metadata inheritance tree: {'root': course url, 'records': records},
+        where records are the course's containers as returned by `_get_inheritance_records`
+        """
+        # get all collections in the course, this query should not return any leaf nodes
+        # note this is a bit ugly as when we add new categories of containers, we have to add it here
+        records = self._get_inheritance_records({
+            '_id.org': location.org,
+            '_id.course': location.course,
+            '_id.category': {'$in': INHERITANCE_CONTAINER_CATEGORIES},
+        })
+        root = None
+        for location_url in records:
+            if Location(location_url).category == 'course':
+                root = location_url
+        return {'root': root, 'records': records}
 
+    @staticmethod
+    def _inherit_metadata(records, tree, url, inherited_metadata):
+        """
+        Record in `tree` that the item at `url` inherits `inherited_metadata`, and
+        recompute the metadata inherited by all of its descendants.
+        """
+        if url not in records:
+            # this is likely a leaf node, so let's record what metadata we need to inherit
+            tree[url] = inherited_metadata
+            return
+
+        my_metadata = dict(inherited_metadata)
+        my_metadata.update(records[url]['metadata'])
+        tree[url] = my_metadata
+        for child in records[url]['children']:
+            MongoModuleStore._inherit_metadata(records, tree, child, my_metadata)
+
+    def _compute_tree_from_skeleton(self, skeleton):
+        """
+        Compute the full metadata inheritance tree described by `skeleton`
+        """
+        tree = {}
+        root = skeleton['root']
         if root is not None:
-            _compute_inherited_metadata(root)
+            records = skeleton['records']
+            for child in records[root]['children']:
+                self._inherit_metadata(records, tree, child, records[root]['metadata'])
+        return tree
+
+    def compute_metadata_inheritance_tree(self, location):
+        '''
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        return self._compute_tree_from_skeleton(self._get_inheritance_skeleton(location))
+
+    def _set_cached_metadata_inheritance_tree(self, location, tree, skeleton):
+        """
+        Write `tree` and the `skeleton` it was computed from to the caching
+        subsystem and the request cache
+        """
+        # write out the tree to caching subsystem (e.g. memcached), if available
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(metadata_cache_key(location), tree)
+            self.metadata_inheritance_cache_subsystem.set(inheritance_skeleton_cache_key(location), skeleton)
 
-        return metadata_to_inherit
+        self._set_request_cached_metadata_inheritance_tree(location, tree)
+
+    def _set_request_cached_metadata_inheritance_tree(self, location, tree):
+        """
+        Write `tree` to the request cache only
+        """
+        key = metadata_cache_key(location)
+        if self.request_cache is not None:
+            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
+            # defined
+            if 'metadata_inheritance' not in self.request_cache.data:
+                self.request_cache.data['metadata_inheritance'] = {}
+            self.request_cache.data['metadata_inheritance'][key] = tree
 
     def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
         '''
@@ -403,22 +465,15 @@ class MongoModuleStore(ModuleStoreWriteBase):
                 logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
 
         if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self.compute_metadata_inheritance_tree(location)
-
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(key, tree)
-
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][key] = tree
+            # if not in subsystem, or we are on force refresh, then we have to compute.
+            # The skeleton is cached along with the tree so later writes can update it incrementally
+            skeleton = self._get_inheritance_skeleton(location)
+            tree = self._compute_tree_from_skeleton(skeleton)
+            self._set_cached_metadata_inheritance_tree(location, tree, skeleton)
+        else:
+            # after a memcache hit, put the tree into the request_cache.  It mustn't be written
+            # back to memcache, where it could overwrite a tree that a write just updated.
+            self._set_request_cached_metadata_inheritance_tree(location, tree)
 
         return tree
 
@@ -431,6 +486,136 @@ class MongoModuleStore(ModuleStoreWriteBase):
         if pseudo_course_id not in self.ignore_write_events_on_courses:
             self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
 
+    def update_cached_metadata_inheritance_tree(self, location):
+        """
+        Update the cached metadata inheritance tree for the org/course combination
+        for location after location was written.
+
+        Only the entries for location and its descendants are recomputed, from the
+        cached skeleton of the course. If the tree or skeleton aren't cached, the
+        whole tree is refreshed instead.
+
+        Updates to the same course are serialized with a lock in the caching
+        subsystem.  A write that finds the lock taken refreshes the whole tree, and
+        marks the update in progress as raced, so that it refreshes the whole tree
+        too instead of storing a patch that is missing the other write.
+        """
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if pseudo_course_id in self.ignore_write_events_on_courses:
+            return
+
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None:
+            return self.refresh_cached_metadata_inheritance_tree(location)
+
+        lock_key = u"{0}/update_lock".format(metadata_cache_key(location))
+        raced_key = u"{0}/update_raced".format(metadata_cache_key(location))
+        if not cache.add(lock_key, True, INHERITANCE_UPDATE_LOCK_TIMEOUT):
+            cache.set(raced_key, True)
+            return self.refresh_cached_metadata_inheritance_tree(location)
+
+        try:
+            self._update_cached_metadata_inheritance_tree(location, raced_key)
+        finally:
+            cache.delete(lock_key)
+
+    def _update_cached_metadata_inheritance_tree(self, location, raced_key):
+        """
+        Implements update_cached_metadata_inheritance_tree, while holding the
+        course's update lock
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        pseudo_course_id = '/'.join([location.org, location.course])
+        tree = cache.get(metadata_cache_key(location), {})
+        skeleton = cache.get(inheritance_skeleton_cache_key(location))
+        if not tree or skeleton is None:
+            return self.refresh_cached_metadata_inheritance_tree(location)
+
+        if location.category not in INHERITANCE_CONTAINER_CATEGORIES and not self.check_metadata_inheritance:
+            # only containers pass metadata on, so the tree is unchanged
+            return
+
+        if location.category in INHERITANCE_CONTAINER_CATEGORIES:
+            self._patch_metadata_inheritance_tree(location, tree, skeleton)
+
+        if self.check_metadata_inheritance:
+            expected_skeleton = self._get_inheritance_skeleton(location)
+            expected_tree = self._compute_tree_from_skeleton(expected_skeleton)
+            if expected_tree != tree:
+                log.warning(
+                    "Incrementally updated metadata inheritance tree for %s differs from the full "
+                    "computation on %d locations",
+                    pseudo_course_id,
+                    len([url for url in set(tree) | set(expected_tree) if tree.get(url) != expected_tree.get(url)])
+                )
+                tree, skeleton = expected_tree, expected_skeleton
+
+        if cache.get(raced_key):
+            # another write to the course happened while we were patching
+            cache.delete(raced_key)
+            return self.refresh_cached_metadata_inheritance_tree(location)
+
+        self._set_cached_metadata_inheritance_tree(location, tree, skeleton)
+
+    def _patch_metadata_inheritance_tree(self, location, tree, skeleton):
+        """
+        Update `skeleton` with the current state of the container at `location`,
+        and recompute the entries of `tree` for it and its descendants.
+        """
+        records = skeleton['records']
+        location_url = location.replace(revision=None).url()
+        old_children = records.get(location_url, {}).get('children', [])
+
+        record = self._get_inheritance_records({
+            '_id.org': location.org,
+            '_id.course': location.course,
+            '_id.category': location.category,
+            '_id.name': location.name,
+        }).get(location_url)
+        if record is not None:
+            records[location_url] = record
+        else:
+            records.pop(location_url, None)
+        if location.category == 'course':
+            skeleton['root'] = location_url if record is not None else None
+
+        parents = defaultdict(list)
+        for url, container in records.iteritems():
+            for child in container['children']:
+                parents[child].append(url)
+
+        def _inherited_metadata(url):
+            """
+            Return the metadata that the item at `url` passes on to its children,
+            or None if it isn't reachable from the course root
+            """
+            ancestors = [url]
+            while ancestors[-1] != skeleton['root']:
+                if ancestors[-1] not in records or not parents[ancestors[-1]]:
+                    return None
+                ancestors.append(parents[ancestors[-1]][0])
+
+            metadata = {}
+            for ancestor in reversed(ancestors):
+                metadata.update(records[ancestor]['metadata'])
+            return metadata
+
+        if location_url == skeleton['root']:
+            for child in record['children']:
+                self._inherit_metadata(records, tree, child, record['metadata'])
+        for parent in parents[location_url]:
+            inherited_metadata = _inherited_metadata(parent)
+            if inherited_metadata is not None:
+                self._inherit_metadata(records, tree, location_url, inherited_metadata)
+
+        # children that were removed and aren't used anywhere else drop out of the tree
+        new_children = records.get(location_url, {}).get('children', [])
+        removed = [child for child in old_children if child not in new_children and not parents[child]]
+        while removed:
+            child = removed.pop()
+            tree.pop(child, None)
+            removed.extend(records.get(child, {}).get('children', []))
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -537,6 +722,36 @@ class MongoModuleStore(ModuleStoreWriteBase):
             )
         ]
 
+    def get_course_ids(self):
+        '''
+        Returns the ids of the courses in this modulestore, without loading them.
+        '''
+        items = self.collection.find(location_to_query(Location("i4x", category="course")), {'_id': True})
+        return [
+            u'/'.join([item['_id']['org'], item['_id']['course'], item['_id']['name']])
+            for item in items
+            if not (item['_id']['org'] == 'edx' and item['_id']['course'] == 'templates')
+        ]
+
+    def get_courses_by_id(self, course_ids):
+        '''
+        Returns a dict mapping each of course_ids that is in this modulestore to
+        its course descriptor, loading all of them with a single query.
+        '''
+        course_ids = set(course_ids)
+        locations = []
+        for course_id in course_ids:
+            parts = course_id.split('/')
+            # Ids that aren't org/course/name can't be courses in this store
+            if len(parts) == 3:
+                locations.append(Location('i4x', parts[0], parts[1], 'course', parts[2]))
+        if not locations:
+            return {}
+
+        query = {'_id': {'$in': [namedtuple_to_son(location) for location in locations]}}
+        courses = self._load_items(list(self.collection.find(query)), 0)
+        return dict((course.id, course) for course in courses if course.id in course_ids)
+
     def _find_one(self, location):
         '''Look for a given location in the collection.  If revision is not
         specified, returns the latest.  If the item is not present, raise
@@ -664,8 +879,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
                     'children': xmodule.children if xmodule.has_children else []
                 }
             })
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(xmodule.location)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(xmodule.location)
         self.fire_updated_modulestore_signal(get_course_id_no_run(xmodule.location), xmodule.location)
 
     def create_and_save_xmodule(self, location, definition_data=None, metadata=None, system=None):
@@ -758,6 +973,55 @@ class MongoModuleStore(ModuleStoreWriteBase):
         if result['n'] == 0:
             raise ItemNotFoundError(location)
 
+    def bulk_write_items(self, items, batch_size=1000):
+        """
+        Write many items w/ a few queries per batch rather than 3 updates per item (e.g., to import
+        a course). Each item is written as update_item, update_children (if it has children), and
+        update_metadata would; however, this neither updates the cached metadata inheritance tree nor
+        fires the modulestore update signal: the caller must do those once afterward. It also doesn't
+        do the static_tab hack in update_metadata; so, write static tabs individually.
+
+        items: an iterable of (location, data, children, metadata) tuples
+        batch_size: the number of items to write per batch
+        """
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self._write_item_batch(batch)
+                batch = []
+        if batch:
+            self._write_item_batch(batch)
+
+    def _write_item_batch(self, batch):
+        """
+        Insert the items in batch which don't exist in one query and update those which do.
+        See bulk_write_items.
+        """
+        ids = [Location(location).dict() for location, __, __, __ in batch]
+        existing = set(
+            Location(record['_id']).url()
+            for record in self.collection.find({'_id': {'$in': ids}}, {'_id': True})
+        )
+
+        new_records = []
+        for item_id, (__, data, children, metadata) in zip(ids, batch):
+            update = {'definition.data': data, 'metadata': metadata}
+            if children:
+                update['definition.children'] = children
+            if Location(item_id).url() in existing:
+                self._update_single_item(item_id, update)
+            else:
+                definition = {'data': data}
+                if children:
+                    definition['children'] = children
+                new_records.append({'_id': item_id, 'definition': definition, 'metadata': metadata})
+
+        if new_records:
+            # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
+            # from overriding our default value set in the init method.
+            self.collection.insert(new_records, safe=self.collection.safe)
+
     def update_item(self, location, data, allow_not_found=False):
         """
         Set the data in the item specified by the location to
@@ -782,8 +1046,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
         """
 
         self._update_single_item(location, {'definition.children': children})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location))
         # fire signal that we've written to DB
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
@@ -812,8 +1076,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
             self.update_metadata(course.location, own_metadata(course))
 
         self._update_single_item(location, {'metadata': metadata})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(loc)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(loc)
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def delete_item(self, location, delete_all_versions=False):
@@ -838,8 +1102,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
         # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': Location(location).dict()}, safe=self.collection.safe)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location))
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def get_parent_locations(self, location, course_id):
@@ -851,6 +1115,26 @@ class MongoModuleStore(ModuleStoreWriteBase):
                                      {'_id': True})
         return [i['_id'] for i in items]
 
+    def get_course_children(self, course_id):
+        '''
+        Return the children of every item in course_id that has any, as a dict
+        mapping each parent url to its child urls, using a single query.
+
+        Only published items are included: draft children must not give the LMS
+        a path to content that isn't live.
+        '''
+        org, course = course_id.split('/')[:2]
+        query = {
+            '_id.org': org,
+            '_id.course': course,
+            '_id.revision': None,
+            'definition.children.0': {'$exists': True},
+        }
+        return dict(
+            (Location(result['_id']).url(), result['definition']['children'])
+            for result in self.collection.find(query, {'_id': True, 'definition.children': True})
+        )
+
     def get_modulestore_type(self, course_id):
         """
         Returns an enumeration-like type reflecting the type of this modulestore
@@ -152,11 +152,22 @@ class DraftModuleStore(MongoModuleStore):
         except pymongo.errors.DuplicateKeyError:
             raise DuplicateItemError(original['_id'])
 
-        self.refresh_cached_metadata_inheritance_tree(draft_location)
+        self.update_cached_metadata_inheritance_tree(draft_location)
         self.fire_updated_modulestore_signal(get_course_id_no_run(draft_location), draft_location)
 
         return self._load_items([original])[0]
 
+    def bulk_write_items(self, items, batch_size=1000):
+        """
+        Write each item as a draft. Drafts need their published versions converted one at a time;
+        so, this writes the items individually.
+        """
+        for location, data, children, metadata in items:
+            self.update_item(location, data, allow_not_found=True)
+            if children:
+                self.update_children(location, children)
+            self.update_metadata(location, metadata)
+
     def update_item(self, location, data, allow_not_found=False):
         """
         Set the data in the item specified by the location to
@@ -6,7 +6,36 @@ from .exceptions import (ItemNotFoundError, NoPathToItem)
 from . import Location
 
 
-def path_to_location(modulestore, course_id, location):
+class CourseParentIndex(object):
+    '''
+    The parent and position of every item in one course, built from the parent
+    url -> child urls map returned by a modulestore's get_course_children().
+    '''
+    def __init__(self, children):
+        self.children = children
+        self._parents = {}
+        for parent_url, child_urls in children.iteritems():
+            for child_url in child_urls:
+                self._parents.setdefault(child_url, []).append(parent_url)
+
+    @staticmethod
+    def _url(location):
+        return Location(location).replace(revision=None).url()
+
+    def __contains__(self, location):
+        url = self._url(location)
+        return url in self._parents or url in self.children
+
+    def parents(self, location):
+        '''Return the locations of the parents of location.'''
+        return [Location(parent_url) for parent_url in self._parents.get(self._url(location), [])]
+
+    def position(self, parent, child):
+        '''Return the 1-indexed position of child among the children of parent.'''
+        return self.children[self._url(parent)].index(self._url(child)) + 1
+
+
+def path_to_location(modulestore, course_id, location, parent_index=None):
     '''
     Try to find a course_id/chapter/section[/position] path to location in
     modulestore.  The courseware insists that the first level in the course is
@@ -14,6 +43,8 @@ def path_to_location(modulestore, course_id, location):
 
     location: something that can be passed to Location
     course_id: Search for paths in this course.
+    parent_index: optional CourseParentIndex for the course.  If given, the path
+        and position are looked up in it instead of queried from modulestore.
 
     raise ItemNotFoundError if the location doesn't exist.
 
@@ -64,7 +95,10 @@ def path_to_location(modulestore, course_id, location):
             # isn't found so we don't have to do it explicitly.  Call this
             # first to make sure the location is there (even if it's a course, and
             # we would otherwise immediately exit).
-            parents = modulestore.get_parent_locations(loc, course_id)
+            if parent_index is not None:
+                parents = parent_index.parents(loc)
+            else:
+                parents = modulestore.get_parent_locations(loc, course_id)
 
             # print 'Processing loc={0}, path={1}'.format(loc, path)
             if loc.category == "course":
@@ -106,7 +140,9 @@ def path_to_location(modulestore, course_id, location):
         position_list = []
         for path_index in range(2, n - 1):
             category = path[path_index].category
-            if category == 'sequential' or category == 'videosequence':
+            if parent_index is not None and category in ('sequential', 'videosequence'):
+                position_list.append(str(parent_index.position(path[path_index], path[path_index + 1])))
+            elif category == 'sequential' or category == 'videosequence':
                 section_desc = modulestore.get_instance(course_id, path[path_index])
                 child_locs = [c.location for c in section_desc.get_children()]
                 # positions are 1-indexed, and should be strings to be consistent with
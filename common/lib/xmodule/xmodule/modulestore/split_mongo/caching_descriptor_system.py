@@ -46,6 +46,9 @@ class CachingDescriptorSystem(MakoDescriptorSystem):
         )
         self.default_class = default_class
         self.local_modules = {}
+        # definitions fetched for this system's lazy loaders and the ids of those yet to be fetched
+        self.definitions = {}
+        self.pending_definitions = set()
 
     def _load_item(self, usage_id, course_entry_override=None):
         if isinstance(usage_id, BlockUsageLocator) and isinstance(usage_id.usage_id, LocalId):
@@ -68,6 +71,28 @@ class CachingDescriptorSystem(MakoDescriptorSystem):
         )
         return self.xblock_from_json(class_, usage_id, json_data, course_entry_override)
 
+    def add_pending_definitions(self, definition_ids):
+        """
+        Note definitions which this system's blocks are likely to need. They'll be fetched
+        together when any definition is first needed.
+        """
+        self.pending_definitions.update(
+            definition_id for definition_id in definition_ids if definition_id not in self.definitions
+        )
+
+    def get_definition(self, definition_id):
+        """
+        Get the definition for one of this system's lazy loaders. If it hasn't been fetched,
+        fetch it along with all of the pending definitions in one query.
+        """
+        if definition_id not in self.definitions:
+            self.pending_definitions.add(definition_id)
+            fetched = self.modulestore._get_definitions(self.pending_definitions)  # pylint: disable=W0212
+            for pending_id in self.pending_definitions:
+                self.definitions[pending_id] = fetched.get(pending_id)
+            self.pending_definitions.clear()
+        return self.definitions[definition_id]
+
     # xblock's runtime does not always pass enough contextual information to figure out
     # which named container (course x branch) or which parent is requesting an item. Because split allows
     # a many:1 mapping from named containers to structures and because item's identities encode
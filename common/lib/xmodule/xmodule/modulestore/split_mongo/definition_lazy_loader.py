@@ -8,18 +8,25 @@ class DefinitionLazyLoader(object):
     object doesn't force access during init but waits until client wants the
     definition. Only works if the modulestore is a split mongo store.
     """
-    def __init__(self, modulestore, definition_id):
+    def __init__(self, modulestore, definition_id, system=None):
         """
         Simple placeholder for yet-to-be-fetched data
         :param modulestore: the pymongo db connection with the definitions
         :param definition_locator: the id of the record in the above to fetch
+        :param system: the CachingDescriptorSystem which batches the fetch of this
+            definition w/ its other pending definitions (optional)
         """
         self.modulestore = modulestore
         self.definition_locator = DefinitionLocator(definition_id)
+        self.system = system
 
     def fetch(self):
         """
         Fetch the definition. Note, the caller should replace this lazy
-        loader pointer with the result so as not to fetch more than once
+        loader pointer with the result so as not to fetch more than once.
+        The result is shared w/ other loaders and must not be modified.
         """
-        return self.modulestore.db_connection.get_definition(self.definition_locator.definition_id)
+        definition_id = self.definition_locator.definition_id
+        if self.system is not None:
+            return self.system.get_definition(definition_id)
+        return self.modulestore._get_definitions([definition_id]).get(definition_id)  # pylint: disable=W0212
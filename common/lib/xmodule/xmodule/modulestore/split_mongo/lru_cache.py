@@ -0,0 +1,71 @@
+"""
+A small thread-safe, size bounded cache for sharing immutable documents
+between the threads of a process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A dict-like cache holding at most `max_size` entries. When it is full, adding
+    an entry evicts the least recently used one.
+
+    If `ttl` is given, entries older than `ttl` seconds are treated as missing.
+
+    The cached values are shared by all of the callers, so they must not be modified.
+    """
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value cached for `key`, or `default` if there is none
+        """
+        with self._lock:
+            try:
+                value, expires = self._entries.pop(key)
+            except KeyError:
+                return default
+            if expires is not None and expires < time.time():
+                return default
+            # re-insert the entry to mark it as the most recently used
+            self._entries[key] = (value, expires)
+            return value
+
+    def set(self, key, value):
+        """
+        Cache `value` for `key`
+        """
+        if self.max_size <= 0:
+            return
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, expires)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove any value cached for `key`
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all of the cached values
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        return len(self._entries)
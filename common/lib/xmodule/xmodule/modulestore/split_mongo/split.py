@@ -64,6 +64,7 @@ from xmodule.modulestore import inheritance, ModuleStoreWriteBase, Location, SPL
 from ..exceptions import ItemNotFoundError
 from .definition_lazy_loader import DefinitionLazyLoader
 from .caching_descriptor_system import CachingDescriptorSystem
+from .lru_cache import LRUCache
 from xblock.fields import Scope
 from xblock.runtime import Mixologist
 from bson.objectid import ObjectId
@@ -100,9 +101,18 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  loc_mapper=None,
+                 structure_cache_size=50,
+                 course_index_cache_ttl=5,
+                 descriptor_system_cache_size=10,
+                 definition_cache_size=1000,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param structure_cache_size: the number of structures to keep in memory, shared by all threads
+        :param course_index_cache_ttl: the number of seconds that read-only lookups may use a cached
+            course index (active_versions) entry
+        :param descriptor_system_cache_size: the number of CachingDescriptorSystems each thread keeps
+        :param definition_cache_size: the number of definitions to keep in memory, shared by all threads
         """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
@@ -111,8 +121,17 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         self.db_connection = MongoConnection(**doc_store_config)
         self.db = self.db_connection.database
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
+        # structures never change once written, so all threads can share them. The exceptions are
+        # structures which internal_clean_children or continued versions overwrite in place: their
+        # guids are recorded in updated_structure_guids and never cached again.
+        self.structure_cache = LRUCache(structure_cache_size)
+        self.updated_structure_guids = set()
+        self._structure_cache_lock = threading.Lock()
+        # course indexes change whenever a branch's head moves; so, writes never use this
+        self.course_index_cache = LRUCache(structure_cache_size, ttl=course_index_cache_ttl)
+        self.descriptor_system_cache_size = descriptor_system_cache_size
+        # definitions are never updated (changes insert a new definition); so, all threads can share them
+        self.definition_cache = LRUCache(definition_cache_size)
         self.thread_cache = threading.local()
 
         if default_class is not None:
@@ -150,19 +169,30 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
         if lazy:
             for block in new_module_data.itervalues():
-                block['definition'] = DefinitionLazyLoader(self, block['definition'])
+                if not isinstance(block['definition'], DefinitionLazyLoader):
+                    block['definition'] = DefinitionLazyLoader(self, block['definition'], system)
+            # the children of these blocks are likely to be loaded next (e.g., to render a vertical);
+            # so, fetch their definitions in the same batch as these blocks' definitions
+            blocks = system.course_entry['structure']['blocks']
+            pending = []
+            for block in new_module_data.itervalues():
+                pending.append(block['definition'].definition_locator.definition_id)
+                for child in block['fields'].get('children', []):
+                    if child in blocks and child not in new_module_data and child not in system.module_data:
+                        pending.append(blocks[child]['definition'])
+            system.add_pending_definitions(pending)
         else:
             # Load all descendants by id
-            descendent_definitions = self.db_connection.find_matching_definitions({
-                '_id': {'$in': [block['definition']
-                                for block in new_module_data.itervalues()]}})
-            # turn into a map
-            definitions = {definition['_id']: definition
-                           for definition in descendent_definitions}
+            definitions = self._get_definitions(
+                [block['definition'] for block in new_module_data.itervalues()]
+            )
 
             for block in new_module_data.itervalues():
                 if block['definition'] in definitions:
-                    block['fields'].update(definitions[block['definition']].get('fields'))
+                    # the fields are shared w/ the cached structure; so, update a copy
+                    fields = dict(block['fields'])
+                    fields.update(definitions[block['definition']].get('fields'))
+                    block['fields'] = fields
 
         system.module_data.update(new_module_data)
         return system.module_data
@@ -177,7 +207,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         if system is None:
             system = CachingDescriptorSystem(
                 modulestore=self,
-                course_entry=course_entry,
+                course_entry=self._copy_for_descriptor_system(course_entry),
                 module_data={},
                 lazy=lazy,
                 default_class=self.default_class,
@@ -190,13 +220,29 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             self.cache_items(system, usage_ids, depth, lazy)
         return [system.load_item(usage_id, course_entry) for usage_id in usage_ids]
 
+    @staticmethod
+    def _copy_for_descriptor_system(course_entry):
+        """
+        Return a copy of course_entry whose structure and blocks a CachingDescriptorSystem can
+        annotate (with inherited settings and definitions) without changing the shared structure.
+        The blocks' fields are not copied, so they must still not be modified.
+        :param course_entry: an envelope as returned by _lookup_course
+        """
+        structure = dict(course_entry['structure'])
+        structure['blocks'] = {}
+        for usage_id, block in course_entry['structure'].get('blocks', {}).iteritems():
+            block = dict(block)
+            block.pop('_inherited_settings', None)
+            structure['blocks'][usage_id] = block
+        return dict(course_entry, structure=structure)
+
     def _get_cache(self, course_version_guid):
         """
         Find the descriptor cache for this course if it exists
         :param course_version_guid:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = LRUCache(self.descriptor_system_cache_size)
         system = self.thread_cache.course_cache
         return system.get(course_version_guid)
 
@@ -207,8 +253,8 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         :param system:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        self.thread_cache.course_cache[course_version_guid] = system
+            self.thread_cache.course_cache = LRUCache(self.descriptor_system_cache_size)
+        self.thread_cache.course_cache.set(course_version_guid, system)
         return system
 
     def _clear_cache(self, course_version_guid=None):
@@ -216,12 +262,85 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         Should only be used by testing or something which implements transactional boundary semantics.
         :param course_version_guid: if provided, clear only this entry
         """
+        if not hasattr(self.thread_cache, 'course_cache'):
+            self.thread_cache.course_cache = LRUCache(self.descriptor_system_cache_size)
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            self.thread_cache.course_cache.delete(course_version_guid)
+            self.structure_cache.delete(course_version_guid)
         else:
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache.clear()
+            self.structure_cache.clear()
+            self.course_index_cache.clear()
+            self.definition_cache.clear()
+
+    def _get_structure(self, version_guid):
+        """
+        Get the structure whose id is version_guid, from the structure cache if possible.
+        The result is shared and must not be modified: copy it (e.g., w/ _version_structure) first.
+        :param version_guid: an ObjectId
+        """
+        structure = self.structure_cache.get(version_guid)
+        if structure is None:
+            structure = self.db_connection.get_structure(version_guid)
+            if structure is not None:
+                self._cache_structure(structure)
+        return structure
+
+    def _cache_structure(self, structure):
+        """
+        Add structure to the structure cache unless its version has been updated in place
+        """
+        with self._structure_cache_lock:
+            if structure['_id'] not in self.updated_structure_guids:
+                self.structure_cache.set(structure['_id'], structure)
 
-    def _lookup_course(self, course_locator):
+    def _update_structure_in_place(self, structure):
+        """
+        Overwrite the stored structure w/ the same version guid as structure. Another thread
+        may have read the old contents before the update; so, the guid is evicted from and
+        barred from the structure cache rather than just evicted.
+        """
+        with self._structure_cache_lock:
+            self.updated_structure_guids.add(structure['_id'])
+            self.structure_cache.delete(structure['_id'])
+        self.db_connection.update_structure(structure)
+
+    def _get_definitions(self, definition_ids):
+        """
+        Get the definitions whose ids are in definition_ids as a dict keyed by id. Fetches
+        any which aren't in the definition cache with one query. Omits any which don't exist.
+        The results are shared and must not be modified.
+        :param definition_ids: an iterable of ObjectIds
+        """
+        definitions = {}
+        missing = []
+        for definition_id in set(definition_ids):
+            definition = self.definition_cache.get(definition_id)
+            if definition is None:
+                missing.append(definition_id)
+            else:
+                definitions[definition_id] = definition
+        if missing:
+            for definition in self.db_connection.find_matching_definitions({'_id': {'$in': missing}}):
+                self.definition_cache.set(definition['_id'], definition)
+                definitions[definition['_id']] = definition
+        return definitions
+
+    def _get_course_index(self, course_id, use_cache=False):
+        """
+        Get the course index entry for course_id. If use_cache, it may be up to
+        course_index_cache_ttl seconds old; so, only use the cache for reads.
+        """
+        if use_cache:
+            index = self.course_index_cache.get(course_id)
+            if index is not None:
+                return index
+        index = self.db_connection.get_course_index(course_id)
+        if index is not None:
+            self.course_index_cache.set(course_id, index)
+        return index
+
+    def _lookup_course(self, course_locator, use_index_cache=True):
         '''
         Decode the locator into the right series of db access. Does not
         return the CourseDescriptor! It returns the actual db json from
@@ -232,16 +351,29 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         it raises VersionConflictError (the version now differs from what it was when you got your
         reference)
 
+        The returned structure is shared with other callers (see _get_structure); so, it must not
+        be modified.
+
         :param course_locator: any subclass of CourseLocator
+        :param use_index_cache: whether a recently cached course index may be used to find the
+        branch's head. Operations which create new versions must pass False.
         '''
-        # NOTE: if and when this uses cache, the update if changed logic will break if the cache
-        # holds the same objects as the descriptors!
+        # NOTE: the cached structures are never the same objects as the descriptors' fields as
+        # SplitMongoKVS copies them; otherwise, the update if changed logic would break
         if not course_locator.is_fully_specified():
             raise InsufficientSpecificationError('Not fully specified: %s' % course_locator)
 
         if course_locator.course_id is not None and course_locator.branch is not None:
             # use the course_id
-            index = self.db_connection.get_course_index(course_locator.course_id)
+            index = self._get_course_index(course_locator.course_id, use_cache=use_index_cache)
+            if (use_index_cache and index is not None and (
+                course_locator.branch not in index['versions'] or (
+                    course_locator.version_guid is not None and
+                    index['versions'][course_locator.branch] != course_locator.version_guid
+                )
+            )):
+                # the cached index may predate the version the caller knows about: check w/ the db
+                index = self._get_course_index(course_locator.course_id)
             if index is None:
                 raise ItemNotFoundError(course_locator)
             if course_locator.branch not in index['versions']:
@@ -256,7 +388,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
         # cast string to ObjectId if necessary
         version_guid = course_locator.as_object_id(version_guid)
-        entry = self.db_connection.get_structure(version_guid)
+        entry = self._get_structure(version_guid)
 
         # b/c more than one course can use same structure, the 'course_id' and 'branch' are not intrinsic to structure
         # and the one assoc'd w/ it by another fetch may not be the one relevant to this fetch; so,
@@ -294,7 +426,19 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             version_guids.append(version_guid)
             id_version_map[version_guid] = structure['_id']
 
-        course_entries = self.db_connection.find_matching_structures({'_id': {'$in': version_guids}})
+        # only fetch the structures which aren't cached
+        course_entries = []
+        missing_guids = []
+        for version_guid in version_guids:
+            structure = self.structure_cache.get(version_guid)
+            if structure is None:
+                missing_guids.append(version_guid)
+            else:
+                course_entries.append(structure)
+        if missing_guids:
+            for structure in self.db_connection.find_matching_structures({'_id': {'$in': missing_guids}}):
+                self._cache_structure(structure)
+                course_entries.append(structure)
 
         # get the block for the course element (s/b the root)
         result = []
@@ -499,7 +643,8 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             'edited_on': when the change was made
         }
         """
-        definition = self.db_connection.get_definition(definition_locator.definition_id)
+        definition_id = definition_locator.definition_id
+        definition = self._get_definitions([definition_id]).get(definition_id)
         if definition is None:
             return None
         return definition['edit_info']
@@ -736,7 +881,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         """
         # find course_index entry if applicable and structures entry
         index_entry = self._get_index_if_valid(course_or_parent_locator, force, continue_version)
-        structure = self._lookup_course(course_or_parent_locator)['structure']
+        structure = self._lookup_course(course_or_parent_locator, use_index_cache=False)['structure']
 
         partitioned_fields = self._partition_fields_by_scope(category, fields)
         new_def_data = partitioned_fields.get(Scope.content, {})
@@ -748,7 +893,8 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
         # copy the structure and modify the new one
         if continue_version:
-            new_structure = structure
+            # the looked up structure is shared; so, modify a copy which then replaces it
+            new_structure = copy.deepcopy(structure)
         else:
             new_structure = self._version_structure(structure, user_id)
 
@@ -790,7 +936,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
                 parent['edit_info']['update_version'] = new_id
         if continue_version:
             # db update
-            self.db_connection.update_structure(new_structure)
+            self._update_structure_in_place(new_structure)
             # clear cache so things get refetched and inheritance recomputed
             self._clear_cache(new_id)
         else:
@@ -938,7 +1084,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         The implementation tries to detect which, if any changes, actually need to be saved and thus won't version
         the definition, structure, nor course if they didn't change.
         """
-        original_structure = self._lookup_course(descriptor.location)['structure']
+        original_structure = self._lookup_course(descriptor.location, use_index_cache=False)['structure']
         index_entry = self._get_index_if_valid(descriptor.location, force)
 
         descriptor.definition_locator, is_updated = self.update_definition_from_data(
@@ -1004,7 +1150,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         """
         # find course_index entry if applicable and structures entry
         index_entry = self._get_index_if_valid(xblock.location, force)
-        structure = self._lookup_course(xblock.location)['structure']
+        structure = self._lookup_course(xblock.location, use_index_cache=False)['structure']
         new_structure = self._version_structure(structure, user_id)
         new_id = new_structure['_id']
         is_updated = self._persist_subdag(xblock, user_id, new_structure['blocks'], new_id)
@@ -1142,7 +1288,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         if not there, don't update if there.
         """
         # get the destination's index, and source and destination structures.
-        source_structure = self._lookup_course(source_course)['structure']
+        source_structure = self._lookup_course(source_course, use_index_cache=False)['structure']
         index_entry = self.db_connection.get_course_index(destination_course.course_id)
         if index_entry is None:
             # brand new course
@@ -1154,7 +1300,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             # create branch
             destination_structure = self._new_structure(user_id, source_structure['root'])
         else:
-            destination_structure = self._lookup_course(destination_course)['structure']
+            destination_structure = self._lookup_course(destination_course, use_index_cache=False)['structure']
             destination_structure = self._version_structure(destination_structure, user_id)
 
         # iterate over subtree list filtering out blacklist.
@@ -1196,6 +1342,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         Does not return anything useful.
         """
         self.db_connection.update_course_index(updated_index_entry)
+        self.course_index_cache.delete(updated_index_entry['_id'])
 
     def delete_item(self, usage_locator, user_id, delete_children=False, force=False):
         """
@@ -1213,7 +1360,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         the course but leaves the head pointer where it is (this change will not be in the course head).
         """
         assert isinstance(usage_locator, BlockUsageLocator) and usage_locator.is_initialized()
-        original_structure = self._lookup_course(usage_locator)['structure']
+        original_structure = self._lookup_course(usage_locator, use_index_cache=False)['structure']
         if original_structure['root'] == usage_locator.usage_id:
             raise ValueError("Cannot delete the root of a course")
         index_entry = self._get_index_if_valid(usage_locator, force)
@@ -1267,6 +1414,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
             raise ItemNotFoundError(course_id)
         # this is the only real delete in the system. should it do something else?
         self.db_connection.delete_course_index(index['_id'])
+        self.course_index_cache.delete(index['_id'])
 
     def get_errored_courses(self):
         """
@@ -1348,13 +1496,16 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
 
         :param course_locator: the course to clean
         """
-        original_structure = self._lookup_course(course_locator)['structure']
+        # the looked up structure is shared; so, modify a copy which then replaces it
+        original_structure = copy.deepcopy(
+            self._lookup_course(course_locator, use_index_cache=False)['structure']
+        )
         for block in original_structure['blocks'].itervalues():
             if 'fields' in block and 'children' in block['fields']:
                 block['fields']["children"] = [
                     usage_id for usage_id in block['fields']["children"] if usage_id in original_structure['blocks']
                 ]
-        self.db_connection.update_structure(original_structure)
+        self._update_structure_in_place(original_structure)
         # clear cache again b/c inheritance may be wrong over orphans
         self._clear_cache(original_structure['_id'])
 
@@ -1484,6 +1635,7 @@ class SplitMongoModuleStore(ModuleStoreWriteBase):
         """
         index_entry['versions'][branch] = new_id
         self.db_connection.update_course_index(index_entry)
+        self.course_index_cache.delete(index_entry['_id'])
 
     def _partition_fields_by_scope(self, category, fields):
         """
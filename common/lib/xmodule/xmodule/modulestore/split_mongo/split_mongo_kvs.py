@@ -110,6 +110,7 @@ class SplitMongoKVS(InheritanceKeyValueStore):
         if isinstance(self._definition, DefinitionLazyLoader):
             persisted_definition = self._definition.fetch()
             if persisted_definition is not None:
-                self._fields.update(persisted_definition.get('fields'))
+                # the definition is shared w/ other blocks; so, don't let changes to these fields touch it
+                self._fields.update(copy.deepcopy(persisted_definition.get('fields')))
                 # do we want to cache any of the edit_info?
             self._definition = None  # already loaded
@@ -0,0 +1,39 @@
+"""
+Tests for the split mongo LRUCache
+"""
+import unittest
+
+from mock import patch
+
+from xmodule.modulestore.split_mongo.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    Test eviction and expiry
+    """
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # touching 'a' makes 'b' the least recently used entry
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl(self):
+        cache = LRUCache(2, ttl=5)
+        with patch('xmodule.modulestore.split_mongo.lru_cache.time.time', return_value=100):
+            cache.set('a', 1)
+        with patch('xmodule.modulestore.split_mongo.lru_cache.time.time', return_value=104):
+            self.assertEqual(cache.get('a'), 1)
+        with patch('xmodule.modulestore.split_mongo.lru_cache.time.time', return_value=106):
+            self.assertIsNone(cache.get('a'))
+
+    def test_zero_size(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
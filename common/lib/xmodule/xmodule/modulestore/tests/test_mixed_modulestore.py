@@ -231,6 +231,17 @@ class TestMixedModuleStore(object):
         module = self.store.get_course(XML_COURSEID2)
         assert_equals(module.location.course, 'simple')
 
+    def test_get_course_ids(self):
+        # the same 3 courses as get_courses
+        course_ids = self.store.get_course_ids()
+        assert_equals(sorted(course_ids), sorted([IMPORT_COURSEID, XML_COURSEID1, XML_COURSEID2]))
+
+    def test_get_courses_by_id(self):
+        courses = self.store.get_courses_by_id([IMPORT_COURSEID, XML_COURSEID1, 'edX/missing/2012_Fall'])
+        assert_equals(set(courses), set([IMPORT_COURSEID, XML_COURSEID1]))
+        assert_equals(courses[IMPORT_COURSEID].location.course, self.import_course)
+        assert_equals(courses[XML_COURSEID1].location.course, 'toy')
+
     # pylint: disable=E1101
     def test_get_parent_locations(self):
         parents = self.store.get_parent_locations(
@@ -1,12 +1,15 @@
 from nose.tools import assert_equals, assert_raises  # pylint: disable=E0611
 
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from xmodule.modulestore.search import path_to_location
+from xmodule.modulestore.search import path_to_location, CourseParentIndex
 
-def check_path_to_location(modulestore):
+def check_path_to_location(modulestore, use_parent_index=False):
     """
     Make sure that path_to_location works: should be passed a modulestore
     with the toy and simple courses loaded.
+
+    If use_parent_index, path_to_location uses an index built from the
+    modulestore's get_course_children.
     """
     should_work = (
         ("i4x://edX/toy/video/Welcome",
@@ -15,12 +18,15 @@ def check_path_to_location(modulestore):
          ("edX/toy/2012_Fall", "Overview", None, None)),
     )
     course_id = "edX/toy/2012_Fall"
+    parent_index = None
+    if use_parent_index:
+        parent_index = CourseParentIndex(modulestore.get_course_children(course_id))
 
     for location, expected in should_work:
-        assert_equals(path_to_location(modulestore, course_id, location), expected)
+        assert_equals(path_to_location(modulestore, course_id, location, parent_index=parent_index), expected)
 
     not_found = (
         "i4x://edX/toy/video/WelcomeX", "i4x://edX/toy/course/NotHome"
     )
     for location in not_found:
-        assert_raises(ItemNotFoundError, path_to_location, modulestore, course_id, location)
+        assert_raises(ItemNotFoundError, path_to_location, modulestore, course_id, location, parent_index=parent_index)
@@ -184,6 +184,10 @@ class TestMongoModuleStore(object):
         '''Make sure that path_to_location works'''
         check_path_to_location(self.store)
 
+    def test_path_to_location_with_parent_index(self):
+        '''Make sure that path_to_location works from the course children index'''
+        check_path_to_location(self.store, use_parent_index=True)
+
     def test_xlinter(self):
         '''
         Run through the xlinter, we know the 'toy' course has violations, but the
@@ -218,6 +222,24 @@ class TestMongoModuleStore(object):
         assert_equals('Resources', get_tab_name(3))
         assert_equals('Discussion', get_tab_name(4))
 
+    def test_bulk_write_items(self):
+        '''Make sure bulk writes insert new items and overwrite existing ones'''
+        location = Location('i4x', 'edX', 'bulk_write', 'html', 'bulk_html')
+        collection = self.connection[DB][COLLECTION]
+        try:
+            self.store.bulk_write_items([(location, '<p>first</p>', [], {'display_name': 'First'})], batch_size=1)
+            record = collection.find_one({'_id': location.dict()})
+            assert_equals(record['definition'], {'data': '<p>first</p>'})
+            assert_equals(record['metadata'], {'display_name': 'First'})
+
+            children = [location.replace(name='child').url()]
+            self.store.bulk_write_items([(location, '<p>second</p>', children, {'display_name': 'Second'})])
+            record = collection.find_one({'_id': location.dict()})
+            assert_equals(record['definition'], {'data': '<p>second</p>', 'children': children})
+            assert_equals(record['metadata'], {'display_name': 'Second'})
+        finally:
+            collection.remove({'_id': location.dict()})
+
     def test_contentstore_attrs(self):
         """
         Test getting, setting, and defaulting the locked attr and arbitrary attrs.
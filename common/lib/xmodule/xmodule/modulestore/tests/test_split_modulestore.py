@@ -8,6 +8,7 @@ import subprocess
 import unittest
 import uuid
 from importlib import import_module
+from mock import patch
 
 from xblock.fields import Scope
 from xmodule.course_module import CourseDescriptor
@@ -1086,6 +1087,79 @@ class TestInheritance(SplitModuleTest):
         self.assertEqual(node.graceperiod, datetime.timedelta(hours=4))
 
 
+class TestStructureCache(SplitModuleTest):
+    """
+    Test the process wide structure cache
+    """
+    def tearDown(self):
+        modulestore()._clear_cache()
+        SplitModuleTest.tearDown(self)
+
+    def test_structure_cache(self):
+        """
+        Structures come from the cache once fetched and aren't modified by building descriptors
+        """
+        locator = CourseLocator(course_id="GreekHero", branch='draft')
+        course = modulestore().get_course(locator)
+        # drop the descriptor systems so the next read has to rebuild them from the structure
+        modulestore().thread_cache.course_cache.clear()
+        with patch.object(modulestore().db_connection, 'get_structure', side_effect=AssertionError):
+            cached = modulestore().get_course(locator)
+        self.assertEqual(course.location.version_guid, cached.location.version_guid)
+        structure = modulestore().structure_cache.get(course.location.version_guid)
+        self.assertIsNotNone(structure)
+        for block in structure['blocks'].itervalues():
+            self.assertNotIn('_inherited_settings', block)
+
+    def test_structure_cache_continued_version(self):
+        """
+        Structures which are updated in place are evicted from the cache and never cached again
+        """
+        user = random.getrandbits(32)
+        new_course = modulestore().create_course('test_org', 'test_continued_cache', user)
+        versionless_course_locator = CourseLocator(
+            course_id=new_course.location.course_id, branch=new_course.location.branch
+        )
+        version_guid = new_course.location.version_guid
+        modulestore().get_course(versionless_course_locator)
+        self.assertIn(version_guid, modulestore().structure_cache)
+
+        new_ele = modulestore().create_item(
+            new_course.location, 'chapter', user,
+            fields={'display_name': 'chapter 1'},
+            continue_version=True
+        )
+        self.assertEqual(new_ele.location.version_guid, version_guid)
+        self.assertNotIn(version_guid, modulestore().structure_cache)
+
+        modulestore().thread_cache.course_cache.clear()
+        refetch_course = modulestore().get_course(versionless_course_locator)
+        self.assertIn(new_ele.location.usage_id, refetch_course.children)
+        self.assertNotIn(version_guid, modulestore().structure_cache)
+
+    def test_batched_definitions(self):
+        """
+        Touching a definition fetches its siblings' and children's definitions in the same query
+        """
+        modulestore()._clear_cache()
+        store = modulestore()
+        course = store.get_course(CourseLocator(course_id="GreekHero", branch='draft'))
+        with patch.object(
+            store.db_connection, 'find_matching_definitions', wraps=store.db_connection.find_matching_definitions
+        ) as mock_find:
+            self.assertIsNotNone(course.runtime.get_definition(course.definition_locator.definition_id))
+            children = course.get_children()
+            self.assertGreater(len(children), 0)
+            for child in children:
+                self.assertIsNotNone(child.runtime.get_definition(child.definition_locator.definition_id))
+        self.assertEqual(mock_find.call_count, 1)
+        # definitions are shared across descriptor systems
+        store.thread_cache.course_cache.clear()
+        course = store.get_course(CourseLocator(course_id="GreekHero", branch='draft'))
+        with patch.object(store.db_connection, 'find_matching_definitions', side_effect=AssertionError):
+            self.assertIsNotNone(course.runtime.get_definition(course.definition_locator.definition_id))
+
+
 class TestPublish(SplitModuleTest):
     """
     Test the publishing api
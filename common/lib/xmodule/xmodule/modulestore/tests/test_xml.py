@@ -1,4 +1,8 @@
 import os.path
+import shutil
+import tempfile
+
+from mock import patch
 
 from nose.tools import assert_raises, assert_equals  # pylint: disable=E0611
 
@@ -20,6 +24,10 @@ class TestXMLModuleStore(object):
 
         check_path_to_location(modulestore)
 
+    def test_path_to_location_with_parent_index(self):
+        modulestore = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'])
+        check_path_to_location(modulestore, use_parent_index=True)
+
     def test_xml_modulestore_type(self):
         store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'])
         assert_equals(store.get_modulestore_type('foo/bar/baz'), XML_MODULESTORE_TYPE)
@@ -42,3 +50,83 @@ class TestXMLModuleStore(object):
         location = CourseDescriptor.id_to_location("edX/toy/2012_Fall")
         errors = modulestore.get_item_errors(location)
         assert errors == []
+
+    def test_lazy_loading(self):
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'], lazy=True)
+        assert_equals(store.courses, {})
+
+        course = store.get_course('edX/toy/2012_Fall')
+        assert_equals(course.id, 'edX/toy/2012_Fall')
+        assert_equals(store.courses.keys(), ['toy'])
+
+        # asking for all of the courses loads the rest
+        assert_equals(len(store.get_courses()), 2)
+        check_path_to_location(store)
+
+    def test_parallel_loading(self):
+        serial = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'])
+        parallel = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'], course_load_workers=2)
+
+        assert_equals(sorted(serial.courses.keys()), sorted(parallel.courses.keys()))
+        for course_id, modules in serial.modules.iteritems():
+            assert_equals(sorted(modules.keys()), sorted(parallel.modules[course_id].keys()))
+            for location, descriptor in modules.iteritems():
+                assert_equals(descriptor.display_name, parallel.modules[course_id][location].display_name)
+
+        course = parallel.get_course('edX/toy/2012_Fall')
+        assert_equals(course.grade_cutoffs, serial.get_course('edX/toy/2012_Fall').grade_cutoffs)
+        check_path_to_location(parallel)
+
+    def test_course_tree_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            store = XMLModuleStore(DATA_DIR, course_dirs=['toy'], course_cache_dir=cache_dir)
+            assert_equals(len(os.listdir(cache_dir)), 1)
+
+            # the second store unpickles the course instead of parsing it
+            with patch.object(XMLModuleStore, 'load_course') as load_course:
+                cached = XMLModuleStore(DATA_DIR, course_dirs=['toy'], course_cache_dir=cache_dir)
+                assert_equals(load_course.call_count, 0)
+
+            assert_equals(sorted(store.modules['edX/toy/2012_Fall'].keys()),
+                          sorted(cached.modules['edX/toy/2012_Fall'].keys()))
+            assert_equals(cached.get_course('edX/toy/2012_Fall').grade_cutoffs,
+                          store.get_course('edX/toy/2012_Fall').grade_cutoffs)
+            check_path_to_location(cached)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_course_tree_cache_code_change(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            XMLModuleStore(DATA_DIR, course_dirs=['toy'], course_cache_dir=cache_dir)
+            old_entries = os.listdir(cache_dir)
+            assert_equals(len(old_entries), 1)
+
+            # new code doesn't use the tree cached by the old, and replaces it
+            with patch('xmodule.modulestore.xml.code_fingerprint', return_value='changed'):
+                store = XMLModuleStore(DATA_DIR, course_dirs=['toy'], course_cache_dir=cache_dir)
+                assert_equals(os.path.basename(store._course_cache_path('toy')), os.listdir(cache_dir)[0])
+            assert store.get_course('edX/toy/2012_Fall') is not None
+            new_entries = os.listdir(cache_dir)
+            assert_equals(len(new_entries), 1)
+            assert new_entries != old_entries
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_get_items_indexes(self):
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'])
+
+        chapters = store.get_items(['i4x', 'edX', 'toy', 'chapter', None], course_id='edX/toy/2012_Fall')
+        expected = [loc for loc in store.modules['edX/toy/2012_Fall'] if loc.category == 'chapter']
+        assert_equals(sorted(chapter.location for chapter in chapters), sorted(expected))
+
+        all_videos = store.get_items(['i4x', None, None, 'video', None])
+        expected = [
+            loc for modules in store.modules.values() for loc in modules if loc.category == 'video'
+        ]
+        assert_equals(sorted(video.location for video in all_videos), sorted(expected))
+
+        overview = store.get_items(['i4x', 'edX', 'toy', 'chapter', 'Overview'])
+        assert_equals([item.location.url() for item in overview], ['i4x://edX/toy/chapter/Overview'])
+        assert_equals(store.get_items(['i4x', 'edX', 'toy', 'chapter', 'Overview'], course_id='edX/simple/2012_Fall'), [])
@@ -1,10 +1,14 @@
+import cPickle as pickle
 import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import re
 import sys
 import glob
+import tempfile
+import threading
 
 from collections import defaultdict
 from cStringIO import StringIO
@@ -14,7 +18,7 @@ from lxml import etree
 from path import path
 
 from xmodule.error_module import ErrorDescriptor
-from xmodule.errortracker import make_error_tracker, exc_info_to_str
+from xmodule.errortracker import make_error_tracker, exc_info_to_str, null_error_tracker
 from xmodule.course_module import CourseDescriptor
 from xmodule.mako_module import MakoDescriptorSystem
 from xmodule.x_module import XMLParsingSystem, XModuleDescriptor
@@ -23,11 +27,12 @@ from xmodule.html_module import HtmlDescriptor
 from xblock.core import XBlock
 from xblock.fields import ScopeIds
 from xblock.field_data import DictFieldData
+from xblock.runtime import DbModel
 
 from . import ModuleStoreReadBase, Location, XML_MODULESTORE_TYPE
 
 from .exceptions import ItemNotFoundError
-from .inheritance import compute_inherited_metadata
+from .inheritance import compute_inherited_metadata, InheritanceKeyValueStore
 
 edx_xml_parser = etree.XMLParser(dtd_validation=False, load_dtd=False,
                                  remove_comments=True, remove_blank_text=True)
@@ -36,6 +41,37 @@ etree.set_default_parser(edx_xml_parser)
 
 log = logging.getLogger(__name__)
 
+# Bump this whenever the course tree format or the way courses load changes, so
+# that trees cached by older code are ignored
+COURSE_TREE_CACHE_VERSION = 1
+
+_code_fingerprint = None
+
+
+def code_fingerprint():
+    """
+    Return a hash of the path, mtime and size of every source file of the
+    installed xmodule and xblock packages, so that cached course trees are
+    ignored once the code which loaded them changes.  Computed once per process.
+    """
+    global _code_fingerprint  # pylint: disable=global-statement
+    if _code_fingerprint is None:
+        import xblock
+        import xmodule
+        key = hashlib.sha1()
+        for package in (xmodule, xblock):
+            package_path = os.path.dirname(os.path.abspath(package.__file__))
+            for dirpath, dirnames, filenames in os.walk(package_path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if not filename.endswith('.py'):
+                        continue
+                    file_path = os.path.join(dirpath, filename)
+                    stat = os.stat(file_path)
+                    key.update(repr((file_path, stat.st_mtime, stat.st_size)))
+        _code_fingerprint = key.hexdigest()
+    return _code_fingerprint
+
 
 # VS[compat]
 # TODO (cpennington): Remove this once all fall 2012 courses have been imported
@@ -193,7 +229,7 @@ class ImportSystem(XMLParsingSystem, MakoDescriptorSystem):
 
             descriptor.data_dir = course_dir
 
-            xmlstore.modules[course_id][descriptor.location] = descriptor
+            xmlstore._add_module(course_id, descriptor)  # pylint: disable=protected-access
 
             if hasattr(descriptor, 'children'):
                 for child in descriptor.get_children():
@@ -291,12 +327,93 @@ class ParentTracker(object):
         child = Location(child)
         return list(self._parents[child])
 
+    def parent_map(self):
+        """
+        Return a copy of the location -> set(parents) mapping, e.g. to hand it to another process.
+        """
+        return dict((child, set(parents)) for child, parents in self._parents.iteritems())
+
+    def update(self, parent_map):
+        """
+        Add all of the parent pointers in parent_map (as returned by parent_map()).
+        """
+        for child, parents in parent_map.iteritems():
+            self._parents.setdefault(child, set()).update(parents)
+
+
+def block_to_record(descriptor):
+    """
+    Return a picklable record of the field data of a loaded descriptor, from which
+    block_from_record can rebuild it against a new ImportSystem.
+
+    Raises TypeError if the descriptor's field data can't be captured.
+    """
+    field_data = descriptor._field_data  # pylint: disable=protected-access
+    kvs = getattr(field_data, '_kvs', None)
+    if isinstance(kvs, InheritanceKeyValueStore):
+        descriptor.save()
+        fields = ('kvs', dict(kvs._fields), dict(kvs.inherited_settings))  # pylint: disable=protected-access
+    elif isinstance(field_data, DictFieldData):
+        fields = ('dict', dict(field_data._data), None)  # pylint: disable=protected-access
+    else:
+        raise TypeError("Can't record the field data of {0}".format(descriptor.location))
+
+    block_class = getattr(descriptor, 'unmixed_class', descriptor.__class__)
+    return {
+        'class': (block_class.__module__, block_class.__name__),
+        'mixed': hasattr(descriptor, 'unmixed_class'),
+        'scope_ids': descriptor.scope_ids,
+        'fields': fields,
+        'data_dir': getattr(descriptor, 'data_dir', None),
+    }
+
+
+def block_from_record(system, record):
+    """
+    Rebuild a descriptor recorded by block_to_record, using `system` as its runtime.
+    """
+    module_path, class_name = record['class']
+    block_class = getattr(import_module(module_path), class_name)
+    if record['mixed']:
+        block_class = system.mixologist.mix(block_class)
+
+    kind, fields, inherited_settings = record['fields']
+    if kind == 'kvs':
+        field_data = DbModel(InheritanceKeyValueStore(initial_values=fields, inherited_settings=inherited_settings))
+    else:
+        field_data = DictFieldData(fields)
+
+    descriptor = system.construct_xblock_from_class(block_class, record['scope_ids'], field_data)
+    descriptor.data_dir = record['data_dir']
+    return descriptor
+
+
+def _load_pickled_course_tree(args):
+    """
+    Load one course dir in a worker process and return its pickled course tree
+    (see XMLModuleStore.course_tree), or None if it couldn't be captured.
+    """
+    data_dir, default_class, load_error_modules, xblock_mixins, course_dir = args
+    try:
+        store = XMLModuleStore(
+            data_dir,
+            default_class=default_class,
+            course_dirs=[course_dir],
+            load_error_modules=load_error_modules,
+            xblock_mixins=xblock_mixins,
+        )
+        return pickle.dumps(store.course_tree(course_dir), pickle.HIGHEST_PROTOCOL)
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Unable to load course '%s' in a worker process", course_dir)
+        return None
+
 
 class XMLModuleStore(ModuleStoreReadBase):
     """
     An XML backed ModuleStore
     """
-    def __init__(self, data_dir, default_class=None, course_dirs=None, load_error_modules=True, **kwargs):
+    def __init__(self, data_dir, default_class=None, course_dirs=None, load_error_modules=True,
+                 lazy=False, course_load_workers=None, course_cache_dir=None, **kwargs):
         """
         Initialize an XMLModuleStore from data_dir
 
@@ -307,6 +424,16 @@ class XMLModuleStore(ModuleStoreReadBase):
 
         course_dirs: If specified, the list of course_dirs to load. Otherwise,
             load all course dirs
+
+        lazy: If True, only read the course.xml of each course dir up front, and
+            load a course the first time something asks for its course_id
+
+        course_load_workers: If more than 1, load the course dirs in a pool of
+            this many processes, which hand back pickled course trees
+
+        course_cache_dir: If specified, a directory to keep pickled course trees
+            in, keyed by the mtimes and sizes of the files in each course dir, so
+            unchanged courses are unpickled instead of parsed on later loads
         """
         super(XMLModuleStore, self).__init__(**kwargs)
 
@@ -315,8 +442,15 @@ class XMLModuleStore(ModuleStoreReadBase):
         self.courses = {}  # course_dir -> XBlock for the course
         self.errored_courses = {}  # course_dir -> errorlog, for dirs that failed to load
 
+        # secondary indexes for get_items
+        self._category_index = defaultdict(set)  # (course_id, category) -> set(location)
+        self._name_index = defaultdict(set)  # (org, course, category, name) -> set((course_id, location))
+
         self.load_error_modules = load_error_modules
+        self.course_load_workers = course_load_workers
+        self.course_cache_dir = path(course_cache_dir) if course_cache_dir else None
 
+        self._default_class_path = default_class
         if default_class is None:
             self.default_class = None
         else:
@@ -326,6 +460,10 @@ class XMLModuleStore(ModuleStoreReadBase):
 
         self.parent_trackers = defaultdict(ParentTracker)
 
+        self._unloaded_courses = {}  # course_id -> [course_dir], for lazily loaded courses
+        self._loading_courses = set()  # course_ids being loaded right now
+        self._load_lock = threading.RLock()
+
         # If we are specifically asked for missing courses, that should
         # be an error.  If we are asked for "all" courses, find the ones
         # that have a course.xml. We sort the dirs in alpha order so we always
@@ -334,8 +472,246 @@ class XMLModuleStore(ModuleStoreReadBase):
         if course_dirs is None:
             course_dirs = sorted([d for d in os.listdir(self.data_dir) if
                                   os.path.exists(self.data_dir / d / "course.xml")])
-        for course_dir in course_dirs:
-            self.try_load_course(course_dir)
+
+        if lazy:
+            eager_dirs = []
+            for course_dir in course_dirs:
+                course_id = self._course_id_for_dir(course_dir)
+                if course_id is None:
+                    # let the regular load record why the course is broken
+                    eager_dirs.append(course_dir)
+                else:
+                    self._unloaded_courses.setdefault(course_id, []).append(course_dir)
+            course_dirs = eager_dirs
+
+        self._load_courses(course_dirs)
+
+    def _add_module(self, course_id, descriptor):
+        """
+        Store descriptor as part of course_id, and index it for get_items.
+        """
+        location = descriptor.location
+        self.modules[course_id][location] = descriptor
+        self._category_index[(course_id, location.category)].add(location)
+        self._name_index[(location.org, location.course, location.category, location.name)].add((course_id, location))
+
+    def _course_id_for_dir(self, course_dir):
+        """
+        Read just the course.xml of course_dir, and return the id of the course
+        it defines, or None if that can't be worked out.
+        """
+        try:
+            course_data, org, course, url_name = self._read_course_xml(course_dir, null_error_tracker)
+        except Exception:  # pylint: disable=broad-except
+            return None
+        if not url_name and course_data.get('name'):
+            url_name = Location.clean(course_data.get('name'))
+        if not url_name:
+            return None
+        return CourseDescriptor.make_id(org, course, url_name)
+
+    def _load_courses(self, course_dirs):
+        """
+        Load each of course_dirs, in a process pool if course_load_workers asks for one.
+        """
+        cache_paths = {}
+        if self.course_cache_dir is not None:
+            uncached_dirs = []
+            for course_dir in course_dirs:
+                cache_paths[course_dir] = self._course_cache_path(course_dir)
+                if not self._load_cached_course(cache_paths[course_dir]):
+                    uncached_dirs.append(course_dir)
+            course_dirs = uncached_dirs
+
+        if not self.course_load_workers or self.course_load_workers <= 1 or len(course_dirs) <= 1:
+            for course_dir in course_dirs:
+                self.try_load_course(course_dir)
+                if course_dir in cache_paths and course_dir in self.courses:
+                    try:
+                        tree = pickle.dumps(self.course_tree(course_dir), pickle.HIGHEST_PROTOCOL)
+                    except Exception:  # pylint: disable=broad-except
+                        log.exception("Unable to pickle the course tree of '%s'", course_dir)
+                    else:
+                        self._write_cached_course(course_dir, cache_paths[course_dir], tree)
+            return
+
+        args = [
+            (self.data_dir, self._default_class_path, self.load_error_modules, self.xblock_mixins, course_dir)
+            for course_dir in course_dirs
+        ]
+        pool = multiprocessing.Pool(min(self.course_load_workers, len(course_dirs)))
+        try:
+            trees = pool.map(_load_pickled_course_tree, args)
+        finally:
+            pool.close()
+            pool.join()
+
+        for course_dir, tree in zip(course_dirs, trees):
+            if tree is None:
+                # the worker couldn't hand the course back, so load it here instead
+                self.try_load_course(course_dir)
+            else:
+                self.install_course_tree(pickle.loads(tree))
+                if course_dir in cache_paths and course_dir in self.courses:
+                    self._write_cached_course(course_dir, cache_paths[course_dir], tree)
+
+    def _course_cache_path(self, course_dir):
+        """
+        Return the path the course tree of course_dir is cached at.  The file name
+        hashes the path, mtime and size of every file in the course dir, along with
+        the options that change how courses load and the code_fingerprint, so any
+        edit to the course or the code gets a new entry.
+        """
+        course_path = self.data_dir / course_dir
+        key = hashlib.sha1()
+        key.update(repr((
+            COURSE_TREE_CACHE_VERSION,
+            code_fingerprint(),
+            self._default_class_path,
+            self.load_error_modules,
+            [(mixin.__module__, mixin.__name__) for mixin in self.xblock_mixins],
+        )))
+        for dirpath, dirnames, filenames in os.walk(course_path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                file_path = os.path.join(dirpath, filename)
+                stat = os.stat(file_path)
+                key.update(repr((os.path.relpath(file_path, course_path), stat.st_mtime, stat.st_size)))
+        return self.course_cache_dir / '{0}-{1}.pickle'.format(course_dir, key.hexdigest())
+
+    def _load_cached_course(self, cache_path):
+        """
+        Install the course tree cached at cache_path.  Returns False if there isn't
+        a usable one.
+        """
+        if not os.path.exists(cache_path):
+            return False
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                tree = pickle.load(cache_file)
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Ignoring unreadable course tree cache %s", cache_path, exc_info=True)
+            return False
+        log.debug('Loading course from cached course tree %s', cache_path)
+        self.install_course_tree(tree)
+        return True
+
+    def _write_cached_course(self, course_dir, cache_path, tree):
+        """
+        Save the pickled course tree `tree` of course_dir to cache_path, and remove
+        the trees cached for older versions of course_dir.  Writes a temporary file
+        and renames it, so processes starting at the same time never read a partial
+        file.
+        """
+        try:
+            if not os.path.isdir(self.course_cache_dir):
+                os.makedirs(self.course_cache_dir)
+            with tempfile.NamedTemporaryFile(dir=self.course_cache_dir, delete=False) as cache_file:
+                cache_file.write(tree)
+            os.rename(cache_file.name, cache_path)
+        except (IOError, OSError):
+            log.warning("Unable to write course tree cache %s", cache_path, exc_info=True)
+            return
+
+        stale_name = re.compile(r'^{0}-[0-9a-f]{{40}}\.pickle$'.format(re.escape(course_dir)))
+        for filename in os.listdir(self.course_cache_dir):
+            stale_path = self.course_cache_dir / filename
+            if stale_name.match(filename) and stale_path != cache_path:
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    # another process may have removed it already
+                    pass
+
+    def _ensure_course_loaded(self, course_id):
+        """
+        Load course_id now if it was deferred by lazy loading.
+        """
+        if course_id not in self._unloaded_courses and course_id not in self._loading_courses:
+            return
+        with self._load_lock:
+            # mark the course as loading before taking it off the unloaded list, so other
+            # threads wait for the lock instead of seeing a partly loaded course
+            self._loading_courses.add(course_id)
+            try:
+                self._load_courses(self._unloaded_courses.pop(course_id, []))
+            finally:
+                self._loading_courses.discard(course_id)
+
+    def _ensure_all_courses_loaded(self):
+        """
+        Load every course still deferred by lazy loading.
+        """
+        if not self._unloaded_courses and not self._loading_courses:
+            return
+        with self._load_lock:
+            course_ids = self._unloaded_courses.keys()
+            self._loading_courses.update(course_ids)
+            try:
+                course_dirs = []
+                for course_id in course_ids:
+                    course_dirs.extend(self._unloaded_courses.pop(course_id))
+                self._load_courses(sorted(course_dirs))
+            finally:
+                self._loading_courses.difference_update(course_ids)
+
+    def course_tree(self, course_dir):
+        """
+        Return a picklable description of the course loaded from course_dir: its
+        blocks (see block_to_record), parent pointers, policy and load errors.
+        install_course_tree rebuilds the course from it.
+        """
+        if course_dir in self.errored_courses:
+            return {
+                'course_dir': course_dir,
+                'course_id': None,
+                'errors': list(self.errored_courses[course_dir].errors),
+            }
+
+        course_descriptor = self.courses[course_dir]
+        course_id = course_descriptor.id
+        return {
+            'course_dir': course_dir,
+            'course_id': course_id,
+            'course_location': course_descriptor.location,
+            'errors': list(self._location_errors[course_descriptor.location].errors),
+            'policy': course_descriptor.runtime.policy,
+            'blocks': [block_to_record(descriptor) for descriptor in self.modules[course_id].itervalues()],
+            'parents': self.parent_trackers[course_id].parent_map(),
+        }
+
+    def install_course_tree(self, tree):
+        """
+        Add the course described by `tree` (as returned by course_tree) to this store.
+        """
+        course_dir = tree['course_dir']
+        errorlog = make_error_tracker()
+        errorlog.errors.extend(tree['errors'])
+        if tree['course_id'] is None:
+            self.errored_courses[course_dir] = errorlog
+            return
+
+        course_id = tree['course_id']
+        parent_tracker = self.parent_trackers[course_id]
+        parent_tracker.update(tree['parents'])
+        system = ImportSystem(
+            xmlstore=self,
+            course_id=course_id,
+            course_dir=course_dir,
+            error_tracker=errorlog.tracker,
+            parent_tracker=parent_tracker,
+            load_error_modules=self.load_error_modules,
+            policy=tree['policy'],
+            mixins=self.xblock_mixins,
+        )
+        for record in tree['blocks']:
+            descriptor = block_from_record(system, record)
+            self._add_module(course_id, descriptor)
+
+        course_descriptor = self.modules[course_id][tree['course_location']]
+        self.courses[course_dir] = course_descriptor
+        self._location_errors[course_descriptor.location] = errorlog
+        parent_tracker.make_known(course_descriptor.location)
 
     def try_load_course(self, course_dir):
         '''
@@ -388,15 +764,13 @@ class XMLModuleStore(ModuleStoreReadBase):
             log.warning(msg + " " + str(err))
         return {}
 
-    def load_course(self, course_dir, tracker):
+    def _read_course_xml(self, course_dir, tracker):
         """
-        Load a course into this module store
-        course_path: Course directory name
+        Parse the course.xml of course_dir.
 
-        returns a CourseDescriptor for the course
+        returns (course_data, org, course, url_name), where course_data is the
+        root element and url_name is None if course.xml doesn't set one
         """
-        log.debug('========> Starting course import from {0}'.format(course_dir))
-
         with open(self.data_dir / course_dir / "course.xml") as course_file:
 
             # VS[compat]
@@ -406,89 +780,101 @@ class XMLModuleStore(ModuleStoreReadBase):
 
             course_data = etree.parse(course_file, parser=edx_xml_parser).getroot()
 
-            org = course_data.get('org')
+        org = course_data.get('org')
 
-            if org is None:
-                msg = ("No 'org' attribute set for course in {dir}. "
-                       "Using default 'edx'".format(dir=course_dir))
-                log.warning(msg)
-                tracker(msg)
-                org = 'edx'
+        if org is None:
+            msg = ("No 'org' attribute set for course in {dir}. "
+                   "Using default 'edx'".format(dir=course_dir))
+            log.warning(msg)
+            tracker(msg)
+            org = 'edx'
 
-            course = course_data.get('course')
+        course = course_data.get('course')
 
-            if course is None:
-                msg = ("No 'course' attribute set for course in {dir}."
-                       " Using default '{default}'".format(dir=course_dir,
-                                                           default=course_dir
-                                                           )
-                       )
-                log.warning(msg)
-                tracker(msg)
-                course = course_dir
+        if course is None:
+            msg = ("No 'course' attribute set for course in {dir}."
+                   " Using default '{default}'".format(dir=course_dir,
+                                                       default=course_dir
+                                                       )
+                   )
+            log.warning(msg)
+            tracker(msg)
+            course = course_dir
+
+        url_name = course_data.get('url_name', course_data.get('slug'))
+        return course_data, org, course, url_name
+
+    def load_course(self, course_dir, tracker):
+        """
+        Load a course into this module store
+        course_path: Course directory name
 
-            url_name = course_data.get('url_name', course_data.get('slug'))
-            policy_dir = None
-            if url_name:
-                policy_dir = self.data_dir / course_dir / 'policies' / url_name
-                policy_path = policy_dir / 'policy.json'
+        returns a CourseDescriptor for the course
+        """
+        log.debug('========> Starting course import from {0}'.format(course_dir))
+
+        course_data, org, course, url_name = self._read_course_xml(course_dir, tracker)
+        policy_dir = None
+        if url_name:
+            policy_dir = self.data_dir / course_dir / 'policies' / url_name
+            policy_path = policy_dir / 'policy.json'
 
-                policy = self.load_policy(policy_path, tracker)
+            policy = self.load_policy(policy_path, tracker)
 
-                # VS[compat]: remove once courses use the policy dirs.
-                if policy == {}:
-                    old_policy_path = self.data_dir / course_dir / 'policies' / '{0}.json'.format(url_name)
-                    policy = self.load_policy(old_policy_path, tracker)
+            # VS[compat]: remove once courses use the policy dirs.
+            if policy == {}:
+                old_policy_path = self.data_dir / course_dir / 'policies' / '{0}.json'.format(url_name)
+                policy = self.load_policy(old_policy_path, tracker)
+        else:
+            policy = {}
+            # VS[compat] : 'name' is deprecated, but support it for now...
+            if course_data.get('name'):
+                url_name = Location.clean(course_data.get('name'))
+                tracker("'name' is deprecated for module xml.  Please use "
+                        "display_name and url_name.")
             else:
-                policy = {}
-                # VS[compat] : 'name' is deprecated, but support it for now...
-                if course_data.get('name'):
-                    url_name = Location.clean(course_data.get('name'))
-                    tracker("'name' is deprecated for module xml.  Please use "
-                            "display_name and url_name.")
-                else:
-                    raise ValueError("Can't load a course without a 'url_name' "
-                                     "(or 'name') set.  Set url_name.")
-
-            course_id = CourseDescriptor.make_id(org, course, url_name)
-            system = ImportSystem(
-                xmlstore=self,
-                course_id=course_id,
-                course_dir=course_dir,
-                error_tracker=tracker,
-                parent_tracker=self.parent_trackers[course_id],
-                load_error_modules=self.load_error_modules,
-                policy=policy,
-                mixins=self.xblock_mixins,
-            )
-
-            course_descriptor = system.process_xml(etree.tostring(course_data, encoding='unicode'))
-
-            # If we fail to load the course, then skip the rest of the loading steps
-            if isinstance(course_descriptor, ErrorDescriptor):
-                return course_descriptor
-
-            # NOTE: The descriptors end up loading somewhat bottom up, which
-            # breaks metadata inheritance via get_children().  Instead
-            # (actually, in addition to, for now), we do a final inheritance pass
-            # after we have the course descriptor.
-            compute_inherited_metadata(course_descriptor)
-
-            # now import all pieces of course_info which is expected to be stored
-            # in <content_dir>/info or <content_dir>/info/<url_name>
-            self.load_extra_content(system, course_descriptor, 'course_info', self.data_dir / course_dir / 'info', course_dir, url_name)
-
-            # now import all static tabs which are expected to be stored in
-            # in <content_dir>/tabs or <content_dir>/tabs/<url_name>
-            self.load_extra_content(system, course_descriptor, 'static_tab', self.data_dir / course_dir / 'tabs', course_dir, url_name)
-
-            self.load_extra_content(system, course_descriptor, 'custom_tag_template', self.data_dir / course_dir / 'custom_tags', course_dir, url_name)
-
-            self.load_extra_content(system, course_descriptor, 'about', self.data_dir / course_dir / 'about', course_dir, url_name)
-
-            log.debug('========> Done with course import from {0}'.format(course_dir))
+                raise ValueError("Can't load a course without a 'url_name' "
+                                 "(or 'name') set.  Set url_name.")
+
+        course_id = CourseDescriptor.make_id(org, course, url_name)
+        system = ImportSystem(
+            xmlstore=self,
+            course_id=course_id,
+            course_dir=course_dir,
+            error_tracker=tracker,
+            parent_tracker=self.parent_trackers[course_id],
+            load_error_modules=self.load_error_modules,
+            policy=policy,
+            mixins=self.xblock_mixins,
+        )
+
+        course_descriptor = system.process_xml(etree.tostring(course_data, encoding='unicode'))
+
+        # If we fail to load the course, then skip the rest of the loading steps
+        if isinstance(course_descriptor, ErrorDescriptor):
             return course_descriptor
 
+        # NOTE: The descriptors end up loading somewhat bottom up, which
+        # breaks metadata inheritance via get_children().  Instead
+        # (actually, in addition to, for now), we do a final inheritance pass
+        # after we have the course descriptor.
+        compute_inherited_metadata(course_descriptor)
+
+        # now import all pieces of course_info which is expected to be stored
+        # in <content_dir>/info or <content_dir>/info/<url_name>
+        self.load_extra_content(system, course_descriptor, 'course_info', self.data_dir / course_dir / 'info', course_dir, url_name)
+
+        # now import all static tabs which are expected to be stored in
+        # in <content_dir>/tabs or <content_dir>/tabs/<url_name>
+        self.load_extra_content(system, course_descriptor, 'static_tab', self.data_dir / course_dir / 'tabs', course_dir, url_name)
+
+        self.load_extra_content(system, course_descriptor, 'custom_tag_template', self.data_dir / course_dir / 'custom_tags', course_dir, url_name)
+
+        self.load_extra_content(system, course_descriptor, 'about', self.data_dir / course_dir / 'about', course_dir, url_name)
+
+        log.debug('========> Done with course import from {0}'.format(course_dir))
+        return course_descriptor
+
     def load_extra_content(self, system, course_descriptor, category, base_dir, course_dir, url_name):
         self._load_extra_content(system, course_descriptor, category, base_dir, course_dir)
 
@@ -525,7 +911,7 @@ class XMLModuleStore(ModuleStoreReadBase):
                                 module.display_name = tab['name']
                     module.data_dir = course_dir
                     module.save()
-                    self.modules[course_descriptor.id][module.location] = module
+                    self._add_module(course_descriptor.id, module)
                 except Exception, e:
                     logging.exception("Failed to load %s. Skipping... \
                             Exception: %s", filepath, unicode(e))
@@ -547,6 +933,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         location: Something that can be passed to Location
         """
         location = Location(location)
+        self._ensure_course_loaded(course_id)
         try:
             return self.modules[course_id][location]
         except KeyError:
@@ -557,6 +944,7 @@ class XMLModuleStore(ModuleStoreReadBase):
         Returns True if location exists in this ModuleStore.
         """
         location = Location(location)
+        self._ensure_course_loaded(course_id)
         return location in self.modules[course_id]
 
     def get_item(self, location, depth=0):
@@ -575,35 +963,88 @@ class XMLModuleStore(ModuleStoreReadBase):
                                   " are unique. Use get_instance.")
 
     def get_items(self, location, course_id=None, depth=0):
-        items = []
-
-        def _add_get_items(self, location, modules):
-            for mod_loc, module in modules.iteritems():
-                # Locations match if each value in `location` is None or if the value from `location`
-                # matches the value from `mod_loc`
-                if all(goal is None or goal == value for goal, value in zip(location, mod_loc)):
-                    items.append(module)
-
+        location = Location(location)
         if course_id is None:
-            for _, modules in self.modules.iteritems():
-                _add_get_items(self, location, modules)
+            self._ensure_all_courses_loaded()
         else:
-            _add_get_items(self, location, self.modules[course_id])
+            self._ensure_course_loaded(course_id)
+
+        items = []
+        for mod_course_id, mod_loc in self._candidate_locations(location, course_id):
+            # Locations match if each value in `location` is None or if the value from `location`
+            # matches the value from `mod_loc`
+            if all(goal is None or goal == value for goal, value in zip(location, mod_loc)):
+                items.append(self.modules[mod_course_id][mod_loc])
 
         return items
 
+    def _candidate_locations(self, location, course_id):
+        """
+        Return (course_id, location) pairs for the modules that might match the
+        wildcard `location`, using the narrowest index the query allows.
+        """
+        if None not in (location.org, location.course, location.category, location.name):
+            candidates = self._name_index.get((location.org, location.course, location.category, location.name), ())
+            return [(mod_course_id, mod_loc) for mod_course_id, mod_loc in candidates
+                    if course_id is None or mod_course_id == course_id]
+
+        course_ids = self.modules.keys() if course_id is None else [course_id]
+        if location.category is not None:
+            return [
+                (mod_course_id, mod_loc)
+                for mod_course_id in course_ids
+                for mod_loc in self._category_index.get((mod_course_id, location.category), ())
+            ]
+
+        return [
+            (mod_course_id, mod_loc)
+            for mod_course_id in course_ids
+            for mod_loc in self.modules.get(mod_course_id, {})
+        ]
+
     def get_courses(self, depth=0):
         """
         Returns a list of course descriptors.  If there were errors on loading,
         some of these may be ErrorDescriptors instead.
         """
+        self._ensure_all_courses_loaded()
         return self.courses.values()
 
+    def get_course(self, course_id):
+        """
+        Returns the course descriptor for course_id, or None.  Only loads that
+        course if the store is lazy.
+        """
+        self._ensure_course_loaded(course_id)
+        for course in self.courses.values():
+            if course.id == course_id:
+                return course
+        return None
+
+    def get_course_ids(self):
+        """
+        Returns the ids of the courses in this modulestore that loaded without errors.
+        """
+        return [course.id for course in self.get_courses() if isinstance(course, CourseDescriptor)]
+
+    def get_courses_by_id(self, course_ids):
+        """
+        Returns a dict mapping each of course_ids that is in this modulestore to
+        its course descriptor.
+        """
+        courses = {}
+        for course_id in set(course_ids):
+            course = self.get_course(course_id)
+            if course is not None:
+                courses[course_id] = course
+        return courses
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
         course_dir where course loading failed.
         """
+        self._ensure_all_courses_loaded()
         return dict((k, self.errored_courses[k].errors) for k in self.errored_courses)
 
     def update_item(self, location, data):
@@ -644,11 +1085,34 @@ class XMLModuleStore(ModuleStoreReadBase):
         be empty if there are no parents.
         '''
         location = Location.ensure_fully_specified(location)
+        self._ensure_course_loaded(course_id)
         if not self.parent_trackers[course_id].is_known(location):
             raise ItemNotFoundError("{0} not in {1}".format(location, course_id))
 
         return self.parent_trackers[course_id].parents(location)
 
+    def get_item_errors(self, location):
+        """
+        Return list of errors for this location, if any.  Loads the course first
+        if location is a lazily loaded course.
+        """
+        location = Location(location)
+        if location.category == 'course':
+            self._ensure_course_loaded(CourseDescriptor.make_id(location.org, location.course, location.name))
+        return super(XMLModuleStore, self).get_item_errors(location)
+
+    def get_course_children(self, course_id):
+        '''
+        Return the children of every item in course_id that has any, as a dict
+        mapping each parent url to its child urls.
+        '''
+        self._ensure_course_loaded(course_id)
+        children = {}
+        for location, descriptor in self.modules[course_id].iteritems():
+            if descriptor.has_children and descriptor.children:
+                children[location.url()] = [Location(child).url() for child in descriptor.children]
+        return children
+
     def get_modulestore_type(self, course_id):
         """
         Returns an enumeration-like type reflecting the type of this modulestore
@@ -1,6 +1,7 @@
 import logging
 import os
 import mimetypes
+from multiprocessing.pool import ThreadPool
 from path import path
 import json
 
@@ -15,6 +16,9 @@ from .store_utilities import rewrite_nonportable_content_links
 
 log = logging.getLogger(__name__)
 
+# the number of static files import_static_content saves at once
+STATIC_CONTENT_IMPORT_WORKERS = 4
+
 
 def import_static_content(modules, course_loc, course_data_path, static_content_store, target_location_namespace,
                           subpath='static', verbose=False):
@@ -33,52 +37,75 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
 
     verbose = True
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
-
-            content_path = os.path.join(dirname, filename)
-            if verbose:
-                log.debug('importing static content %s...', content_path)
+    def import_file(content_path):
+        """
+        Save the file (and its thumbnail) in the static_content_store. Returns its
+        (path within static_dir, content location name) or None if it's to be skipped.
+        """
+        filename = os.path.basename(content_path)
+        if verbose:
+            log.debug('importing static content %s...', content_path)
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
+        try:
+            with open(content_path, 'rb') as f:
+                data = f.read()
+        except IOError:
+            if filename.startswith('._'):
+                # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                return None
+            # Not a 'hidden file', then re-raise exception
+            raise
+
+        fullname_with_subpath = content_path.replace(static_dir, '')  # strip away leading path from the name
+        if fullname_with_subpath.startswith('/'):
+            fullname_with_subpath = fullname_with_subpath[1:]
+        content_loc = StaticContent.compute_location(target_location_namespace.org, target_location_namespace.course, fullname_with_subpath)
+
+        policy_ele = policy.get(content_loc.name, {})
+        displayname = policy_ele.get('displayname', filename)
+        locked = policy_ele.get('locked', False)
+        mime_type = policy_ele.get('contentType', mimetypes.guess_type(filename)[0])
+        content = StaticContent(
+            content_loc, displayname, mime_type, data,
+            import_path=fullname_with_subpath, locked=locked
+        )
 
-            fullname_with_subpath = content_path.replace(static_dir, '')  # strip away leading path from the name
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            content_loc = StaticContent.compute_location(target_location_namespace.org, target_location_namespace.course, fullname_with_subpath)
+        # first let's save a thumbnail so we can get back a thumbnail location
+        (thumbnail_content, thumbnail_location) = static_content_store.generate_thumbnail(content)
 
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
 
-            policy_ele = policy.get(content_loc.name, {})
-            displayname = policy_ele.get('displayname', filename)
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType', mimetypes.guess_type(filename)[0])
-            content = StaticContent(
-                content_loc, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
+        #then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception('Error importing {0}, error={1}'.format(fullname_with_subpath, err))
 
-            # first let's save a thumbnail so we can get back a thumbnail location
-            (thumbnail_content, thumbnail_location) = static_content_store.generate_thumbnail(content)
+        return fullname_with_subpath, content_loc.name
 
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+    content_paths = [
+        os.path.join(dirname, filename)
+        for dirname, _, filenames in os.walk(static_dir)
+        for filename in filenames
+    ]
 
-            #then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception('Error importing {0}, error={1}'.format(fullname_with_subpath, err))
+    # saving the files is mostly waiting on the store; so, save several at once
+    if len(content_paths) > 1 and STATIC_CONTENT_IMPORT_WORKERS > 1:
+        pool = ThreadPool(min(STATIC_CONTENT_IMPORT_WORKERS, len(content_paths)))
+        try:
+            imported = pool.map(import_file, content_paths)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        imported = [import_file(content_path) for content_path in content_paths]
 
-            #store the remapping information which will be needed to subsitute in the module data
-            remap_dict[fullname_with_subpath] = content_loc.name
+    #store the remapping information which will be needed to subsitute in the module data
+    for imported_file in imported:
+        if imported_file is not None:
+            fullname_with_subpath, content_name = imported_file
+            remap_dict[fullname_with_subpath] = content_name
 
     return remap_dict
 
@@ -197,7 +224,10 @@ def import_from_xml(store, data_dir, course_dirs=None,
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
                                       _namespace_rename, subpath=simport, verbose=verbose)
 
-            # finally loop through all the modules
+            # finally loop through all the modules. Stores which support it get them all in a few
+            # large writes rather than 3 writes per module
+            bulk_write = hasattr(store, 'bulk_write_items')
+            bulk_records = []
             for module in xml_module_store.modules[course_id].itervalues():
                 if module.scope_ids.block_type == 'course':
                     # we've already saved the course module up at the top of the loop
@@ -211,9 +241,21 @@ def import_from_xml(store, data_dir, course_dirs=None,
                 if verbose:
                     log.debug('importing module location {0}'.format(module.location))
 
-                import_module(module, store, course_data_path, static_content_store, course_location,
-                              target_location_namespace if target_location_namespace else course_location,
-                              do_import_static=do_import_static)
+                # static tabs' names have to be copied to the course's tabs (see update_metadata); so,
+                # they're written individually
+                if bulk_write and module.scope_ids.block_type != 'static_tab':
+                    bulk_records.append(_module_import_record(
+                        module, course_location,
+                        target_location_namespace if target_location_namespace else course_location,
+                        do_import_static=do_import_static
+                    ))
+                else:
+                    import_module(module, store, course_data_path, static_content_store, course_location,
+                                  target_location_namespace if target_location_namespace else course_location,
+                                  do_import_static=do_import_static)
+
+            if bulk_records:
+                store.bulk_write_items(bulk_records)
 
             # now import any 'draft' items
             if draft_store is not None:
@@ -235,6 +277,12 @@ def import_from_xml(store, data_dir, course_dirs=None,
                 store.refresh_cached_metadata_inheritance_tree(
                     target_location_namespace if target_location_namespace is not None else course_location
                 )
+            if hasattr(store, 'fire_updated_modulestore_signal') and course_location is not None:
+                # bulk writes don't signal each item; so, signal the import as a whole
+                store.fire_updated_modulestore_signal(
+                    pseudo_course_id,
+                    target_location_namespace if target_location_namespace is not None else course_location
+                )
 
     return xml_module_store, course_items
 
@@ -245,6 +293,26 @@ def import_module(module, store, course_data_path, static_content_store,
 
     logging.debug('processing import of module {0}...'.format(module.location.url()))
 
+    location, module_data, children, metadata = _module_import_record(
+        module, source_course_location, dest_course_location, do_import_static
+    )
+
+    if allow_not_found:
+        store.update_item(location, module_data, allow_not_found=allow_not_found)
+    else:
+        store.update_item(location, module_data)
+
+    if children:
+        store.update_children(location, children)
+
+    store.update_metadata(location, metadata)
+
+
+def _module_import_record(module, source_course_location, dest_course_location, do_import_static=True):
+    """
+    Return the (location, data, children, metadata) to write to the store for the imported module
+    (see import_module and MongoModuleStore.bulk_write_items)
+    """
     content = {}
     for field in module.fields.values():
         if field.scope != Scope.content:
@@ -267,13 +335,7 @@ def import_module(module, store, course_data_path, static_content_store,
         module_data = rewrite_nonportable_content_links(
             source_course_location.course_id, dest_course_location.course_id, module_data)
 
-    if allow_not_found:
-        store.update_item(module.location, module_data, allow_not_found=allow_not_found)
-    else:
-        store.update_item(module.location, module_data)
-
-    if hasattr(module, 'children') and module.children != []:
-        store.update_children(module.location, module.children)
+    children = module.children if hasattr(module, 'children') else []
 
     # NOTE: It's important to use own_metadata here to avoid writing
     # inherited metadata everywhere.
@@ -286,7 +348,7 @@ def import_module(module, store, course_data_path, static_content_store,
         del module.xml_attributes['index_in_children_list']
     module.save()
 
-    store.update_metadata(module.location, dict(own_metadata(module)))
+    return module.location, module_data, children, dict(own_metadata(module))
 
 
 def import_course_draft(xml_module_store, store, draft_store, course_data_path, static_content_store, source_location_namespace, target_location_namespace):
@@ -16,10 +16,11 @@ from lxml import etree
 from pkg_resources import resource_string
 
 from xmodule.x_module import XModule
+from xmodule.fields import CounterDict
 from xmodule.stringify import stringify_children
 from xmodule.mako_module import MakoModuleDescriptor
 from xmodule.xml_module import XmlDescriptor
-from xblock.fields import Scope, String, Dict, Boolean, List
+from xblock.fields import Scope, String, Boolean, List
 
 log = logging.getLogger(__name__)
 
@@ -30,7 +31,7 @@ class PollFields(object):
 
     voted = Boolean(help="Whether this student has voted on the poll", scope=Scope.user_state, default=False)
     poll_answer = String(help="Student answer", scope=Scope.user_state, default='')
-    poll_answers = Dict(help="All possible answers for the poll fro other students", scope=Scope.user_state_summary)
+    poll_answers = CounterDict(help="All possible answers for the poll fro other students", scope=Scope.user_state_summary)
 
     answers = List(help="Poll answers from xml", scope=Scope.content, default=[])
     question = String(help="Poll question", scope=Scope.content, default='')
@@ -57,34 +58,26 @@ class PollModule(PollFields, XModule):
         Returns:
             json string
         """
-        if dispatch in self.poll_answers and not self.voted:
-            # FIXME: fix this, when xblock will support mutable types.
-            # Now we use this hack.
-            temp_poll_answers = self.poll_answers
-            temp_poll_answers[dispatch] += 1
-            self.poll_answers = temp_poll_answers
+        if dispatch in self.get_poll_answers() and not self.voted:
+            self.fields['poll_answers'].increment(self, dispatch)
 
             self.voted = True
             self.poll_answer = dispatch
-            return json.dumps({'poll_answers': self.poll_answers,
-                               'total': sum(self.poll_answers.values()),
+            poll_answers = self.get_poll_answers()
+            return json.dumps({'poll_answers': poll_answers,
+                               'total': sum(poll_answers.values()),
                                'callback': {'objectName': 'Conditional'}
                                })
         elif dispatch == 'get_state':
+            poll_answers = self.get_poll_answers()
             return json.dumps({'poll_answer': self.poll_answer,
-                               'poll_answers': self.poll_answers,
-                               'total': sum(self.poll_answers.values())
+                               'poll_answers': poll_answers,
+                               'total': sum(poll_answers.values())
                                })
         elif dispatch == 'reset_poll' and self.voted and \
                 self.descriptor.xml_attributes.get('reset', 'True').lower() != 'false':
             self.voted = False
-
-            # FIXME: fix this, when xblock will support mutable types.
-            # Now we use this hack.
-            temp_poll_answers = self.poll_answers
-            temp_poll_answers[self.poll_answer] -= 1
-            self.poll_answers = temp_poll_answers
-
+            self.fields['poll_answers'].increment(self, self.poll_answer, -1)
             self.poll_answer = ''
             return json.dumps({'status': 'success'})
         else:  # return error message
@@ -101,37 +94,36 @@ class PollModule(PollFields, XModule):
         self.content = self.system.render_template('poll.html', params)
         return self.content
 
+    def get_poll_answers(self):
+        """Count the votes for each answer.
+
+        Returns:
+            dict - answer id: number of votes, for every answer.
+        """
+        poll_answers = dict((answer['id'], 0) for answer in self.answers)
+        poll_answers.update(self.fields['poll_answers'].counts(self))
+        return poll_answers
+
     def dump_poll(self):
         """Dump poll information.
 
         Returns:
             string - Serialize json.
         """
-        # FIXME: hack for resolving caching `default={}` during definition
-        # poll_answers field
-        if self.poll_answers is None:
-            self.poll_answers = {}
-
         answers_to_json = OrderedDict()
 
-        # FIXME: fix this, when xblock support mutable types.
-        # Now we use this hack.
-        temp_poll_answers = self.poll_answers
-
-         # Fill self.poll_answers, prepare data for template context.
+        # Prepare data for template context.
         for answer in self.answers:
-            # Set default count for answer = 0.
-            if answer['id'] not in temp_poll_answers:
-                temp_poll_answers[answer['id']] = 0
             answers_to_json[answer['id']] = cgi.escape(answer['text'])
-        self.poll_answers = temp_poll_answers
+
+        poll_answers = self.get_poll_answers() if self.voted else {}
 
         return json.dumps({'answers': answers_to_json,
             'question': cgi.escape(self.question),
             # to show answered poll after reload:
             'poll_answer': self.poll_answer,
-            'poll_answers': self.poll_answers if self.voted else {},
-            'total': sum(self.poll_answers.values()) if self.voted else 0,
+            'poll_answers': poll_answers,
+            'total': sum(poll_answers.values()),
             'reset': str(self.descriptor.xml_attributes.get('reset', 'true')).lower()})
 
 
@@ -3,11 +3,14 @@ import logging
 
 from lxml import etree
 
+from webob import Response
+
 from xmodule.mako_module import MakoModuleDescriptor
 from xmodule.xml_module import XmlDescriptor
-from xmodule.x_module import XModule
+from xmodule.x_module import XModule, module_attr
 from xmodule.progress import Progress
 from xmodule.exceptions import NotFoundError
+from xblock.core import XBlock
 from xblock.fields import Integer, Scope
 from xblock.fragment import Fragment
 from pkg_resources import resource_string
@@ -61,24 +64,65 @@ class SequenceModule(SequenceFields, XModule):
             return json.dumps({'success': True})
         raise NotFoundError('Unexpected dispatch type')
 
+    @XBlock.handler
+    def sequence_handler(self, request, suffix=''):
+        '''
+        Handler for the sequence's lazily rendered positions.
+
+        render_position: move to request.POST['position'], as goto_position
+            does, and return the rendered content of that position, along with
+            the html for the JS and CSS resources it needs ('head_html' and
+            'foot_html'), which the page that loaded the sequence may lack.
+        '''
+        if suffix != 'render_position':
+            raise NotFoundError('Unexpected dispatch type')
+
+        items = self.get_display_items()
+        try:
+            position = int(request.POST['position'])
+        except (KeyError, ValueError):
+            raise NotFoundError('Invalid sequence position')
+        if not 1 <= position <= len(items):
+            raise NotFoundError('Invalid sequence position')
+
+        self.position = position
+        fragment = items[position - 1].render('student_view')
+        return Response(
+            json.dumps({
+                'position': position,
+                'content': fragment.content,
+                'head_html': fragment.head_html(),
+                'foot_html': fragment.foot_html(),
+            }),
+            content_type='application/json'
+        )
+
     def student_view(self, context):
         # If we're rendering this sequence, but no position is set yet,
         # default the position to the first element
         if self.position is None:
             self.position = 1
 
+        # If the runtime asks for it, only render the active position.  The
+        # others are fetched through sequence_handler when they're visited.
+        lazy = bool(getattr(self.system, 'lazy_sequence_rendering', False))
+
         ## Returns a set of all types of all sub-children
         contents = []
 
         fragment = Fragment()
 
-        for child in self.get_display_items():
+        for position, child in enumerate(self.get_display_items(), start=1):
             progress = child.get_progress()
-            rendered_child = child.render('student_view', context)
-            fragment.add_frag_resources(rendered_child)
+            if lazy and position != self.position:
+                content = None
+            else:
+                rendered_child = child.render('student_view', context)
+                fragment.add_frag_resources(rendered_child)
+                content = rendered_child.content
 
             childinfo = {
-                'content': rendered_child.content,
+                'content': content,
                 'title': "\n".join(
                     grand_child.display_name
                     for grand_child in child.get_children()
@@ -99,6 +143,7 @@ class SequenceModule(SequenceFields, XModule):
                   'position': self.position,
                   'tag': self.location.category,
                   'ajax_url': self.system.ajax_url,
+                  'render_url': self.system.handler_url(self, 'sequence_handler', 'render_position').rstrip('/?'),
                   }
 
         fragment.add_content(self.system.render_template('seq_module.html', params))
@@ -122,6 +167,8 @@ class SequenceDescriptor(SequenceFields, MakoModuleDescriptor, XmlDescriptor):
     js = {'coffee': [resource_string(__name__, 'js/src/sequence/edit.coffee')]}
     js_module_name = "SequenceDescriptor"
 
+    sequence_handler = module_attr('sequence_handler')
+
     @classmethod
     def definition_from_xml(cls, xml_object, system):
         children = []
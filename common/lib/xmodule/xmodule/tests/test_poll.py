@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 """Test for Poll Xmodule functional logic."""
+from mock import Mock
+
 from xmodule.poll_module import PollDescriptor
 from . import LogicTest
 
@@ -30,3 +32,17 @@ class PollModuleTest(LogicTest):
         self.assertEqual(total, 2)
         self.assertDictEqual(callback, {'objectName': 'Conditional'})
         self.assertEqual(self.xmodule.poll_answer, 'No')
+
+    def test_summary_counters(self):
+        # With the runtime's summary counters, votes are added to them, and
+        # poll_answers itself isn't rewritten.
+        self.system.summary_counters = Mock()
+        self.system.summary_counters.get.return_value = {'No': 3}
+        response = self.ajax_request('No', {})
+
+        self.system.summary_counters.increment.assert_called_with(
+            self.xmodule.scope_ids.usage_id, 'poll_answers', {'No': 1}
+        )
+        self.assertDictEqual(response['poll_answers'], {'Yes': 1, 'Dont_know': 0, 'No': 3})
+        self.assertEqual(response['total'], 4)
+        self.assertDictEqual(self.xmodule.poll_answers, {'Yes': 1, 'Dont_know': 0, 'No': 0})
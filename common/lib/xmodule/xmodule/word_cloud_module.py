@@ -13,6 +13,7 @@ from pkg_resources import resource_string
 from xmodule.raw_module import EmptyDataRawDescriptor
 from xmodule.editing_module import MetadataOnlyEditingDescriptor
 from xmodule.x_module import XModule
+from xmodule.fields import CounterDict
 
 from xblock.fields import Scope, Dict, Boolean, List, Integer, String
 
@@ -69,10 +70,11 @@ class WordCloudFields(object):
         scope=Scope.user_state,
         default=[]
     )
-    all_words = Dict(
+    all_words = CounterDict(
         help="All possible words from all students.",
         scope=Scope.user_state_summary
     )
+    # No longer written: the top words are worked out from all_words.
     top_words = Dict(
         help="Top num_top_words words for word cloud.",
         scope=Scope.user_state_summary
@@ -95,7 +97,8 @@ class WordCloudModule(WordCloudFields, XModule):
     def get_state(self):
         """Return success json answer for client."""
         if self.submitted:
-            total_count = sum(self.all_words.itervalues())
+            all_words = self.fields['all_words'].counts(self)
+            total_count = sum(all_words.itervalues())
             return json.dumps({
                 'status': 'success',
                 'submitted': True,
@@ -103,10 +106,13 @@ class WordCloudModule(WordCloudFields, XModule):
                     self.display_student_percents
                 ),
                 'student_words': {
-                    word: self.all_words[word] for word in self.student_words
+                    word: all_words.get(word, 0) for word in self.student_words
                 },
                 'total_count': total_count,
-                'top_words': self.prepare_words(self.top_words, total_count)
+                'top_words': self.prepare_words(
+                    self.top_dict(all_words, self.num_top_words),
+                    total_count
+                )
             })
         else:
             return json.dumps({
@@ -198,25 +204,13 @@ class WordCloudModule(WordCloudFields, XModule):
 
             self.student_words = student_words
 
-            # FIXME: fix this, when xblock will support mutable types.
-            # Now we use this hack.
-            # speed issues
-            temp_all_words = self.all_words
-
             self.submitted = True
 
             # Save in all_words.
+            word_counts = {}
             for word in self.student_words:
-                temp_all_words[word] = temp_all_words.get(word, 0) + 1
-
-            # Update top_words.
-            self.top_words = self.top_dict(
-                temp_all_words,
-                self.num_top_words
-            )
-
-            # Save all_words in database.
-            self.all_words = temp_all_words
+                word_counts[word] = word_counts.get(word, 0) + 1
+            self.fields['all_words'].increment_many(self, word_counts)
 
             return self.get_state()
         elif dispatch == 'get_state':
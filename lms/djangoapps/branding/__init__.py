@@ -20,14 +20,41 @@ def get_visible_courses(domain=None):
                if isinstance(c, CourseDescriptor)]
     courses = sorted(courses, key=lambda course: course.number)
 
-    if domain and settings.FEATURES.get('SUBDOMAIN_COURSE_LISTINGS'):
-        subdomain = pick_subdomain(domain, settings.COURSE_LISTINGS.keys())
-        visible_ids = frozenset(settings.COURSE_LISTINGS[subdomain])
-        return [course for course in courses if course.id in visible_ids]
+    listed_ids = _listed_course_ids(domain)
+    if listed_ids is not None:
+        return [course for course in courses if course.id in listed_ids]
     else:
         return courses
 
 
+def get_visible_course_ids(domain=None):
+    """
+    Return the ids of the courses that should be visible in this branded instance,
+    without loading the courses, or None if the modulestore can't list them.
+    """
+    store = modulestore()
+    course_ids = store.get_course_ids() if hasattr(store, 'get_course_ids') else None
+    if course_ids is None:
+        return None
+
+    listed_ids = _listed_course_ids(domain)
+    if listed_ids is not None:
+        return [course_id for course_id in course_ids if course_id in listed_ids]
+    else:
+        return course_ids
+
+
+def _listed_course_ids(domain):
+    """
+    Return the ids of the courses listed for the subdomain of domain, or None if
+    course listings don't depend on the subdomain.
+    """
+    if domain and settings.FEATURES.get('SUBDOMAIN_COURSE_LISTINGS'):
+        subdomain = pick_subdomain(domain, settings.COURSE_LISTINGS.keys())
+        return frozenset(settings.COURSE_LISTINGS[subdomain])
+    return None
+
+
 def get_university(domain=None):
     """
     Return the university name specified for the domain, or None
@@ -242,6 +242,19 @@ class CourseAuthorization(models.Model):
         except cls.DoesNotExist:
             return False
 
+    @classmethod
+    def instructor_email_enabled_for(cls, course_ids):
+        """
+        Returns the set of the given course ids that email is enabled for,
+        looking all of them up with a single query.
+        """
+        if not settings.FEATURES['REQUIRE_COURSE_EMAIL_AUTH']:
+            return set(course_ids)
+
+        return set(
+            cls.objects.filter(course_id__in=course_ids, email_enabled=True).values_list('course_id', flat=True)
+        )
+
     def __unicode__(self):
         not_en = "Not "
         if self.email_enabled:
@@ -16,6 +16,7 @@ from xmodule.x_module import XModule, XModuleDescriptor
 from student.models import CourseEnrollmentAllowed
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import is_masquerading_as_student
+from courseware.models import CourseOverview
 from django.utils.timezone import UTC
 from student.models import CourseEnrollment
 from courseware.roles import (
@@ -46,8 +47,8 @@ def has_access(user, obj, action, course_context=None):
 
     user: a Django user object. May be anonymous.
 
-    obj: The object to check access for.  A module, descriptor, location, or
-                    certain special strings (e.g. 'global')
+    obj: The object to check access for.  A module, descriptor, course overview,
+                    location, or certain special strings (e.g. 'global')
 
     action: A string specifying the action that the client is trying to perform.
 
@@ -66,6 +67,10 @@ def has_access(user, obj, action, course_context=None):
     if isinstance(obj, CourseDescriptor):
         return _has_access_course_desc(user, obj, action)
 
+    # Overviews have the attributes the course checks use
+    if isinstance(obj, CourseOverview):
+        return _has_access_course_desc(user, obj, action)
+
     if isinstance(obj, ErrorDescriptor):
         return _has_access_error_desc(user, obj, action, course_context)
 
@@ -7,13 +7,15 @@ import re
 from path import path
 from django.http import Http404
 from django.conf import settings
+from django.db import IntegrityError, transaction
 from .module_render import get_module
 from xmodule.course_module import CourseDescriptor
 from xmodule.modulestore import Location, XML_MODULESTORE_TYPE
-from xmodule.modulestore.django import modulestore, loc_mapper
+from xmodule.modulestore.django import modulestore, loc_mapper, get_course_versions
 from xmodule.contentstore.content import StaticContent
 from xmodule.modulestore.exceptions import ItemNotFoundError, InvalidLocationError
 from courseware.model_data import FieldDataCache
+from courseware.models import CourseOverview
 from static_replace import replace_static_urls
 from courseware.access import has_access
 import branding
@@ -103,6 +105,8 @@ def get_opt_course_with_access(user, course_id, action):
 def course_image_url(course):
     """Try to look up the image url for the course.  If it's not found,
     log an error and return the dead link"""
+    if isinstance(course, CourseOverview):
+        return course.course_image_url
     if course.static_asset_path or modulestore().get_modulestore_type(course.location.course_id) == XML_MODULESTORE_TYPE:
         return '/static/' + (course.static_asset_path or getattr(course, 'data_dir', '')) + "/images/course_image.jpg"
     else:
@@ -294,7 +298,13 @@ def get_courses(user, domain=None):
     '''
     Returns a list of courses available, sorted by course.number
     '''
-    courses = branding.get_visible_courses(domain)
+    courses = None
+    if settings.FEATURES.get('ENABLE_COURSE_OVERVIEWS'):
+        course_ids = branding.get_visible_course_ids(domain)
+        if course_ids is not None:
+            courses = get_course_overviews(course_ids)
+    if courses is None:
+        courses = branding.get_visible_courses(domain)
     courses = [c for c in courses if has_access(user, c, 'see_exists')]
 
     courses = sorted(courses, key=lambda course: course.number)
@@ -302,6 +312,103 @@ def get_courses(user, domain=None):
     return courses
 
 
+def get_course_overviews(course_ids):
+    '''
+    Returns the CourseOverviews of the courses with the given ids, in the same
+    order.  Overviews that are missing or were built from an older version of
+    their course are rebuilt from the course descriptors, which are loaded all at
+    once.  Courses that don't exist or failed to load are left out.
+
+    XML courses never get a new version when their files change, so their
+    overviews are built from the (already loaded) descriptors every time, and
+    never stored.
+    '''
+    store = modulestore()
+    xml_ids = set(
+        course_id for course_id in course_ids
+        if store.get_modulestore_type(course_id) == XML_MODULESTORE_TYPE
+    )
+    stored_ids = [course_id for course_id in course_ids if course_id not in xml_ids]
+    versions = get_course_versions(stored_ids)
+    overviews = dict(
+        (overview.course_id, overview)
+        for overview in CourseOverview.objects.filter(course_id__in=stored_ids)
+    )
+    stale_ids = [
+        course_id for course_id in stored_ids
+        if course_id not in overviews or overviews[course_id].course_version != versions[course_id]
+    ]
+
+    if stale_ids or xml_ids:
+        for course_id, course in store.get_courses_by_id(stale_ids + list(xml_ids)).items():
+            if not isinstance(course, CourseDescriptor):
+                continue
+            if course_id in xml_ids:
+                overviews[course_id] = _course_overview(course, '')
+                continue
+            overview = _course_overview(course, versions[course_id])
+            if course_id in overviews:
+                # Update the stored row in place, so that it keeps its `created` date
+                overviews[course_id] = _update_course_overview(overviews[course_id], overview)
+                continue
+            sid = transaction.savepoint()
+            try:
+                overview.save(force_insert=True)
+                transaction.savepoint_commit(sid)
+            except IntegrityError:
+                # Another request created it in the meantime
+                transaction.savepoint_rollback(sid)
+                overview = _update_course_overview(CourseOverview.objects.get(course_id=course_id), overview)
+            overviews[course_id] = overview
+
+    return [overviews[course_id] for course_id in course_ids if course_id in overviews]
+
+
+def _update_course_overview(stored, rebuilt):
+    '''
+    Copies the values of the unsaved CourseOverview `rebuilt` onto the stored
+    CourseOverview `stored` of the same course, saves it and returns it.
+    '''
+    for field in CourseOverview._meta.fields:  # pylint: disable=protected-access
+        if field.attname not in ('course_id', 'created', 'modified'):
+            setattr(stored, field.attname, getattr(rebuilt, field.attname))
+    stored.save()
+    return stored
+
+
+def _course_overview(course, course_version):
+    '''
+    Returns an unsaved CourseOverview of the course descriptor `course`.
+    '''
+    announcement, sorting_start, _now = course._sorting_dates()  # pylint: disable=protected-access
+    is_new = course.is_new
+    if isinstance(is_new, basestring):
+        is_new = is_new.lower() in ['true', 'yes', 'y']
+    elif is_new is not None:
+        is_new = bool(is_new)
+
+    return CourseOverview(
+        course_id=course.id,
+        course_version=course_version,
+        display_name_with_default=course.display_name_with_default,
+        display_number_with_default=course.display_number_with_default,
+        display_org_with_default=course.display_org_with_default,
+        start_date_text=course.start_date_text,
+        course_image_url=course_image_url(course),
+        static_asset_path=course.static_asset_path or '',
+        start=course.start,
+        end=course.end,
+        enrollment_start=course.enrollment_start,
+        enrollment_end=course.enrollment_end,
+        announcement=announcement,
+        sorting_start=sorting_start,
+        is_new=is_new,
+        ispublic=course.ispublic,
+        days_early_for_beta=course.days_early_for_beta,
+        enrollment_domain=course.enrollment_domain,
+    )
+
+
 def sort_by_announcement(courses):
     """
     Sorts a list of courses by their announcement date. If the date is
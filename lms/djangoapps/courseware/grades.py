@@ -1,13 +1,13 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 from collections import defaultdict
+import json
 import random
 import logging
 
 from contextlib import contextmanager
 from collections import defaultdict
 from django.conf import settings
-from django.contrib.auth.models import User
 from django.db import transaction
 from django.test.client import RequestFactory
 
@@ -17,14 +17,57 @@ from courseware import courses
 from courseware.model_data import FieldDataCache
 from xblock.fields import Scope
 from xmodule import graders
-from xmodule.capa_module import CapaModule
+from xmodule.capa_module import CapaModule, CapaDescriptor
 from xmodule.graders import Score
-from .models import StudentModule
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import get_course_version, get_grading_skeleton, modulestore
+from .models import StudentModule, PersistentCourseGrade
 from .module_render import get_module, get_module_for_descriptor
 
 log = logging.getLogger("edx.courseware")
 
 
+class ScoresCache(object):
+    """
+    An in-memory table of a student's scores for a single course.
+
+    All of the student's StudentModule grade/max_grade values for the course
+    are loaded with a single query, so that scoring a course doesn't need one
+    query per problem. The (potentially large) `state` column is never loaded.
+    """
+    def __init__(self, course_id, student):
+        self.course_id = course_id
+        self.scores = {}
+        if student.is_authenticated():
+            rows = StudentModule.objects.filter(
+                student=student,
+                course_id=course_id,
+            ).values_list('module_state_key', 'grade', 'max_grade')
+            self.scores = dict(
+                (module_state_key, (grade, max_grade))
+                for module_state_key, grade, max_grade in rows
+            )
+
+    def get(self, location):
+        """
+        Return a (grade, max_grade) tuple for the module at `location`, or None
+        if the student has no StudentModule for it.
+        """
+        return self.scores.get(location.url())
+
+    def has_any(self, locations):
+        """
+        Return True if the student has a StudentModule for any of `locations`.
+        """
+        return self.has_any_url(location.url() for location in locations)
+
+    def has_any_url(self, urls):
+        """
+        Return True if the student has a StudentModule for any of the location `urls`.
+        """
+        return any(url in self.scores for url in urls)
+
+
 def yield_module_descendents(module):
     stack = module.get_display_items()
     stack.reverse()
@@ -58,30 +101,50 @@ def yield_dynamic_descriptor_descendents(descriptor, module_creator):
         yield next_descriptor
 
 
+def get_graded_section_descriptor(course, section_location):
+    """
+    Return the descriptor of the graded section whose url is section_location,
+    with its whole subtree loaded.  Each section is loaded from the modulestore
+    at most once per course object, so grading a batch of students with the same
+    course reuses them, and not at all if the course's grading_context, which
+    holds them already, has been computed.
+    """
+    section_descriptors = getattr(course, '_graded_section_descriptors', None)
+    if section_descriptors is None:
+        section_descriptors = {}
+        # lazy keeps grading_context in the instance's __dict__ once it is computed
+        if 'grading_context' in course.__dict__:
+            for sections in course.grading_context['graded_sections'].itervalues():
+                for section in sections:
+                    descriptor = section['section_descriptor']
+                    section_descriptors[descriptor.location.url()] = descriptor
+        course._graded_section_descriptors = section_descriptors
+
+    if section_location not in section_descriptors:
+        section_descriptors[section_location] = modulestore().get_instance(
+            course.id, Location(section_location), depth=None
+        )
+    return section_descriptors[section_location]
+
+
 def yield_problems(request, course, student):
     """
     Return an iterator over capa_modules that this student has
     potentially answered.  (all that student has answered will definitely be in
     the list, but there may be others as well).
     """
-    grading_context = course.grading_context
+    grading_skeleton = get_grading_skeleton(course)
 
-    descriptor_locations = (descriptor.location.url() for descriptor in grading_context['all_descriptors'])
     existing_student_modules = set(StudentModule.objects.filter(
-        module_state_key__in=descriptor_locations
+        module_state_key__in=grading_skeleton['all_locations']
     ).values_list('module_state_key', flat=True))
 
     sections_to_list = []
-    for _, sections in grading_context['graded_sections'].iteritems():
+    for _, sections in grading_skeleton['graded_sections'].iteritems():
         for section in sections:
-
-            section_descriptor = section['section_descriptor']
-
             # If the student hasn't seen a single problem in the section, skip it.
-            for moduledescriptor in section['xmoduledescriptors']:
-                if moduledescriptor.location.url() in existing_student_modules:
-                    sections_to_list.append(section_descriptor)
-                    break
+            if any(scorable['location'] in existing_student_modules for scorable in section['scorable']):
+                sections_to_list.append(get_graded_section_descriptor(course, section['section_location']))
 
     field_data_cache = FieldDataCache(sections_to_list, course.id, student)
     for section_descriptor in sections_to_list:
@@ -100,7 +163,14 @@ def yield_problems(request, course, student):
                 yield problem
 
 
-def answer_distributions(request, course):
+# Number of StudentModule rows fetched per query when computing answer distributions
+ANSWER_DISTRIBUTION_BATCH_SIZE = 1000
+
+# How the student_answers key appears in a JSON-serialized capa module state
+STUDENT_ANSWERS_JSON_KEY = '"student_answers":'
+
+
+def answer_distributions(_request, course):
     """
     Given a course_descriptor, compute frequencies of answers for each problem:
 
@@ -108,35 +178,161 @@ def answer_distributions(request, course):
 
     dict: (problem url_name, problem display_name, problem_id) -> (dict : answer ->  count)
 
-    TODO (vshnayder): this is currently doing a full linear pass through all
-    students and all problems.  This will be just a little slow.
+    The answers are read directly from the stored state of every capa problem
+    in the graded sections of the course, without instantiating any modules.
     """
-
     counts = defaultdict(lambda: defaultdict(int))
 
-    enrolled_students = User.objects.filter(courseenrollment__course_id=course.id)
+    problems = {}
+    for sections in course.grading_context['graded_sections'].itervalues():
+        for section in sections:
+            for descriptor in section['xmoduledescriptors']:
+                if isinstance(descriptor, CapaDescriptor):
+                    problems[descriptor.location.url()] = (
+                        descriptor.url_name, descriptor.display_name_with_default
+                    )
+
+    for module_state_key, state in _iter_problem_states(course.id):
+        problem = problems.get(module_state_key)
+        if problem is None:
+            continue
 
-    for student in enrolled_students:
-        for capa_module in yield_problems(request, course, student):
-            for problem_id in capa_module.lcp.student_answers:
-                # Answer can be a list or some other unhashable element.  Convert to string.
-                answer = str(capa_module.lcp.student_answers[problem_id])
-                key = (capa_module.url_name, capa_module.display_name_with_default, problem_id)
-                counts[key][answer] += 1
+        for problem_id, answer in _decode_student_answers(state).iteritems():
+            # Answer can be a list or some other unhashable element.  Convert to string.
+            counts[problem + (problem_id,)][unicode(answer)] += 1
 
     return counts
 
 
+def _iter_problem_states(course_id, batch_size=ANSWER_DISTRIBUTION_BATCH_SIZE):
+    """
+    Yield (module_state_key, state) for every problem StudentModule of the
+    students enrolled in `course_id`.
+
+    Rows are fetched `batch_size` at a time, in primary key order, so that the
+    whole table is never held in memory.
+    """
+    problem_modules = StudentModule.objects.filter(
+        course_id=course_id,
+        module_type='problem',
+        student__courseenrollment__course_id=course_id,
+    ).order_by('pk')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            problem_modules.filter(pk__gt=last_pk).values_list('pk', 'module_state_key', 'state')[:batch_size]
+        )
+        if not batch:
+            return
+        for _, module_state_key, state in batch:
+            yield module_state_key, state
+        last_pk = batch[-1][0]
+
+
+def _decode_student_answers(state):
+    """
+    Return the student_answers dict from a capa module's JSON `state`.
+
+    Only the student_answers value is decoded, since the rest of the state
+    (e.g. the correct_map) can be much larger.
+    """
+    if not state:
+        return {}
+
+    index = state.find(STUDENT_ANSWERS_JSON_KEY)
+    if index == -1:
+        return {}
+
+    value_start = index + len(STUDENT_ANSWERS_JSON_KEY)
+    while value_start < len(state) and state[value_start].isspace():
+        value_start += 1
+
+    try:
+        student_answers, _ = json.JSONDecoder().raw_decode(state, value_start)
+    except ValueError:
+        try:
+            student_answers = json.loads(state).get('student_answers')
+        except ValueError:
+            log.warning("Unable to decode problem state %r", state[:100])
+            return {}
+
+    return student_answers if isinstance(student_answers, dict) else {}
+
+
 @transaction.commit_manually
 def grade(student, request, course, keep_raw_scores=False):
     """
     Wraps "_grade" with the manual_transaction context manager just in case
     there are unanticipated errors.
+
+    If the ENABLE_PERSISTENT_GRADES feature is on, a stored gradeset is
+    returned when it is still current, and recomputed and stored otherwise.
+    Courses with modules that must always be regraded are always recomputed.
     """
     with manual_transaction():
+        if settings.FEATURES.get('ENABLE_PERSISTENT_GRADES') and student.is_authenticated() and \
+                not _always_recalculate_grades(course):
+            return _persistent_grade(student, request, course, keep_raw_scores)
         return _grade(student, request, course, keep_raw_scores)
 
 
+def _always_recalculate_grades(course):
+    """
+    Return True if any graded section of the course has a module whose score
+    changes outside of StudentModule saves (e.g. foldit or combinedopenended),
+    so that a stored gradeset could be stale without being invalidated.
+    """
+    return any(
+        section['always_recalculate_grades']
+        for sections in get_grading_skeleton(course)['graded_sections'].itervalues()
+        for section in sections
+    )
+
+
+def _persistent_grade(student, request, course, keep_raw_scores):
+    """
+    Return the stored gradeset for this student in this course, recomputing
+    and storing it first if it is missing or stale.
+
+    Raw scores are always stored, so that the same row serves callers with
+    and without `keep_raw_scores`.
+    """
+    course_version = get_course_version(course.id)
+    stored_grade, _ = PersistentCourseGrade.objects.get_or_create(user=student, course_id=course.id)
+
+    if stored_grade.is_current(course_version):
+        grade_summary = _load_gradeset(stored_grade.gradeset)
+    else:
+        # Remember which scores we are grading, so that a score change while
+        # we compute leaves the stored row stale
+        score_version = stored_grade.score_version
+        grade_summary = _grade(student, request, course, keep_raw_scores=True)
+        PersistentCourseGrade.objects.filter(pk=stored_grade.pk).update(
+            course_version=course_version,
+            computed_score_version=score_version,
+            gradeset=json.dumps(grade_summary),
+        )
+
+    if not keep_raw_scores:
+        grade_summary.pop('raw_scores', None)
+    return grade_summary
+
+
+def _load_gradeset(serialized_gradeset):
+    """
+    Deserialize a gradeset stored by _persistent_grade, turning the scores
+    (stored as JSON lists) back into Score tuples.
+    """
+    grade_summary = json.loads(serialized_gradeset)
+    grade_summary['totaled_scores'] = dict(
+        (section_format, [Score(*score) for score in scores])
+        for section_format, scores in grade_summary['totaled_scores'].iteritems()
+    )
+    grade_summary['raw_scores'] = [Score(*score) for score in grade_summary.get('raw_scores', [])]
+    return grade_summary
+
+
 def _grade(student, request, course, keep_raw_scores):
     """
     Unwrapped version of "grade"
@@ -158,36 +354,34 @@ def _grade(student, request, course, keep_raw_scores):
 
     More information on the format is in the docstring for CourseGrader.
     """
-    grading_context = course.grading_context
+    # Only the sections that need grading are loaded from the modulestore
+    grading_skeleton = get_grading_skeleton(course)
     raw_scores = []
 
+    with manual_transaction():
+        scores_cache = ScoresCache(course.id, student)
+
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
     # passed to the grader
-    for section_format, sections in grading_context['graded_sections'].iteritems():
+    for section_format, sections in grading_skeleton['graded_sections'].iteritems():
         format_scores = []
         for section in sections:
-            section_descriptor = section['section_descriptor']
-            section_name = section_descriptor.display_name_with_default
+            section_name = section['display_name']
 
             # some problems have state that is updated independently of interaction
             # with the LMS, so they need to always be scored. (E.g. foldit.,
             # combinedopenended)
-            should_grade_section = any(
-                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-            )
+            should_grade_section = section['always_recalculate_grades']
 
             # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
             if not should_grade_section:
-                with manual_transaction():
-                    should_grade_section = StudentModule.objects.filter(
-                        student=student,
-                        module_state_key__in=[
-                            descriptor.location for descriptor in section['xmoduledescriptors']
-                        ]
-                    ).exists()
+                should_grade_section = scores_cache.has_any_url(
+                    scorable['location'] for scorable in section['scorable']
+                )
 
             if should_grade_section:
+                section_descriptor = get_graded_section_descriptor(course, section['section_location'])
                 scores = []
 
                 def create_module(descriptor):
@@ -200,7 +394,9 @@ def _grade(student, request, course, keep_raw_scores):
 
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
 
-                    (correct, total) = get_score(course.id, student, module_descriptor, create_module)
+                    (correct, total) = get_score(
+                        course.id, student, module_descriptor, create_module, scores_cache=scores_cache
+                    )
                     if correct is None and total is None:
                         continue
 
@@ -228,7 +424,7 @@ def _grade(student, request, course, keep_raw_scores):
                 format_scores.append(graded_total)
             else:
                 log.exception("Unable to grade a section with a total possible score of zero. " +
-                              str(section_descriptor.location))
+                              section['section_location'])
 
         totaled_scores[section_format] = format_scores
 
@@ -314,6 +510,8 @@ def _progress_summary(student, request, course):
             # This student must not have access to the course.
             return None
 
+        scores_cache = ScoresCache(course.id, student)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -336,7 +534,9 @@ def _progress_summary(student, request, course):
 
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
                     course_id = course.id
-                    (correct, total) = get_score(course_id, student, module_descriptor, module_creator)
+                    (correct, total) = get_score(
+                        course_id, student, module_descriptor, module_creator, scores_cache=scores_cache
+                    )
                     if correct is None and total is None:
                         continue
 
@@ -366,7 +566,8 @@ def _progress_summary(student, request, course):
 
     return chapters
 
-def get_score(course_id, user, problem_descriptor, module_creator):
+
+def get_score(course_id, user, problem_descriptor, module_creator, scores_cache=None):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
     e.g. (5,7) if you got 5 out of 7 points.
@@ -378,7 +579,8 @@ def get_score(course_id, user, problem_descriptor, module_creator):
     problem_descriptor: an XModuleDescriptor
     module_creator: a function that takes a descriptor, and returns the corresponding XModule for this user.
            Can return None if user doesn't have access, or if something else went wrong.
-    cache: A FieldDataCache
+    scores_cache: An optional ScoresCache for this user and course. If given, the
+           score is read from it instead of querying the StudentModule table.
     """
     if not user.is_authenticated():
         return (None, None)
@@ -399,18 +601,23 @@ def get_score(course_id, user, problem_descriptor, module_creator):
         # These are not problems, and do not have a score
         return (None, None)
 
-    try:
-        student_module = StudentModule.objects.get(
-            student=user,
-            course_id=course_id,
-            module_state_key=problem_descriptor.location
-        )
-    except StudentModule.DoesNotExist:
-        student_module = None
-
-    if student_module is not None and student_module.max_grade is not None:
-        correct = student_module.grade if student_module.grade is not None else 0
-        total = student_module.max_grade
+    if scores_cache is not None:
+        cached_score = scores_cache.get(problem_descriptor.location)
+    else:
+        try:
+            student_module = StudentModule.objects.get(
+                student=user,
+                course_id=course_id,
+                module_state_key=problem_descriptor.location
+            )
+            cached_score = (student_module.grade, student_module.max_grade)
+        except StudentModule.DoesNotExist:
+            cached_score = None
+
+    if cached_score is not None and cached_score[1] is not None:
+        grade, max_grade = cached_score
+        correct = grade if grade is not None else 0
+        total = max_grade
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
         # we need to instantiate the problem.
@@ -431,7 +638,7 @@ def get_score(course_id, user, problem_descriptor, module_creator):
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location))
             return (correct, total)
         correct = correct * weight / total
         total = weight
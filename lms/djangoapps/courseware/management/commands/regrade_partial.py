@@ -10,7 +10,7 @@ from optparse import make_option
 
 from django.core.management.base import BaseCommand
 
-from courseware.models import StudentModule
+from courseware.models import StudentModule, PersistentCourseGrade
 from capa.correctmap import CorrectMap
 
 LOG = logging.getLogger(__name__)
@@ -101,6 +101,8 @@ class Command(BaseCommand):
                                                     student=module.student.username, course_id=module.course_id))
             module.grade = correct
             module.save()
+            # The student's stored course grade no longer reflects this score
+            PersistentCourseGrade.invalidate(module.student_id, module.course_id)
             self.num_changed += 1
         else:
             # don't make the change, but log that the change would be made
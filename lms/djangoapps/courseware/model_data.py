@@ -2,19 +2,26 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
 import json
+import random
+import time
 from collections import defaultdict
+from contextlib import contextmanager
 from itertools import chain
 from .models import (
     StudentModule,
     XModuleUserStateSummaryField,
+    XModuleUserStateSummaryCounter,
     XModuleStudentPrefsField,
     XModuleStudentInfoField
 )
 import logging
 
-from django.db import DatabaseError
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
+from dogapi import dog_stats_api
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -61,6 +68,13 @@ class FieldDataCache(object):
         self.select_for_update = select_for_update
         self.course_id = course_id
         self.user = user
+        # Maps module_state_key -> (serialized state, decoded state) for the
+        # StudentModules in this cache, so that state is only decoded once
+        self._decoded_states = {}
+        # Maps cache keys -> (KeyValueStore key, unsaved model object) for the
+        # rows built by find_or_build that haven't been written yet
+        self._pending_creates = {}
+        self._batch_depth = 0
 
         if user.is_authenticated():
             for scope, fields in self._fields_to_cache().items():
@@ -217,6 +231,50 @@ class FieldDataCache(object):
         '''
         return self.cache.get(self._cache_key_from_kvs_key(key))
 
+    def _user_for_key(self, key):
+        """
+        Return the User that owns the data for the KeyValueStore key `key`
+        """
+        if key.user_id == self.user.id:
+            return self.user
+        return User.objects.get(id=key.user_id)
+
+    def _lookup_for_key(self, key):
+        """
+        Return (model class, lookup kwargs, default kwargs) for the row that
+        stores the data for the KeyValueStore key `key`
+        """
+        if key.scope.user == UserScope.ONE and not self.user.is_anonymous():
+            # If we're getting user data, we expect that the key matches the
+            # user we were constructed for.
+            assert key.user_id == self.user.id
+
+        if key.scope == Scope.user_state:
+            return StudentModule, {
+                'course_id': self.course_id,
+                'student': self._user_for_key(key),
+                'module_state_key': key.block_scope_id.url(),
+            }, {
+                'state': json.dumps({}),
+                'module_type': key.block_scope_id.category,
+            }
+        elif key.scope == Scope.user_state_summary:
+            return XModuleUserStateSummaryField, {
+                'field_name': key.field_name,
+                'usage_id': key.block_scope_id.url(),
+            }, {}
+        elif key.scope == Scope.preferences:
+            return XModuleStudentPrefsField, {
+                'field_name': key.field_name,
+                'module_type': key.block_scope_id,
+                'student': self._user_for_key(key),
+            }, {}
+        elif key.scope == Scope.user_info:
+            return XModuleStudentInfoField, {
+                'field_name': key.field_name,
+                'student': self._user_for_key(key),
+            }, {}
+
     def find_or_create(self, key):
         '''
         Find a model data object in this cache, or create it if it doesn't
@@ -227,41 +285,186 @@ class FieldDataCache(object):
         if field_object is not None:
             return field_object
 
-        if key.scope.user == UserScope.ONE and not self.user.is_anonymous():
-            # If we're getting user data, we expect that the key matches the
-            # user we were constructed for.
-            assert key.user_id == self.user.id
+        model_class, lookup, defaults = self._lookup_for_key(key)
+        field_object, _ = model_class.objects.get_or_create(defaults=defaults, **lookup)
 
-        if key.scope == Scope.user_state:
-            field_object, _ = StudentModule.objects.get_or_create(
+        cache_key = self._cache_key_from_kvs_key(key)
+        self.cache[cache_key] = field_object
+        return field_object
+
+    def find_or_build(self, key):
+        '''
+        Find a model data object in this cache, or build a new one if it doesn't
+        exist.
+
+        New objects are not saved: they are written by `create_pending`, together
+        with every other object built since the last call.
+        '''
+        field_object = self.find(key)
+
+        if field_object is not None:
+            return field_object
+
+        model_class, lookup, defaults = self._lookup_for_key(key)
+        field_object = model_class(**dict(lookup, **defaults))
+
+        cache_key = self._cache_key_from_kvs_key(key)
+        self.cache[cache_key] = field_object
+        self._pending_creates[cache_key] = (key, field_object)
+        return field_object
+
+    def is_pending(self, field_object):
+        """
+        Return whether `field_object` was built by `find_or_build` and is still
+        waiting to be written by `create_pending`
+        """
+        return any(pending is field_object for _, pending in self._pending_creates.values())
+
+    def discard_pending(self, key):
+        """
+        Forget the unsaved object built for the KeyValueStore key `key`
+        """
+        cache_key = self._cache_key_from_kvs_key(key)
+        del self._pending_creates[cache_key]
+        del self.cache[cache_key]
+
+    @property
+    def batching_creates(self):
+        """
+        True while inside a `batched_creates` block
+        """
+        return self._batch_depth > 0
+
+    @contextmanager
+    def batched_creates(self):
+        """
+        Delay writing the objects built by `find_or_build` until the end of the
+        block, so that the rows needed by all of the modules rendered inside it
+        are inserted with one query per model.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+        if not self.batching_creates:
+            self.create_pending()
+
+    def _retrieve_created(self, scope, field_objects):
+        """
+        Queries the database for the rows of the newly inserted `field_objects`
+        in the specified scope
+        """
+        if scope == Scope.user_state:
+            return self._query(
+                StudentModule,
                 course_id=self.course_id,
-                student=User.objects.get(id=key.user_id),
-                module_state_key=key.block_scope_id.url(),
-                defaults={
-                    'state': json.dumps({}),
-                    'module_type': key.block_scope_id.category,
-                },
+                student=self.user.pk,
+                module_state_key__in=[field_object.module_state_key for field_object in field_objects],
             )
-        elif key.scope == Scope.user_state_summary:
-            field_object, _ = XModuleUserStateSummaryField.objects.get_or_create(
-                field_name=key.field_name,
-                usage_id=key.block_scope_id.url()
+        elif scope == Scope.user_state_summary:
+            return self._query(
+                XModuleUserStateSummaryField,
+                usage_id__in=set(field_object.usage_id for field_object in field_objects),
+                field_name__in=set(field_object.field_name for field_object in field_objects),
             )
-        elif key.scope == Scope.preferences:
-            field_object, _ = XModuleStudentPrefsField.objects.get_or_create(
-                field_name=key.field_name,
-                module_type=key.block_scope_id,
-                student=User.objects.get(id=key.user_id),
+        elif scope == Scope.preferences:
+            return self._query(
+                XModuleStudentPrefsField,
+                student=self.user.pk,
+                module_type__in=set(field_object.module_type for field_object in field_objects),
+                field_name__in=set(field_object.field_name for field_object in field_objects),
             )
-        elif key.scope == Scope.user_info:
-            field_object, _ = XModuleStudentInfoField.objects.get_or_create(
-                field_name=key.field_name,
-                student=User.objects.get(id=key.user_id),
+        elif scope == Scope.user_info:
+            return self._query(
+                XModuleStudentInfoField,
+                student=self.user.pk,
+                field_name__in=set(field_object.field_name for field_object in field_objects),
             )
+        else:
+            return []
 
-        cache_key = self._cache_key_from_kvs_key(key)
-        self.cache[cache_key] = field_object
-        return field_object
+    def create_pending(self):
+        """
+        Insert the objects built by `find_or_build`, with a single query per model.
+
+        If any of the rows already exists (because a concurrent request created
+        it), the objects of that model are written one at a time instead, merging
+        their values into the existing rows.
+        """
+        pending_by_scope = defaultdict(list)
+        for key, field_object in self._pending_creates.values():
+            # The object may have been saved directly since it was built
+            if field_object.pk is None:
+                pending_by_scope[key.scope].append((key, field_object))
+        self._pending_creates = {}
+
+        for scope, pending in pending_by_scope.items():
+            field_objects = [field_object for _, field_object in pending]
+
+            sid = transaction.savepoint()
+            try:
+                type(field_objects[0]).objects.bulk_create(field_objects)
+                transaction.savepoint_commit(sid)
+            except IntegrityError:
+                transaction.savepoint_rollback(sid)
+                for key, field_object in pending:
+                    self._create_or_merge(key, field_object)
+                continue
+
+            # bulk_create doesn't set the primary keys of the inserted objects
+            created_pks = dict(
+                (self._cache_key_from_field_object(scope, row), row.pk)
+                for row in self._retrieve_created(scope, field_objects)
+            )
+            for field_object in field_objects:
+                field_object.pk = created_pks.get(self._cache_key_from_field_object(scope, field_object))
+
+    def _create_or_merge(self, key, field_object):
+        """
+        Insert the unsaved `field_object`, or if its row already exists, copy
+        the values from `field_object` into that row and cache it instead.
+        """
+        sid = transaction.savepoint()
+        try:
+            field_object.save(force_insert=True)
+            transaction.savepoint_commit(sid)
+            return
+        except IntegrityError:
+            transaction.savepoint_rollback(sid)
+
+        model_class, lookup, _ = self._lookup_for_key(key)
+        existing = model_class.objects.get(**lookup)
+        if key.scope == Scope.user_state:
+            state = json.loads(existing.state)
+            state.update(self.get_decoded_state(field_object))
+            self.set_decoded_state(existing, state)
+        else:
+            existing.value = field_object.value
+        existing.save()
+        self.cache[self._cache_key_from_kvs_key(key)] = existing
+
+    def get_decoded_state(self, student_module):
+        """
+        Return the state of `student_module` as a dict.
+
+        The state is decoded the first time it is requested, and the same dict
+        is returned until `student_module.state` is replaced.
+        """
+        serialized, decoded = self._decoded_states.get(student_module.module_state_key, (None, None))
+        if serialized is not student_module.state:
+            serialized = student_module.state
+            decoded = json.loads(serialized)
+            self._decoded_states[student_module.module_state_key] = (serialized, decoded)
+        return decoded
+
+    def set_decoded_state(self, student_module, state):
+        """
+        Serialize the dict `state` into `student_module.state`, remembering
+        `state` as its decoded form.
+        """
+        student_module.state = json.dumps(state)
+        self._decoded_states[student_module.module_state_key] = (student_module.state, state)
 
 
 class DjangoKeyValueStore(KeyValueStore):
@@ -302,7 +505,12 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            # The decoded state is shared between reads, so callers get a copy
+            # of mutable values that they can't use to change it in place
+            value = self._field_data_cache.get_decoded_state(field_object)[key.field_name]
+            if isinstance(value, (dict, list)):
+                value = copy.deepcopy(value)
+            return value
         else:
             return json.loads(field_object.value)
 
@@ -321,41 +529,83 @@ class DjangoKeyValueStore(KeyValueStore):
 
         """
         saved_fields = []
-        # field_objects maps a field_object to a list of associated fields
+        # field_objects maps id(field_object) to the field_object and a list of
+        # associated fields. Unsaved objects all compare equal in django, so they
+        # can't be used as keys themselves.
         field_objects = dict()
+        # the ids of the field_objects whose value differs from what is stored
+        changed_objects = set()
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
                 raise InvalidScopeError(field)
 
             # If the field is valid and isn't already in the dictionary, add it.
-            field_object = self._field_data_cache.find_or_create(field)
-            if field_object not in field_objects.keys():
-                field_objects[field_object] = []
+            field_object = self._field_data_cache.find_or_build(field)
+            if id(field_object) not in field_objects:
+                field_objects[id(field_object)] = (field_object, [])
             # Update the list of associated fields
-            field_objects[field_object].append(field)
+            field_objects[id(field_object)][1].append(field)
 
             # Special case when scope is for the user state, because this scope saves fields in a single row
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                state = self._field_data_cache.get_decoded_state(field_object)
+                if field.field_name not in state or state[field.field_name] != kv_dict[field]:
+                    state[field.field_name] = copy.deepcopy(kv_dict[field])
+                    changed_objects.add(id(field_object))
             else:
             # The remaining scopes save fields on different rows, so
             # we don't have to worry about conflicts
-                field_object.value = json.dumps(kv_dict[field])
+                value = json.dumps(kv_dict[field])
+                if value != field_object.value:
+                    field_object.value = value
+                    changed_objects.add(id(field_object))
+
+        # fields stored in rows that don't exist yet, which are inserted together
+        pending_fields = []
+        # Write the rows in a consistent (primary key) order, so that concurrent
+        # requests lock them in the same order
+        for field_object, fields in sorted(field_objects.values(), key=lambda entry: entry[0].pk):
+            field_names = [field.field_name for field in fields]
+            changed = id(field_object) in changed_objects
+            if isinstance(field_object, StudentModule) and changed:
+                # Serialize the state once, however many of its fields changed
+                self._field_data_cache.set_decoded_state(
+                    field_object,
+                    self._field_data_cache.get_decoded_state(field_object)
+                )
+
+            if self._field_data_cache.is_pending(field_object):
+                pending_fields.extend(field_names)
+                continue
+
+            if not changed:
+                # Nothing to write: the stored row already holds these values
+                dog_stats_api.increment(
+                    'lms.courseware.field_data.save_skipped',
+                    tags=[u'model:{}'.format(field_object.__class__.__name__)]
+                )
+                saved_fields.extend(field_names)
+                continue
 
-        for field_object in field_objects:
             try:
                 # Save the field object that we made above
                 field_object.save()
                 # If save is successful on this scope, add the saved fields to
                 # the list of successful saves
-                saved_fields.extend([field.field_name for field in field_objects[field_object]])
+                saved_fields.extend(field_names)
             except DatabaseError:
-                log.exception('Error saving fields %r', field_objects[field_object])
+                log.exception('Error saving fields %r', fields)
                 raise KeyValueMultiSaveError(saved_fields)
 
+        if pending_fields and not self._field_data_cache.batching_creates:
+            try:
+                self._field_data_cache.create_pending()
+            except DatabaseError:
+                log.exception('Error creating fields %r', pending_fields)
+                raise KeyValueMultiSaveError(saved_fields)
+        saved_fields.extend(pending_fields)
+
     def delete(self, key):
         if key.scope not in self._allowed_scopes:
             raise InvalidScopeError(key)
@@ -365,10 +615,12 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
+            state = self._field_data_cache.get_decoded_state(field_object)
             del state[key.field_name]
-            field_object.state = json.dumps(state)
+            self._field_data_cache.set_decoded_state(field_object, state)
             field_object.save()
+        elif self._field_data_cache.is_pending(field_object):
+            self._field_data_cache.discard_pending(key)
         else:
             field_object.delete()
 
@@ -381,6 +633,109 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.get_decoded_state(field_object)
         else:
             return True
+
+
+class UserStateSummaryCounters(object):
+    """
+    The counts kept for Scope.user_state_summary CounterDict fields (see
+    xmodule.fields.CounterDict), provided to modules as `system.summary_counters`.
+
+    Each count is split over `shards` rows.  An increment atomically adds to
+    one of them, picked at random, so concurrent updates of the same count
+    are never lost and rarely wait for each other.  Reads sum the shards, and
+    are cached for up to `cache_timeout` seconds.
+    """
+    # Longer keys are truncated to fit in XModuleUserStateSummaryCounter.key
+    MAX_KEY_LENGTH = 255
+
+    def __init__(self, cache, shards=8, cache_timeout=5):
+        self.cache = cache
+        self.shards = shards
+        self.cache_timeout = cache_timeout
+
+    @staticmethod
+    def _cache_key(usage_id, field_name):
+        """
+        Return the cache key for the counts of `field_name` in `usage_id`
+        """
+        return u'summary_counters.{0}.{1}'.format(usage_id, field_name)
+
+    def get(self, usage_id, field_name):
+        """
+        Return a dict of the counts for the field `field_name` of the module `usage_id`
+        """
+        usage_id = usage_id.url()
+        cache_key = self._cache_key(usage_id, field_name)
+        cached = self.cache.get(cache_key)
+        if cached is not None and cached['expires'] > time.time():
+            return dict(cached['counts'])
+
+        rows = XModuleUserStateSummaryCounter.objects.filter(
+            usage_id=usage_id,
+            field_name=field_name,
+        ).values('key').annotate(total=Sum('count'))
+        counts = dict((row['key'], row['total']) for row in rows)
+        self.cache.set(
+            cache_key,
+            {'counts': counts, 'expires': time.time() + self.cache_timeout},
+            self.cache_timeout
+        )
+        return dict(counts)
+
+    def increment(self, usage_id, field_name, deltas):
+        """
+        Add the amounts in the dict `deltas` to the counts for their keys in the
+        field `field_name` of the module `usage_id`
+        """
+        usage_id = usage_id.url()
+        shard = random.randrange(self.shards)
+        # Update the rows in a consistent order, so that concurrent requests
+        # lock them in the same order
+        for key, amount in sorted(deltas.iteritems()):
+            self._increment_row(usage_id, field_name, key[:self.MAX_KEY_LENGTH], shard, amount)
+
+        # Show the increments in the cached counts straight away, without
+        # waiting for them to expire.  Concurrent updates of the cached copy can
+        # be lost, but only until it expires, so it isn't stored for any longer
+        # than it already would have been.
+        cache_key = self._cache_key(usage_id, field_name)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            remaining = int(cached['expires'] - time.time())
+            if remaining > 0:
+                for key, amount in deltas.iteritems():
+                    key = key[:self.MAX_KEY_LENGTH]
+                    cached['counts'][key] = cached['counts'].get(key, 0) + amount
+                self.cache.set(cache_key, cached, remaining)
+
+    @staticmethod
+    def _increment_row(usage_id, field_name, key, shard, amount):
+        """
+        Atomically add `amount` to a single counter row, creating it if needed
+        """
+        rows = XModuleUserStateSummaryCounter.objects.filter(
+            usage_id=usage_id,
+            field_name=field_name,
+            key=key,
+            shard=shard,
+        )
+        if rows.update(count=F('count') + amount):
+            return
+
+        sid = transaction.savepoint()
+        try:
+            XModuleUserStateSummaryCounter.objects.create(
+                usage_id=usage_id,
+                field_name=field_name,
+                key=key,
+                shard=shard,
+                count=amount,
+            )
+            transaction.savepoint_commit(sid)
+        except IntegrityError:
+            # A concurrent request created the row first
+            transaction.savepoint_rollback(sid)
+            rows.update(count=F('count') + amount)
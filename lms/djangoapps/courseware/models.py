@@ -12,10 +12,16 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+from datetime import datetime
+
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils.timezone import UTC
+
+from xmodule.course_module import CourseDescriptor
 
 
 class StudentModule(models.Model):
@@ -132,6 +138,41 @@ class XModuleUserStateSummaryField(models.Model):
         return unicode(repr(self))
 
 
+class XModuleUserStateSummaryCounter(models.Model):
+    """
+    One shard of a count kept for a Scope.user_state_summary CounterDict field
+    (see xmodule.fields.CounterDict).  The count for a key is the sum of its
+    shards, added to the key's value in the field itself.
+    """
+
+    class Meta:
+        unique_together = (('usage_id', 'field_name', 'key', 'shard'),)
+
+    # The name of the field
+    field_name = models.CharField(max_length=64)
+
+    # The definition id for the module
+    usage_id = models.CharField(max_length=255, db_index=True)
+
+    # The key in the field's dict that this counts
+    key = models.CharField(max_length=255)
+
+    shard = models.IntegerField(default=0)
+    count = models.IntegerField(default=0)
+
+    def __repr__(self):
+        return 'XModuleUserStateSummaryCounter<%r>' % ({
+            'field_name': self.field_name,
+            'usage_id': self.usage_id,
+            'key': self.key,
+            'shard': self.shard,
+            'count': self.count,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+
 class XModuleStudentPrefsField(models.Model):
     """
     Stores data set in the Scope.preferences scope by an xmodule field
@@ -231,3 +272,144 @@ class OfflineComputedGradeLog(models.Model):
 
     def __unicode__(self):
         return "[OCGLog] %s: %s" % (self.course_id, self.created)
+
+
+class PersistentCourseGrade(models.Model):
+    """
+    The most recently computed gradeset for a given user and course.
+
+    A stored gradeset is only valid while both of these still hold:
+
+    - `course_version` matches the current version of the course content
+      (see xmodule.modulestore.django.get_course_version)
+    - `computed_score_version` matches `score_version`, which is incremented
+      every time one of the user's scores in the course changes
+    """
+    user = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+
+    course_version = models.CharField(max_length=255, blank=True, default='')
+    score_version = models.IntegerField(default=0)
+    computed_score_version = models.IntegerField(null=True, blank=True)
+
+    gradeset = models.TextField(null=True, blank=True)  # grades, stored as JSON
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = (('user', 'course_id'), )
+
+    @classmethod
+    def invalidate(cls, user_id, course_id):
+        """
+        Mark the stored gradeset (if any) for this user and course as stale.
+        """
+        cls.objects.filter(user__id=user_id, course_id=course_id).update(score_version=F('score_version') + 1)
+
+    def is_current(self, course_version):
+        """
+        Return True if the stored gradeset can be used for `course_version`.
+        """
+        return (
+            self.gradeset is not None and
+            self.course_version == course_version and
+            self.computed_score_version == self.score_version
+        )
+
+    @receiver(post_delete, sender=StudentModule)
+    def invalidate_on_delete(sender, instance, **kwargs):  # pylint: disable=no-self-argument, unused-argument
+        """
+        Deleting a StudentModule (e.g. when an instructor resets a problem) removes its score.
+        """
+        PersistentCourseGrade.invalidate(instance.student_id, instance.course_id)
+
+    def __unicode__(self):
+        return "[PersistentCourseGrade] %s: %s (%s)" % (self.user, self.course_id, self.course_version)
+
+
+class CourseOverview(models.Model):
+    """
+    A summary of a course, with just what pages that list courses need, so that
+    they don't have to load every course descriptor.
+
+    An overview is only valid while `course_version` matches the current version
+    of the course content (see xmodule.modulestore.django.get_course_version), so
+    any write to the course (e.g. a publish) makes the next listing rebuild it.
+    XML courses never get a new version, so their overviews are only built in
+    memory (see courseware.courses.get_course_overviews) and never saved.
+    It answers to the same attributes as the descriptor for everything the
+    listings (and has_access's 'see_exists' check) use.
+    """
+    # The primary key, so that the id property below can stand in for CourseDescriptor.id
+    course_id = models.CharField(max_length=255, primary_key=True)
+    course_version = models.CharField(max_length=255, blank=True, default='')
+
+    display_name_with_default = models.TextField()
+    display_number_with_default = models.CharField(max_length=255)
+    display_org_with_default = models.CharField(max_length=255)
+    start_date_text = models.CharField(max_length=255)
+    course_image_url = models.TextField()
+    static_asset_path = models.CharField(max_length=255, blank=True, default='')
+
+    start = models.DateTimeField(null=True, blank=True)
+    end = models.DateTimeField(null=True, blank=True)
+    enrollment_start = models.DateTimeField(null=True, blank=True)
+    enrollment_end = models.DateTimeField(null=True, blank=True)
+    announcement = models.DateTimeField(null=True, blank=True)
+    # The advertised start date if it's a date, otherwise the start date
+    sorting_start = models.DateTimeField(null=True, blank=True)
+
+    # Visibility
+    is_new = models.NullBooleanField()
+    ispublic = models.NullBooleanField()
+    days_early_for_beta = models.FloatField(null=True, blank=True)
+    enrollment_domain = models.CharField(max_length=255, null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    @property
+    def id(self):  # pylint: disable=invalid-name
+        """Return the course_id for this course, like CourseDescriptor.id"""
+        return self.course_id
+
+    @property
+    def location(self):
+        """The location of the course descriptor"""
+        return CourseDescriptor.id_to_location(self.course_id)
+
+    @property
+    def org(self):
+        return self.location.org
+
+    @property
+    def number(self):
+        return self.location.course
+
+    @property
+    def display_name(self):
+        return self.display_name_with_default
+
+    @property
+    def is_newish(self):
+        """See CourseDescriptor.is_newish"""
+        if self.is_new is None:
+            return CourseDescriptor.is_newish_from_dates(self.announcement, self.sorting_start)
+        return self.is_new
+
+    @property
+    def sorting_score(self):
+        """See CourseDescriptor.sorting_score"""
+        return CourseDescriptor.sorting_score_from_dates(self.announcement, self.sorting_start)
+
+    def has_started(self):
+        return datetime.now(UTC()) > self.start
+
+    def has_ended(self):
+        if self.end is None:
+            return False
+        return datetime.now(UTC()) > self.end
+
+    def __unicode__(self):
+        return "[CourseOverview] %s (%s)" % (self.course_id, self.course_version)
@@ -19,7 +19,8 @@ from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from capa.xqueue_interface import XQueueInterface
 from courseware.access import has_access
 from courseware.masquerade import setup_masquerade
-from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.model_data import FieldDataCache, DjangoKeyValueStore, UserStateSummaryCounters
+from courseware.models import PersistentCourseGrade
 from lms.lib.xblock.field_data import LmsFieldData
 from lms.lib.xblock.runtime import LmsModuleSystem, handler_prefix, unquote_slashes
 from edxmako.shortcuts import render_to_string
@@ -310,6 +311,8 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         student_module.max_grade = event.get('max_value')
         # Save all changes to the underlying KeyValueStore
         student_module.save()
+        # The student's stored course grade no longer reflects this score
+        PersistentCourseGrade.invalidate(user_id, course_id)
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
@@ -423,6 +426,12 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
 
     # pass position specified in URL to module through ModuleSystem
     system.set('position', position)
+    system.set('lazy_sequence_rendering', settings.FEATURES.get('ENABLE_LAZY_SEQUENCE_RENDERING', False))
+    system.set('summary_counters', UserStateSummaryCounters(
+        cache,
+        shards=settings.SUMMARY_COUNTER_SHARDS,
+        cache_timeout=settings.SUMMARY_COUNTER_CACHE_TIMEOUT,
+    ))
     if settings.FEATURES.get('ENABLE_PSYCHOMETRICS'):
         system.set(
             'psychometrics_handler',  # set callback for updating PsychometricsData
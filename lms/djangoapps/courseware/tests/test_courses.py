@@ -7,10 +7,18 @@ import mock
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from django.http import Http404
 from django.test.utils import override_settings
-from courseware.courses import get_course_by_id, get_course, get_cms_course_link
-from xmodule.modulestore.django import get_default_store_name_for_current_request
+from courseware.access import has_access
+from courseware.courses import (
+    get_course_by_id, get_course, get_cms_course_link, get_course_overviews, get_courses, course_image_url
+)
+from courseware.models import CourseOverview
+from student.tests.factories import AnonymousUserFactory
+from xmodule.modulestore.django import (
+    get_default_store_name_for_current_request, modulestore, bump_course_version
+)
 from xmodule.modulestore.tests.factories import CourseFactory
 from courseware.tests.tests import TEST_DATA_MONGO_MODULESTORE
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
 
 
 CMS_BASE_TEST = 'testcms'
@@ -79,3 +87,79 @@ class CoursesTest(ModuleStoreTestCase):
     )
     def test_default_modulestore_published_mapping(self):
         self.assertEqual(get_default_store_name_for_current_request(), 'default')
+
+
+@override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
+class CourseOverviewTest(ModuleStoreTestCase):
+    """Test the stored course overviews used by course listings."""
+
+    def setUp(self):
+        self.course = CourseFactory.create(org='org', number='num', display_name='Overview Course')
+        self.other_course = CourseFactory.create(org='org', number='other', display_name='Other Course')
+        self.anonymous_user = AnonymousUserFactory()
+
+    def test_overview_matches_course(self):
+        overview = get_course_overviews([self.course.id])[0]
+        self.assertEqual(overview.id, self.course.id)
+        self.assertEqual(overview.location, self.course.location)
+        self.assertEqual(overview.number, self.course.number)
+        self.assertEqual(overview.display_name_with_default, self.course.display_name_with_default)
+        self.assertEqual(overview.display_org_with_default, self.course.display_org_with_default)
+        self.assertEqual(overview.start_date_text, self.course.start_date_text)
+        self.assertEqual(overview.start, self.course.start)
+        self.assertEqual(overview.is_newish, self.course.is_newish)
+        self.assertEqual(course_image_url(overview), course_image_url(self.course))
+        for action in ('load', 'enroll', 'see_exists'):
+            self.assertEqual(
+                has_access(self.anonymous_user, overview, action),
+                has_access(self.anonymous_user, self.course, action)
+            )
+
+    def test_overviews_in_order(self):
+        course_ids = [self.other_course.id, 'org/missing/run', self.course.id]
+        overviews = get_course_overviews(course_ids)
+        self.assertEqual([overview.id for overview in overviews], [self.other_course.id, self.course.id])
+        self.assertEqual(CourseOverview.objects.count(), 2)
+
+    def test_rebuilt_for_new_version(self):
+        get_course_overviews([self.course.id])
+        created = CourseOverview.objects.get(course_id=self.course.id).created
+
+        # Unchanged courses aren't loaded again
+        with mock.patch.object(modulestore(), 'get_courses_by_id') as get_courses_by_id:
+            get_course_overviews([self.course.id])
+        self.assertFalse(get_courses_by_id.called)
+
+        modulestore().update_metadata(self.course.location, {'display_name': 'Renamed Course'})
+        bump_course_version(self.course.id)
+        overview = get_course_overviews([self.course.id])[0]
+        self.assertEqual(overview.display_name_with_default, 'Renamed Course')
+        stored = CourseOverview.objects.get(course_id=self.course.id)
+        self.assertEqual(stored.display_name_with_default, 'Renamed Course')
+        self.assertEqual(stored.created, created)
+        self.assertEqual(CourseOverview.objects.count(), 1)
+
+    @mock.patch.dict('django.conf.settings.FEATURES', {'ENABLE_COURSE_OVERVIEWS': True})
+    def test_get_courses(self):
+        courses = get_courses(self.anonymous_user)
+        self.assertTrue(all(isinstance(course, CourseOverview) for course in courses))
+        self.assertEqual(
+            set(course.id for course in courses),
+            set(course.id for course in modulestore().get_courses() if has_access(self.anonymous_user, course, 'see_exists'))
+        )
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class XmlCourseOverviewTest(ModuleStoreTestCase):
+    """Test the course overviews of XML courses, whose versions never change."""
+
+    def test_built_from_loaded_course(self):
+        course_id = 'edX/toy/2012_Fall'
+        overview = get_course_overviews([course_id])[0]
+        self.assertEqual(overview.display_name_with_default, modulestore().get_course(course_id).display_name_with_default)
+        self.assertFalse(CourseOverview.objects.filter(course_id=course_id).exists())
+
+        # reloading the course's files changes the overview without a version bump
+        modulestore().get_course(course_id).display_name = 'Reloaded Toy'
+        overview = get_course_overviews([course_id])[0]
+        self.assertEqual(overview.display_name_with_default, 'Reloaded Toy')
@@ -1,16 +1,30 @@
 """
 Test grade calculation.
 """
+import json
+
+from django.conf import settings
 from django.http import Http404
+from django.test import TestCase
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from mock import patch
 
+import courseware.grades
+
+from courseware.tests.factories import StudentModuleFactory, location
+from courseware.models import PersistentCourseGrade
 from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
 from student.tests.factories import UserFactory
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from xmodule.modulestore.django import bump_course_version, get_grading_skeleton, modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
-from courseware.grades import grade, iterate_grades_for
+from courseware.grades import (
+    grade, iterate_grades_for, ScoresCache, answer_distributions, get_graded_section_descriptor,
+    _decode_student_answers, _iter_problem_states
+)
+from student.models import CourseEnrollment
 
 
 def _grade_with_errors(student, request, course, keep_raw_scores=False):
@@ -120,3 +134,263 @@ class TestGradeIteration(ModuleStoreTestCase):
                 students_to_errors[student] = err_msg
 
         return students_to_gradesets, students_to_errors
+
+
+class TestScoresCache(TestCase):
+    """
+    Test the in-memory score table used while grading.
+    """
+    COURSE_ID = "MITx/999/Robot_Super_Course"
+
+    def setUp(self):
+        self.student = UserFactory.create()
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.COURSE_ID,
+            module_state_key=location('graded').url(),
+            grade=3,
+            max_grade=5,
+        )
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id=self.COURSE_ID,
+            module_state_key=location('ungraded').url(),
+        )
+        StudentModuleFactory.create(
+            student=self.student,
+            course_id="edX/other/course",
+            module_state_key=location('other_course').url(),
+            grade=1,
+            max_grade=1,
+        )
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            scores_cache = ScoresCache(self.COURSE_ID, self.student)
+        with self.assertNumQueries(0):
+            self.assertEqual(scores_cache.get(location('graded')), (3, 5))
+            self.assertEqual(scores_cache.get(location('ungraded')), (None, None))
+            self.assertIsNone(scores_cache.get(location('missing')))
+
+    def test_restricted_to_course(self):
+        scores_cache = ScoresCache(self.COURSE_ID, self.student)
+        self.assertIsNone(scores_cache.get(location('other_course')))
+
+    def test_has_any(self):
+        scores_cache = ScoresCache(self.COURSE_ID, self.student)
+        self.assertTrue(scores_cache.has_any([location('missing'), location('ungraded')]))
+        self.assertFalse(scores_cache.has_any([location('missing'), location('other_course')]))
+        self.assertTrue(scores_cache.has_any_url([location('missing').url(), location('ungraded').url()]))
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestGradingSkeleton(ModuleStoreTestCase):
+    """
+    Test that the grading skeleton is shared until the course changes.
+    """
+    def setUp(self):
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.section = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            display_name='Homework 1',
+            metadata={'graded': True, 'format': 'Homework'},
+        )
+        self.problem = ItemFactory.create(
+            parent_location=self.section.location,
+            category='problem',
+            metadata={'weight': 2},
+        )
+
+    def _fresh_course(self):
+        """
+        Load the course descriptor anew, as a new request would.
+        """
+        return modulestore().get_course(self.course.id)
+
+    def test_skeleton(self):
+        skeleton = get_grading_skeleton(self._fresh_course())
+        self.assertEqual(skeleton['graded_sections'], {
+            'Homework': [{
+                'section_location': self.section.location.url(),
+                'display_name': 'Homework 1',
+                'always_recalculate_grades': False,
+                'scorable': [{'location': self.problem.location.url(), 'weight': 2}],
+            }],
+        })
+        self.assertItemsEqual(
+            skeleton['all_locations'],
+            [self.section.location.url(), self.problem.location.url()]
+        )
+
+    def test_cached_per_course_version(self):
+        get_grading_skeleton(self._fresh_course())
+
+        # The course tree isn't walked again for a new descriptor...
+        course = self._fresh_course()
+        get_grading_skeleton(course)
+        self.assertNotIn('grading_context', course.__dict__)
+
+        # ...until the course changes
+        bump_course_version(self.course.id)
+        get_grading_skeleton(course)
+        self.assertIn('grading_context', course.__dict__)
+
+    def test_section_descriptors_loaded_once(self):
+        course = self._fresh_course()
+        section_url = self.section.location.url()
+        store = modulestore()
+        with patch.object(store, 'get_instance', wraps=store.get_instance) as get_instance:
+            first = get_graded_section_descriptor(course, section_url)
+            second = get_graded_section_descriptor(course, section_url)
+            self.assertEqual(get_instance.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(first.location, self.section.location)
+
+    def test_section_descriptors_from_grading_context(self):
+        course = self._fresh_course()
+        section_descriptor = course.grading_context['graded_sections']['Homework'][0]['section_descriptor']
+        with patch.object(modulestore(), 'get_instance', side_effect=AssertionError):
+            self.assertIs(
+                get_graded_section_descriptor(course, self.section.location.url()),
+                section_descriptor
+            )
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_GRADES': True})
+class TestPersistentGrades(ModuleStoreTestCase):
+    """
+    Test that stored gradesets are reused until they become stale.
+    """
+    def setUp(self):
+        self.course = CourseFactory.create()
+        self.student = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _grade(self, keep_raw_scores=False):
+        """
+        Grade the student, returning the gradeset and whether it was recomputed.
+        """
+        with patch('courseware.grades._grade', wraps=courseware.grades._grade) as mock_grade:
+            gradeset = grade(self.student, self.request, self.course, keep_raw_scores=keep_raw_scores)
+        return gradeset, mock_grade.called
+
+    def test_reuse_stored_grade(self):
+        first, recomputed = self._grade()
+        self.assertTrue(recomputed)
+        second, recomputed = self._grade()
+        self.assertFalse(recomputed)
+        self.assertEqual(first, second)
+        self.assertNotIn('raw_scores', second)
+
+    def test_raw_scores_stored(self):
+        self._grade()
+        gradeset, recomputed = self._grade(keep_raw_scores=True)
+        self.assertFalse(recomputed)
+        self.assertEqual(gradeset['raw_scores'], [])
+
+    def test_score_change_invalidates(self):
+        self._grade()
+        PersistentCourseGrade.invalidate(self.student.id, self.course.id)
+        _, recomputed = self._grade()
+        self.assertTrue(recomputed)
+
+    def test_course_change_invalidates(self):
+        self._grade()
+        bump_course_version(self.course.id)
+        _, recomputed = self._grade()
+        self.assertTrue(recomputed)
+
+    def test_always_recalculated_course_not_stored(self):
+        skeleton = {
+            'graded_sections': {'Homework': [{'always_recalculate_grades': True, 'scorable': []}]},
+            'all_locations': [],
+        }
+        with patch('courseware.grades.get_grading_skeleton', return_value=skeleton):
+            self.assertTrue(courseware.grades._always_recalculate_grades(self.course))
+        self.assertFalse(courseware.grades._always_recalculate_grades(self.course))
+
+        with patch('courseware.grades._always_recalculate_grades', return_value=True):
+            self._grade()
+            _, recomputed = self._grade()
+        self.assertTrue(recomputed)
+        self.assertFalse(PersistentCourseGrade.objects.filter(user=self.student).exists())
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestAnswerDistributions(ModuleStoreTestCase):
+    """
+    Test counting the answers to the graded problems of a course.
+    """
+    def setUp(self):
+        self.course = CourseFactory.create(display_name='answers_course', number='answers')
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        graded = ItemFactory.create(
+            parent_location=chapter.location, category='sequential', metadata={'graded': True, 'format': 'Homework'}
+        )
+        ungraded = ItemFactory.create(parent_location=chapter.location, category='sequential')
+        self.problem = ItemFactory.create(parent_location=graded.location, category='problem', display_name='Graded')
+        self.ungraded_problem = ItemFactory.create(parent_location=ungraded.location, category='problem')
+        self.answer_id = self.problem.location.html_id() + '_2_1'
+
+        self.students = [UserFactory.create(username='answerer{}'.format(index)) for index in range(4)]
+        for student, answer in zip(self.students, ['a', 'b', 'a', ['a', 'b']]):
+            CourseEnrollment.enroll(student, self.course.id)
+            self._answer(student, self.problem, answer)
+            self._answer(student, self.ungraded_problem, 'a')
+        # Students who aren't enrolled don't count
+        self._answer(UserFactory.create(username='unenrolled'), self.problem, 'a')
+
+    def _answer(self, student, problem, answer):
+        """Store `student`'s `answer` to `problem`."""
+        StudentModuleFactory.create(
+            student=student,
+            course_id=self.course.id,
+            module_state_key=problem.location.url(),
+            state=json.dumps({
+                'attempts': 1,
+                'student_answers': {problem.location.html_id() + '_2_1': answer},
+            }),
+        )
+
+    def test_answer_distributions(self):
+        distribution = answer_distributions(None, modulestore().get_course(self.course.id))
+        self.assertEquals(distribution.keys(), [(self.problem.url_name, 'Graded', self.answer_id)])
+        self.assertEquals(
+            dict(distribution[(self.problem.url_name, 'Graded', self.answer_id)]),
+            {u'a': 2, u'b': 1, unicode(['a', 'b']): 1}
+        )
+
+    def test_iter_problem_states_in_batches(self):
+        states = list(_iter_problem_states(self.course.id, batch_size=3))
+        # Two problems for each of the enrolled students, and none for the unenrolled one
+        self.assertEquals(len(states), 8)
+        self.assertEquals(
+            sorted(set(module_state_key for module_state_key, _ in states)),
+            sorted([self.problem.location.url(), self.ungraded_problem.location.url()])
+        )
+
+
+class TestDecodeStudentAnswers(TestCase):
+    """
+    Test reading student answers out of stored capa problem state.
+    """
+    def test_student_answers(self):
+        state = '{"correct_map": {"i4x-a-b-problem-c_2_1": {"correctness": "correct"}}, ' \
+                '"student_answers": {"i4x-a-b-problem-c_2_1": ["choice_1", "choice_2"]}, "attempts": 1}'
+        self.assertEquals(
+            _decode_student_answers(state),
+            {"i4x-a-b-problem-c_2_1": ["choice_1", "choice_2"]}
+        )
+
+    def test_no_student_answers(self):
+        self.assertEquals(_decode_student_answers(None), {})
+        self.assertEquals(_decode_student_answers('{"attempts": 0}'), {})
+        self.assertEquals(_decode_student_answers('{"student_answers": null}'), {})
+
+    def test_malformed_state(self):
+        self.assertEquals(_decode_student_answers('{"student_answers": {"a": '), {})
@@ -5,9 +5,9 @@ import json
 from mock import Mock, patch
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore
+from courseware.model_data import DjangoKeyValueStore, UserStateSummaryCounters
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule, XModuleUserStateSummaryField
+from courseware.models import StudentModule, XModuleUserStateSummaryField, XModuleUserStateSummaryCounter
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -17,6 +17,7 @@ from courseware.tests.factories import StudentPrefsFactory, StudentInfoFactory
 
 from xblock.fields import Scope, BlockScope
 from xmodule.modulestore import Location
+from django.core.cache import get_cache
 from django.test import TestCase
 from django.db import DatabaseError
 from xblock.core import KeyValueMultiSaveError
@@ -152,6 +153,33 @@ class TestStudentModuleStorage(TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
+    def test_state_decoded_once(self):
+        "Test that the StudentModule state is only decoded once for all reads"
+        with patch('courseware.model_data.json.loads', wraps=json.loads) as mock_loads:
+            self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+            self.assertEquals('b_value', self.kvs.get(user_state_key('b_field')))
+            self.assertTrue(self.kvs.has(user_state_key('a_field')))
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.assertEquals('new_value', self.kvs.get(user_state_key('a_field')))
+        self.assertEquals(1, mock_loads.call_count)
+
+    def test_get_returns_copy(self):
+        "Test that mutating a value read from the store doesn't change the stored value"
+        self.kvs.set(user_state_key('a_field'), {'nested': ['value']})
+        value = self.kvs.get(user_state_key('a_field'))
+        value['nested'].append('other')
+        self.assertEquals({'nested': ['value']}, self.kvs.get(user_state_key('a_field')))
+
+    @patch('courseware.model_data.dog_stats_api')
+    def test_set_unchanged_fields_skips_save(self, mock_stats):
+        "Test that setting fields to their stored values doesn't write the StudentModule"
+        with patch('django.db.models.Model.save') as mock_save:
+            self.kvs.set_many({user_state_key('a_field'): 'a_value', user_state_key('b_field'): 'b_value'})
+        self.assertFalse(mock_save.called)
+        mock_stats.increment.assert_called_once_with(
+            'lms.courseware.field_data.save_skipped', tags=[u'model:StudentModule']
+        )
+
 
 class TestMissingStudentModule(TestCase):
     def setUp(self):
@@ -188,6 +216,35 @@ class TestMissingStudentModule(TestCase):
         "Test that `has` returns False for missing StudentModules"
         self.assertFalse(self.kvs.has(user_state_key('a_field')))
 
+    def test_batched_creates(self):
+        "Test that rows for missing fields are only created at the end of a batched_creates block"
+        with self.field_data_cache.batched_creates():
+            self.kvs.set(user_state_key('a_field'), 'a_value')
+            self.kvs.set(prefs_key('a_pref'), 'a_pref_value')
+            self.kvs.set(prefs_key('b_pref'), 'b_pref_value')
+            self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+            self.assertEquals(0, StudentModule.objects.all().count())
+            self.assertEquals(0, XModuleStudentPrefsField.objects.all().count())
+
+        self.assertEquals({'a_field': 'a_value'}, json.loads(StudentModule.objects.get().state))
+        self.assertEquals(2, XModuleStudentPrefsField.objects.all().count())
+
+        # The cached objects refer to the new rows
+        self.kvs.set(prefs_key('a_pref'), 'new_value')
+        self.assertEquals(2, XModuleStudentPrefsField.objects.all().count())
+        self.assertEquals('new_value', json.loads(XModuleStudentPrefsField.objects.get(field_name='a_pref').value))
+
+    def test_batched_creates_existing_row(self):
+        "Test that values are merged into a row created by someone else during a batched_creates block"
+        with self.field_data_cache.batched_creates():
+            self.kvs.set(user_state_key('a_field'), 'a_value')
+            StudentModuleFactory(student=self.user, state=json.dumps({'b_field': 'b_value'}))
+
+        self.assertEquals(
+            {'a_field': 'a_value', 'b_field': 'b_value'},
+            json.loads(StudentModule.objects.get().state)
+        )
+
 
 class StorageTestBase(object):
     """
@@ -289,6 +346,12 @@ class StorageTestBase(object):
         self.assertEquals(len(exception.saved_field_names), 1)
         self.assertEquals(exception.saved_field_names[0], 'existing_field')
 
+    def test_set_unchanged_field_skips_save(self):
+        "Test that setting a field to its stored value doesn't write the row"
+        with patch('django.db.models.Model.save') as mock_save:
+            self.kvs.set(self.key_factory('existing_field'), 'old_value')
+        self.assertFalse(mock_save.called)
+
 
 class TestContentStorage(StorageTestBase, TestCase):
     factory = UserStateSummaryFactory
@@ -309,3 +372,42 @@ class TestStudentInfoStorage(StorageTestBase, TestCase):
     scope = Scope.user_info
     key_factory = user_info_key
     storage_class = XModuleStudentInfoField
+
+
+class TestUserStateSummaryCounters(TestCase):
+    """Tests for the counters of CounterDict fields"""
+
+    def setUp(self):
+        cache = get_cache('django.core.cache.backends.locmem.LocMemCache')
+        cache.clear()
+        self.counters = UserStateSummaryCounters(cache, shards=4, cache_timeout=5)
+        self.usage_id = location('def_id')
+
+    def test_increment(self):
+        with patch('courseware.model_data.random.randrange', side_effect=[0, 1, 1]):
+            self.counters.increment(self.usage_id, 'votes', {'yes': 1})
+            self.counters.increment(self.usage_id, 'votes', {'yes': 1, 'no': 2})
+            self.counters.increment(self.usage_id, 'votes', {'no': -1})
+
+        self.assertEquals({'yes': 2, 'no': 1}, self.counters.get(self.usage_id, 'votes'))
+        self.assertEquals({}, self.counters.get(self.usage_id, 'other_votes'))
+        # The two increments of 'yes' went to different shards
+        self.assertEquals(2, XModuleUserStateSummaryCounter.objects.filter(key='yes').count())
+
+    @patch('courseware.model_data.time')
+    def test_cached_counts(self, mock_time):
+        mock_time.time.return_value = 1000
+        self.assertEquals({}, self.counters.get(self.usage_id, 'votes'))
+
+        # Increments made through the counters are seen straight away
+        self.counters.increment(self.usage_id, 'votes', {'yes': 1})
+        with self.assertNumQueries(0):
+            self.assertEquals({'yes': 1}, self.counters.get(self.usage_id, 'votes'))
+
+        # Other changes are seen once the cached counts expire
+        XModuleUserStateSummaryCounter.objects.create(
+            usage_id=self.usage_id.url(), field_name='votes', key='no', shard=3, count=5
+        )
+        self.assertEquals({'yes': 1}, self.counters.get(self.usage_id, 'votes'))
+        mock_time.time.return_value = 1010
+        self.assertEquals({'yes': 1, 'no': 5}, self.counters.get(self.usage_id, 'votes'))
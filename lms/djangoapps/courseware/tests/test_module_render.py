@@ -368,6 +368,108 @@ class TestTOC(TestCase):
             self.assertIn(toc_section, actual)
 
 
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestLazySequenceRendering(ModuleStoreTestCase):
+    """
+    Tests of rendering only the active position of a sequence, and fetching
+    the others through its sequence_handler
+    """
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.request.session = {}
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.sequence = ItemFactory.create(parent_location=chapter.location, category='sequential')
+        for name in ('First', 'Second'):
+            vertical = ItemFactory.create(
+                parent_location=self.sequence.location,
+                category='vertical',
+                display_name=name,
+            )
+            ItemFactory.create(
+                parent_location=vertical.location,
+                category='html',
+                data='<p>{0} unit</p>'.format(name),
+            )
+
+    def get_sequence(self):
+        """Return the sequence module for self.user"""
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            self.course.id,
+            self.user,
+            self.sequence
+        )
+        return render.get_module(self.user, self.request, self.sequence.location, field_data_cache, self.course.id)
+
+    def post_request(self, data):
+        """Return a POST request from self.user"""
+        request = RequestFactory().post('dummy_url', data=data)
+        request.user = self.user
+        request.session = {}
+        return request
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_LAZY_SEQUENCE_RENDERING': False})
+    def test_render_all_positions(self):
+        html = self.get_sequence().render('student_view').content
+        self.assertIn('First unit', html)
+        self.assertIn('Second unit', html)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_render_active_position(self):
+        html = self.get_sequence().render('student_view').content
+        self.assertIn('First unit', html)
+        self.assertNotIn('Second unit', html)
+        # Every position still gets its tab
+        self.assertIn('data-element="2"', html)
+        self.assertIn('data-loaded="false"', html)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_sequence_handler(self):
+        request = self.post_request({'position': 2})
+        response = render.handle_xblock_callback(
+            request,
+            self.course.id,
+            quote_slashes(str(self.sequence.location)),
+            'sequence_handler',
+            'render_position',
+        )
+        result = json.loads(response.content)
+        self.assertEqual(result['position'], 2)
+        self.assertIn('Second unit', result['content'])
+        self.assertNotIn('First unit', result['content'])
+        # Fetching a position moves the student to it
+        self.assertEqual(self.get_sequence().position, 2)
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_sequence_handler_resources(self):
+        with patch('xblock.fragment.Fragment.head_html', return_value='<link href="unit.css">'):
+            with patch('xblock.fragment.Fragment.foot_html', return_value='<script src="unit.js"></script>'):
+                response = render.handle_xblock_callback(
+                    self.post_request({'position': 2}),
+                    self.course.id,
+                    quote_slashes(str(self.sequence.location)),
+                    'sequence_handler',
+                    'render_position',
+                )
+        result = json.loads(response.content)
+        self.assertEqual(result['head_html'], '<link href="unit.css">')
+        self.assertEqual(result['foot_html'], '<script src="unit.js"></script>')
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_sequence_handler_bad_position(self):
+        for position in (0, 3, 'bad'):
+            with self.assertRaises(Http404):
+                render.handle_xblock_callback(
+                    self.post_request({'position': position}),
+                    self.course.id,
+                    quote_slashes(str(self.sequence.location)),
+                    'sequence_handler',
+                    'render_position',
+                )
+
+
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
 class TestHtmlModifiers(ModuleStoreTestCase):
     """
@@ -32,7 +32,7 @@ from student.models import UserTestGroup, CourseEnrollment
 from util.cache import cache, cache_if_anonymous
 from xblock.fragment import Fragment
 from xmodule.modulestore import Location
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, get_course_parent_index
 from xmodule.modulestore.exceptions import InvalidLocationError, ItemNotFoundError, NoPathToItem
 from xmodule.modulestore.search import path_to_location
 from xmodule.course_module import CourseDescriptor
@@ -310,22 +310,25 @@ def index(request, course_id, chapter=None, section=None,
             section_field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
                 course_id, user, section_descriptor, depth=None)
 
-            section_module = get_module_for_descriptor(request.user,
-                request,
-                section_descriptor,
-                section_field_data_cache,
-                course_id,
-                position
-            )
-
-            if section_module is None:
-                # User may be trying to be clever and access something
-                # they don't have access to.
-                raise Http404
-
-            # Save where we are in the chapter
-            save_child_position(chapter_module, section)
-            context['fragment'] = section_module.render('student_view')
+            # Rows for the state that the section's modules save while
+            # rendering are created together once the rendering is done
+            with section_field_data_cache.batched_creates():
+                section_module = get_module_for_descriptor(request.user,
+                    request,
+                    section_descriptor,
+                    section_field_data_cache,
+                    course_id,
+                    position
+                )
+
+                if section_module is None:
+                    # User may be trying to be clever and access something
+                    # they don't have access to.
+                    raise Http404
+
+                # Save where we are in the chapter
+                save_child_position(chapter_module, section)
+                context['fragment'] = section_module.render('student_view')
 
         else:
             # section is none, so display a message
@@ -420,7 +423,9 @@ def jump_to(request, course_id, location):
 
     # Complain if there's not data for this location
     try:
-        (course_id, chapter, section, position) = path_to_location(modulestore(), course_id, location)
+        (course_id, chapter, section, position) = path_to_location(
+            modulestore(), course_id, location, parent_index=get_course_parent_index(course_id)
+        )
     except ItemNotFoundError:
         raise Http404("No data at this location: {0}".format(location))
     except NoPathToItem:
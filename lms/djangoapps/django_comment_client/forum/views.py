@@ -113,9 +113,10 @@ def inline_discussion(request, course_id, discussion_id):
 
     course = get_course_with_access(request.user, course_id, 'load_forum')
 
-    threads, query_params = get_threads(request, course_id, discussion_id, per_page=INLINE_THREADS_PER_PAGE)
-    cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
+    (threads, query_params), user_info = cc.utils.perform_concurrently(
+        lambda: get_threads(request, course_id, discussion_id, per_page=INLINE_THREADS_PER_PAGE),
+        cc.User.from_django_user(request.user).to_dict,
+    )
 
     with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
         annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
@@ -172,15 +173,15 @@ def forum_form_discussion(request, course_id):
         category_map = utils.get_discussion_category_map(course)
 
     try:
-        unsafethreads, query_params = get_threads(request, course_id)   # This might process a search query
+        (unsafethreads, query_params), user_info = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course_id),   # This might process a search query
+            cc.User.from_django_user(request.user).to_dict,
+        )
         threads = [utils.safe_content(thread) for thread in unsafethreads]
     except cc.utils.CommentClientMaintenanceError:
         log.warning("Forum is in maintenance mode")
         return render_to_response('discussion/maintenance.html', {})
 
-    user = cc.User.from_django_user(request.user)
-    user_info = user.to_dict()
-
     with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
         annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
 
@@ -240,11 +241,11 @@ def single_thread(request, course_id, discussion_id, thread_id):
 
     course = get_course_with_access(request.user, course_id, 'load_forum')
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
-
-    thread = cc.Thread.find(thread_id).retrieve(recursive=True, user_id=request.user.id)
+    thread = cc.Thread.find(thread_id)
+    retrieve_thread = lambda: thread.retrieve(recursive=True, user_id=request.user.id)
 
     if request.is_ajax():
+        user_info, __ = cc.utils.perform_concurrently(cc_user.to_dict, retrieve_thread)
         with newrelic.agent.FunctionTrace(nr_transaction, "get_annotated_content_infos"):
             annotated_content_info = utils.get_annotated_content_infos(course_id, thread, request.user, user_info=user_info)
         context = {'thread': thread.to_dict(), 'course_id': course_id}
@@ -263,7 +264,12 @@ def single_thread(request, course_id, discussion_id, thread_id):
         with newrelic.agent.FunctionTrace(nr_transaction, "get_discussion_category_map"):
             category_map = utils.get_discussion_category_map(course)
 
-        threads, query_params = get_threads(request, course_id)
+        # get_threads uses the db; so, it must be first (see perform_concurrently)
+        (threads, query_params), user_info, __ = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course_id),
+            cc_user.to_dict,
+            retrieve_thread,
+        )
         threads.append(thread.to_dict())
 
         course = get_course_with_access(request.user, course_id, 'load_forum')
@@ -339,10 +345,12 @@ def user_profile(request, course_id, user_id):
             'per_page': THREADS_PER_PAGE,   # more than threads_per_page to show more activities
         }
 
-        threads, page, num_pages = profiled_user.active_threads(query_params)
+        (threads, page, num_pages), user_info = cc.utils.perform_concurrently(
+            lambda: profiled_user.active_threads(query_params),
+            cc.User.from_django_user(request.user).to_dict,
+        )
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
 
         with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
             annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
@@ -386,10 +394,12 @@ def followed_threads(request, course_id, user_id):
             'sort_order': request.GET.get('sort_order', 'desc'),
         }
 
-        threads, page, num_pages = profiled_user.subscribed_threads(query_params)
+        (threads, page, num_pages), user_info = cc.utils.perform_concurrently(
+            lambda: profiled_user.subscribed_threads(query_params),
+            cc.User.from_django_user(request.user).to_dict,
+        )
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
 
         with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
             annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
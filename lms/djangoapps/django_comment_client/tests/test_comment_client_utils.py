@@ -0,0 +1,34 @@
+"""
+Tests for the comment client's transport helpers
+"""
+import threading
+
+from django.test import TestCase
+
+import lms.lib.comment_client as cc
+from lms.lib.comment_client.utils import get_session, perform_concurrently
+
+
+class GetSessionTestCase(TestCase):
+    def test_session_is_reused(self):
+        self.assertIs(get_session(), get_session())
+
+
+class PerformConcurrentlyTestCase(TestCase):
+    def test_results_in_order(self):
+        self.assertEqual(perform_concurrently(lambda: 1, lambda: 2, lambda: 3), [1, 2, 3])
+
+    def test_first_call_in_calling_thread(self):
+        threads = perform_concurrently(threading.current_thread, threading.current_thread)
+        self.assertIs(threads[0], threading.current_thread())
+        self.assertIsNot(threads[1], threading.current_thread())
+
+    def test_reraises_first_error(self):
+        def maintenance():
+            raise cc.CommentClientMaintenanceError('down')
+
+        def failure():
+            raise cc.CommentClient500Error('broken')
+
+        with self.assertRaises(cc.CommentClientMaintenanceError):
+            perform_concurrently(lambda: 1, maintenance, failure)
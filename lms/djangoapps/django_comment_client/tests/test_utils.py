@@ -1,4 +1,6 @@
 from datetime import datetime
+from mock import patch
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -69,6 +71,54 @@ class AccessUtilsTestCase(TestCase):
         self.assertFalse(ret)
 
 
+class AbilityTestCase(TestCase):
+    def setUp(self):
+        # cached_has_permission results may remain from other tests' users w/ the same ids
+        cache.clear()
+        self.course_id = 'edX/toy/2012_Fall'
+        self.moderator_role = RoleFactory(name='Moderator', course_id=self.course_id)
+        for permission in ['edit_content', 'endorse_comment', 'openclose_thread', 'vote', 'create_comment']:
+            self.moderator_role.add_permission(permission)
+        self.community_ta_role = RoleFactory(name='Community TA', course_id=self.course_id)
+        for permission in ['update_thread', 'update_comment', 'create_sub_comment', 'vote']:
+            self.community_ta_role.add_permission(permission)
+        self.moderator = UserFactory(username='moderator', email='staff@edx.org')
+        self.moderator_role.users.add(self.moderator)
+        self.community_ta = UserFactory(username='community_ta', email='community_ta@edx.org')
+        self.community_ta_role.users.add(self.community_ta)
+        self.nobody = UserFactory(username='nobody', email='nobody@edx.org')
+
+    def test_user_permissions_queries(self):
+        with self.assertNumQueries(2):
+            permissions = utils.get_user_permissions(self.community_ta, self.course_id)
+        self.assertEqual(permissions, set(['update_thread', 'update_comment', 'create_sub_comment', 'vote']))
+        with self.assertNumQueries(1):
+            self.assertEqual(utils.get_user_permissions(self.nobody, self.course_id), set())
+
+    def test_user_permissions_several_roles(self):
+        self.moderator_role.users.add(self.community_ta)
+        other_course_role = RoleFactory(name='Moderator', course_id='edX/other/2012_Fall')
+        other_course_role.add_permission('delete_thread')
+        other_course_role.users.add(self.community_ta)
+        self.assertEqual(
+            utils.get_user_permissions(self.community_ta, self.course_id),
+            set(['edit_content', 'endorse_comment', 'openclose_thread', 'vote', 'create_comment',
+                 'update_thread', 'update_comment', 'create_sub_comment'])
+        )
+
+    def test_snapshot_matches_permission_checks(self):
+        for user in [self.moderator, self.community_ta, self.nobody]:
+            user_permissions = utils.get_user_permissions(user, self.course_id)
+            for content_type in ['thread', 'comment']:
+                for author in [user, self.nobody]:
+                    for closed in [True, False]:
+                        content = {'type': content_type, 'user_id': str(author.id), 'closed': closed}
+                        self.assertEqual(
+                            utils.get_ability(self.course_id, content, user, user_permissions),
+                            utils.get_ability(self.course_id, content, user),
+                        )
+
+
 @override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
 class CoursewareContextTestCase(ModuleStoreTestCase):
     def setUp(self):
@@ -281,6 +331,19 @@ class CategoryMapTestCase(ModuleStoreTestCase):
             }
         )
 
+    def test_cached_per_course_version(self):
+        self.create_discussion("Chapter", "Discussion 1")
+        utils.get_discussion_category_map(self.course)
+        with patch('django_comment_client.utils._get_discussion_modules') as mock_modules:
+            category_map = utils.get_discussion_category_map(self.course)
+        self.assertFalse(mock_modules.called)
+        self.assertEqual(category_map["subcategories"]["Chapter"]["children"], ["Discussion 1"])
+
+        # changing the course makes a new version, so the map is rebuilt
+        self.create_discussion("Chapter", "Discussion 2")
+        category_map = utils.get_discussion_category_map(self.course)
+        self.assertEqual(category_map["subcategories"]["Chapter"]["children"], ["Discussion 1", "Discussion 2"])
+
     def test_start_date_filter(self):
         now = datetime.now()
         later = datetime.max
@@ -1,25 +1,31 @@
 import pytz
 from collections import defaultdict
+import hashlib
 import logging
 import urllib
 from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
 from django.utils import simplejson
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
-from django_comment_client.permissions import check_permissions_by_view
+from django_comment_client.permissions import check_permissions_by_view, get_user_permissions
 
 import edxmako
 import pystache_custom as pystache
 
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, get_course_version
 from django.utils.timezone import UTC
 
 log = logging.getLogger(__name__)
 
+# the category map is keyed by course version, so this only bounds how long an unused map lingers
+# (or how stale one can be for a modulestore which doesn't signal updates)
+CATEGORY_MAP_CACHE_TIMEOUT = 60 * 60
+
 
 def extract(dic, keys):
     return {k: dic.get(k) for k in keys}
@@ -130,9 +136,36 @@ def _sort_map_entries(category_map, sort_alpha):
     category_map["children"] = [x[0] for x in sorted(things, key=lambda x: x[1]["sort_key"])]
 
 
+def _category_map_cache_key(course):
+    """
+    The cache key for the category map of this version of the course. Besides the course content,
+    the map depends on course settings which may be set on the descriptor without saving it.
+    """
+    course_settings = simplejson.dumps([course.discussion_topics, course.discussion_sort_alpha], sort_keys=True)
+    return u'django_comment_client.category_map.{0}.{1}.{2}'.format(
+        course.id,
+        get_course_version(course.id),
+        hashlib.md5(course_settings).hexdigest()
+    )
+
+
 def get_discussion_category_map(course):
-    course_id = course.id
+    """
+    Return the course's tree of discussion categories, omitting those which haven't started yet.
+    The unfiltered tree is cached per course version.
+    """
+    cache_key = _category_map_cache_key(course)
+    category_map = cache.get(cache_key)
+    if category_map is None:
+        category_map = _build_discussion_category_map(course)
+        cache.set(cache_key, category_map, CATEGORY_MAP_CACHE_TIMEOUT)
+    return _filter_unstarted_categories(category_map)
 
+
+def _build_discussion_category_map(course):
+    """
+    Build the sorted tree of all of the course's discussion categories including their start dates.
+    """
     unexpanded_category_map = defaultdict(list)
 
     modules = _get_discussion_modules(course)
@@ -193,7 +226,7 @@ def get_discussion_category_map(course):
 
     _sort_map_entries(category_map, course.discussion_sort_alpha)
 
-    return _filter_unstarted_categories(category_map)
+    return category_map
 
 
 class JsonResponse(HttpResponse):
@@ -250,20 +283,27 @@ class QueryCountDebugMiddleware(object):
         return response
 
 
-def get_ability(course_id, content, user):
+def get_ability(course_id, content, user, user_permissions=None):
+    """
+    Return what the user may do to the content. Pass user_permissions (see
+    permissions.get_user_permissions) when getting the abilities for many contents.
+    """
+    def check(name):
+        return check_permissions_by_view(user, course_id, content, name, user_permissions=user_permissions)
+
     return {
-        'editable': check_permissions_by_view(user, course_id, content, "update_thread" if content['type'] == 'thread' else "update_comment"),
-        'can_reply': check_permissions_by_view(user, course_id, content, "create_comment" if content['type'] == 'thread' else "create_sub_comment"),
-        'can_endorse': check_permissions_by_view(user, course_id, content, "endorse_comment") if content['type'] == 'comment' else False,
-        'can_delete': check_permissions_by_view(user, course_id, content, "delete_thread" if content['type'] == 'thread' else "delete_comment"),
-        'can_openclose': check_permissions_by_view(user, course_id, content, "openclose_thread") if content['type'] == 'thread' else False,
-        'can_vote': check_permissions_by_view(user, course_id, content, "vote_for_thread" if content['type'] == 'thread' else "vote_for_comment"),
+        'editable': check("update_thread" if content['type'] == 'thread' else "update_comment"),
+        'can_reply': check("create_comment" if content['type'] == 'thread' else "create_sub_comment"),
+        'can_endorse': check("endorse_comment") if content['type'] == 'comment' else False,
+        'can_delete': check("delete_thread" if content['type'] == 'thread' else "delete_comment"),
+        'can_openclose': check("openclose_thread") if content['type'] == 'thread' else False,
+        'can_vote': check("vote_for_thread" if content['type'] == 'thread' else "vote_for_comment"),
     }
 
 # TODO: RENAME
 
 
-def get_annotated_content_info(course_id, content, user, user_info):
+def get_annotated_content_info(course_id, content, user, user_info, user_permissions=None):
     """
     Get metadata for an individual content (thread or comment)
     """
@@ -275,20 +315,22 @@ def get_annotated_content_info(course_id, content, user, user_info):
     return {
         'voted': voted,
         'subscribed': content['id'] in user_info['subscribed_thread_ids'],
-        'ability': get_ability(course_id, content, user),
+        'ability': get_ability(course_id, content, user, user_permissions),
     }
 
 # TODO: RENAME
 
 
-def get_annotated_content_infos(course_id, thread, user, user_info):
+def get_annotated_content_infos(course_id, thread, user, user_info, user_permissions=None):
     """
     Get metadata for a thread and its children
     """
+    if user_permissions is None:
+        user_permissions = get_user_permissions(user, course_id)
     infos = {}
 
     def annotate(content):
-        infos[str(content['id'])] = get_annotated_content_info(course_id, content, user, user_info)
+        infos[str(content['id'])] = get_annotated_content_info(course_id, content, user, user_info, user_permissions)
         for child in content.get('children', []):
             annotate(child)
     annotate(thread)
@@ -296,8 +338,10 @@ def get_annotated_content_infos(course_id, thread, user, user_info):
 
 
 def get_metadata_for_threads(course_id, threads, user, user_info):
+    user_permissions = get_user_permissions(user, course_id)
+
     def infogetter(thread):
-        return get_annotated_content_infos(course_id, thread, user, user_info)
+        return get_annotated_content_infos(course_id, thread, user, user_info, user_permissions)
 
     metadata = reduce(merge_dict, map(infogetter, threads), {})
     return metadata
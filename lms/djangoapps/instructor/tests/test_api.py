@@ -9,7 +9,7 @@ import datetime
 from urllib import quote
 from django.test import TestCase
 from nose.tools import raises
-from mock import Mock, patch
+from mock import ANY, Mock, patch
 from django.test.utils import override_settings
 from django.core.urlresolvers import reverse
 from django.http import HttpRequest, HttpResponse
@@ -129,6 +129,7 @@ class TestInstructorAPIDenyLevels(ModuleStoreTestCase, LoginEnrollmentTestCase):
             ('list_background_email_tasks', {}),
             ('list_grade_downloads', {}),
             ('calculate_grades_csv', {}),
+            ('calculate_answer_distribution_csv', {}),
         ]
         # Endpoints that only Instructors can access
         self.instructor_level_endpoints = [
@@ -835,6 +836,25 @@ class TestInstructorAPILevelsDataDump(ModuleStoreTestCase, LoginEnrollmentTestCa
         already_running_status = "A grade report generation task is already in progress. Check the 'Pending Instructor Tasks' table for the status of the task. When completed, the report will be available for download in the table below."
         self.assertIn(already_running_status, response.content)
 
+    def test_calculate_answer_distribution_csv_success(self):
+        url = reverse('calculate_answer_distribution_csv', kwargs={'course_id': self.course.id})
+
+        with patch('instructor_task.api.submit_calculate_answer_distribution_csv') as mock_submit:
+            mock_submit.return_value = True
+            response = self.client.get(url, {})
+        success_status = "Your answer distribution report is being generated! You can view the status of the generation task in the 'Pending Instructor Tasks' section."
+        self.assertIn(success_status, response.content)
+        mock_submit.assert_called_once_with(ANY, self.course.id)
+
+    def test_calculate_answer_distribution_csv_already_running(self):
+        url = reverse('calculate_answer_distribution_csv', kwargs={'course_id': self.course.id})
+
+        with patch('instructor_task.api.submit_calculate_answer_distribution_csv') as mock_submit:
+            mock_submit.side_effect = AlreadyRunningError()
+            response = self.client.get(url, {})
+        already_running_status = "An answer distribution report generation task is already in progress. Check the 'Pending Instructor Tasks' table for the status of the task. When completed, the report will be available for download in the table below."
+        self.assertIn(already_running_status, response.content)
+
     def test_get_students_features_csv(self):
         """
         Test that some minimum of information is formatted
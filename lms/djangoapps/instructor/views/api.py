@@ -787,6 +787,24 @@ def calculate_grades_csv(request, course_id):
         })
 
 
+@ensure_csrf_cookie
+@cache_control(no_cache=True, no_store=True, must_revalidate=True)
+@require_level('staff')
+def calculate_answer_distribution_csv(request, course_id):
+    """
+    AlreadyRunningError is raised if the course's answer distribution is already being calculated.
+    """
+    try:
+        instructor_task.api.submit_calculate_answer_distribution_csv(request, course_id)
+        success_status = _("Your answer distribution report is being generated! You can view the status of the generation task in the 'Pending Instructor Tasks' section.")
+        return JsonResponse({"status": success_status})
+    except AlreadyRunningError:
+        already_running_status = _("An answer distribution report generation task is already in progress. Check the 'Pending Instructor Tasks' table for the status of the task. When completed, the report will be available for download in the table below.")
+        return JsonResponse({
+            "status": already_running_status
+        })
+
+
 @ensure_csrf_cookie
 @cache_control(no_cache=True, no_store=True, must_revalidate=True)
 @require_level('staff')
@@ -310,6 +310,19 @@ class S3GradesStore(GradesStore):
 
         self.store(course_id, filename, output_buffer)
 
+    def rows_for(self, course_id, filename):
+        """
+        Return the rows (lists of strings) of a file that was written by
+        `store_rows()`.
+        """
+        data = self.key_for(course_id, filename).get_contents_as_string()
+        gzip_file = GzipFile(fileobj=StringIO(data), mode="rb")
+        return list(csv.reader(gzip_file))
+
+    def delete(self, course_id, filename):
+        """Delete the file named `filename` for the given `course_id`."""
+        self.key_for(course_id, filename).delete()
+
     def links_for(self, course_id):
         """
         For a given `course_id`, return a list of `(filename, url)` tuples. `url`
@@ -386,6 +399,18 @@ class LocalFSGradesStore(GradesStore):
         csv.writer(output_buffer).writerows(rows)
         self.store(course_id, filename, output_buffer)
 
+    def rows_for(self, course_id, filename):
+        """
+        Return the rows (lists of strings) of a file that was written by
+        `store_rows()`.
+        """
+        with open(self.path_to(course_id, filename), "rb") as f:
+            return list(csv.reader(f))
+
+    def delete(self, course_id, filename):
+        """Delete the file named `filename` for the given `course_id`."""
+        os.remove(self.path_to(course_id, filename))
+
     def links_for(self, course_id):
         """
         For a given `course_id`, return a list of `(filename, url)` tuples. `url`
@@ -31,6 +31,8 @@ from instructor_task.tasks_helper import (
     reset_attempts_module_state,
     delete_problem_module_state,
     push_grades_to_s3,
+    push_grade_report_chunk,
+    push_answer_distribution_to_s3,
 )
 from bulk_email.tasks import perform_delegate_email_batches
 
@@ -132,10 +134,51 @@ def send_bulk_course_email(entry_id, _xmodule_instance_args):
 
 
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
-def calculate_grades_csv(entry_id, xmodule_instance_args):
+def calculate_grades_csv(entry_id, _xmodule_instance_args):
     """
     Grade a course and push the results to an S3 bucket for download.
+
+    The grading itself is split across `calculate_grades_csv_chunk` subtasks.
     """
     action_name = ugettext_noop('graded')
-    task_fn = partial(push_grades_to_s3, xmodule_instance_args)
+    task_fn = partial(push_grades_to_s3, _create_grades_csv_chunk_subtask)
+    return run_main_task(entry_id, task_fn, action_name)
+
+
+def _create_grades_csv_chunk_subtask(entry_id, course_id, report_name, student_list, initial_subtask_status):
+    """Creates a subtask to grade the given list of students."""
+    return calculate_grades_csv_chunk.subtask(
+        (
+            entry_id,
+            course_id,
+            report_name,
+            student_list,
+            initial_subtask_status.to_dict(),
+        ),
+        task_id=initial_subtask_status.task_id,
+        routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+    )
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
+def calculate_grades_csv_chunk(entry_id, course_id, report_name, student_list, subtask_status_dict):
+    """
+    Grade a chunk of the students enrolled in a course, as part of a
+    `calculate_grades_csv` task.
+
+    `student_list` is a list of dicts, each with the 'pk' of a User to grade.
+    `subtask_status_dict` is the initial SubtaskStatus of this subtask, as a dict.
+    """
+    return push_grade_report_chunk(entry_id, course_id, report_name, student_list, subtask_status_dict)
+
+
+@task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=E1102
+def calculate_answer_distribution_csv(entry_id, xmodule_instance_args):
+    """
+    Compute the distribution of answers to a course's problems and push the
+    results to an S3 bucket for download.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('compiled')
+    task_fn = partial(push_answer_distribution_to_s3, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
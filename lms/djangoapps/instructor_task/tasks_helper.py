@@ -4,13 +4,16 @@ running state of a course.
 
 """
 import json
+import traceback
 import urllib
 from datetime import datetime
+from functools import partial
 from time import time
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction, reset_queries
 from dogapi import dog_stats_api
@@ -19,11 +22,18 @@ from pytz import UTC
 from xmodule.modulestore.django import modulestore
 from track.views import task_track
 
-from courseware.grades import iterate_grades_for
+from courseware.courses import get_course_by_id
+from courseware.grades import iterate_grades_for, answer_distributions
 from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_task.models import GradesStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+)
 from student.models import CourseEnrollment
 
 # define different loggers for use within tasks and on client side
@@ -470,105 +480,312 @@ def delete_problem_module_state(xmodule_instance_args, _module_descriptor, stude
     return UPDATE_STATUS_SUCCEEDED
 
 
-def push_grades_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+def push_grades_to_s3(create_subtask_fcn, entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `GradesStore`. Once created, the files can
     be accessed by instantiating another `GradesStore` (via
-    `GradesStore.from_config()`) and calling `link_for()` on it. Writes are
-    buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
-    that are visible in GradesStore will be complete ones.
-
-    As we start to add more CSV downloads, it will probably be worthwhile to
-    make a more general CSVDoc class instead of building out the rows like we
-    do here.
+    `GradesStore.from_config()`) and calling `link_for()` on it.
+
+    The enrolled students are split into chunks of at most
+    settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK, and each chunk is graded by a
+    subtask created with `create_subtask_fcn` (see `push_grade_report_chunk`).
+    Each subtask stores its own part of the report, and the last subtask to
+    finish merges the parts into the final CSV files. The parts are stored
+    apart from the course's reports (see `_grade_report_parts_dir`), so any
+    files that `links_for(course_id)` lists are complete ones.
+
+    `create_subtask_fcn` is called with the `entry_id`, the `course_id`, the
+    base name of the report files, the list of students for the subtask (as
+    dicts with a 'pk' key) and its initial SubtaskStatus.
     """
     start_time = datetime.now(UTC)
-    status_interval = 100
+    entry = InstructorTask.objects.get(pk=entry_id)
 
-    enrolled_students = CourseEnrollment.users_enrolled_in(course_id)
-    num_total = enrolled_students.count()
-    num_attempted = 0
-    num_succeeded = 0
-    num_failed = 0
-    curr_step = "Calculating Grades"
+    # If the parent task was requeued after its subtasks had been defined,
+    # don't queue a second set of subtasks.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning("Task %s has already been processed for course %s!", entry.task_id, course_id)
+        return json.loads(entry.task_output)
+
+    # Generate parts of the file name
+    timestamp_str = start_time.strftime("%Y-%m-%d-%H%M")
+    course_id_prefix = urllib.quote(course_id.replace("/", "_"))
+    report_name = "{}_grade_report_{}".format(course_id_prefix, timestamp_str)
+
+    # The subtasks are defined by walking the students in pk order
+    enrolled_students = CourseEnrollment.users_enrolled_in(course_id).order_by('pk')
+    if not enrolled_students.exists():
+        # There's nothing to split up, so just write out the empty report.
+        GradesStore.from_config().store_rows(course_id, "{}.csv".format(report_name), [])
+        return {
+            'action_name': action_name,
+            'attempted': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'total': 0,
+            'duration_ms': int((datetime.now(UTC) - start_time).total_seconds() * 1000),
+        }
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        partial(create_subtask_fcn, entry_id, course_id, report_name),
+        enrolled_students,
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_QUERY,
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK,
+    )
+
+
+def _grade_report_parts_dir(course_id):
+    """
+    Return the key that the parts of the grade reports of `course_id` are
+    stored under in the GradesStore, in place of the course_id, so that they
+    are kept apart from the finished reports that the instructor dashboard lists.
+    """
+    return "{}/grade_report_parts".format(course_id)
+
+
+def _grade_report_part_name(report_name, first_student_id, errors=False):
+    """
+    Return the filename of the part of report `report_name` that starts with
+    the student whose id is `first_student_id`. Part names sort in student order.
+    """
+    return "{}_part_{:010d}{}.csv".format(report_name, first_student_id, "_err" if errors else "")
+
+
+def push_grade_report_chunk(entry_id, course_id, report_name, student_list, subtask_status_dict):
+    """
+    Grade the students in `student_list` (dicts with a 'pk' key) and store
+    their rows of the grade report `report_name` as a separate part in the
+    `GradesStore`.
+
+    Progress is recorded in the parent InstructorTask, and whichever subtask
+    finishes last merges all of the parts into the final report and then sets
+    the parent task's final state (see `finish_grade_report`).
+
+    Returns the subtask's final status, as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    TASK_LOG.info("Preparing to grade %d students as subtask %s for instructor task %d",
+                  len(student_list), current_task_id, entry_id)
+
+    # Make sure that this subtask is known to the InstructorTask, and that it
+    # isn't already being (or hasn't already been) run by another worker.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    try:
+        students = User.objects.filter(pk__in=[item['pk'] for item in student_list]).order_by('pk')
+        header = None
+        rows = []
+        err_rows = []
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students):
+            if gradeset:
+                # We were able to successfully grade this student for this course.
+                subtask_status.increment(succeeded=1)
+                if not header:
+                    # Encode the header row in utf-8 encoding in case there are unicode characters
+                    header = [section['label'].encode('utf-8') for section in gradeset[u'section_breakdown']]
+                    rows.append(["id", "email", "username", "grade"] + header)
+
+                percents = {
+                    section['label']: section.get('percent', 0.0)
+                    for section in gradeset[u'section_breakdown']
+                    if 'label' in section
+                }
+
+                # Not everybody has the same gradable items. If the item is not
+                # found in the user's gradeset, just assume it's a 0. The aggregated
+                # grades for their sections and overall course will be calculated
+                # without regard for the item they didn't have access to, so it's
+                # possible for a student to have a 0.0 show up in their row but
+                # still have 100% for the course.
+                row_percents = [percents.get(label, 0.0) for label in header]
+                rows.append([student.id, student.email, student.username, gradeset['percent']] + row_percents)
+            else:
+                # An empty gradeset means we failed to grade a student.
+                subtask_status.increment(failed=1)
+                err_rows.append([student.id, student.username, err_msg])
+
+        grades_store = GradesStore.from_config()
+        first_student_id = student_list[0]['pk']
+        parts_dir = _grade_report_parts_dir(course_id)
+        grades_store.store_rows(parts_dir, _grade_report_part_name(report_name, first_student_id), rows)
+        if err_rows:
+            grades_store.store_rows(
+                parts_dir, _grade_report_part_name(report_name, first_student_id, errors=True), err_rows
+            )
+    except Exception:
+        # Since we don't know how far we got, count everyone not yet graded as failed.
+        TASK_LOG.exception("Grade report subtask %s for course %s: failed unexpectedly!", current_task_id, course_id)
+        subtask_status.increment(failed=len(student_list) - subtask_status.attempted, state=FAILURE)
+        if update_subtask_status(entry_id, current_task_id, subtask_status, finalize=False):
+            finish_grade_report(entry_id, course_id, report_name)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    if update_subtask_status(entry_id, current_task_id, subtask_status, finalize=False):
+        finish_grade_report(entry_id, course_id, report_name)
+
+    return subtask_status.to_dict()
+
+
+class GradeReportError(Exception):
+    """
+    Error signaling that a grade report couldn't be completed.
+    """
+    pass
+
+
+def _grade_report_part_names(grades_store, course_id, report_name):
+    """
+    Return the names of the stored parts of grade report `report_name`, in order.
+    """
+    part_prefix = "{}_part_".format(report_name)
+    return sorted(
+        filename for filename, _ in grades_store.links_for(_grade_report_parts_dir(course_id))
+        if filename.startswith(part_prefix)
+    )
+
+
+def finish_grade_report(entry_id, course_id, report_name):
+    """
+    Called by the subtask that completes the grade report task `entry_id`.
+    Merges the parts of the report and only then sets the parent
+    InstructorTask's final state: SUCCESS once the report has been stored, or
+    FAILURE if any subtask failed or the merge itself failed.  A failed report
+    is incomplete, so its parts are deleted rather than left behind.
+    """
+    try:
+        merge_grade_report_parts(entry_id, course_id, report_name)
+    except Exception as exception:  # pylint: disable=broad-except
+        TASK_LOG.exception("Grade report %s for instructor task %d failed", report_name, entry_id)
+        task_state = FAILURE
+        task_output = InstructorTask.create_output_for_failure(exception, traceback.format_exc())
+        try:
+            grades_store = GradesStore.from_config()
+            for part_name in _grade_report_part_names(grades_store, course_id, report_name):
+                grades_store.delete(_grade_report_parts_dir(course_id), part_name)
+        except Exception:  # pylint: disable=broad-except
+            TASK_LOG.exception("Couldn't delete the parts of grade report %s", report_name)
+    else:
+        task_state = SUCCESS
+        task_output = None
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    entry.task_state = task_state
+    if task_output is not None:
+        entry.task_output = task_output
+    entry.save_now()
+
+
+def merge_grade_report_parts(entry_id, course_id, report_name):
+    """
+    Combine the parts of grade report `report_name` stored by
+    `push_grade_report_chunk` into the final report (and error report, if any
+    student couldn't be graded), then delete the parts.
+
+    Raises GradeReportError if any subtask failed, since the report would be
+    incomplete.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    if subtask_dict['failed'] > 0:
+        raise GradeReportError("{} of {} grade report subtasks failed".format(
+            subtask_dict['failed'], subtask_dict['total']
+        ))
 
-    def update_task_progress():
+    grades_store = GradesStore.from_config()
+    parts_dir = _grade_report_parts_dir(course_id)
+    part_names = _grade_report_part_names(grades_store, course_id, report_name)
+    grade_part_names = [filename for filename in part_names if not filename.endswith("_err.csv")]
+    err_part_names = [filename for filename in part_names if filename.endswith("_err.csv")]
+
+    def merged_rows():
+        """
+        Yield the header and then the rows of every part, one part at a time.
+
+        Parts whose header doesn't match the first one have their columns
+        rearranged to match it, with a 0 for any missing section.
+        """
+        header = None
+        for part_name in grade_part_names:
+            part_rows = grades_store.rows_for(parts_dir, part_name)
+            if not part_rows:
+                continue
+            part_header = part_rows[0]
+            if header is None:
+                header = part_header
+                yield header
+            for row in part_rows[1:]:
+                if part_header == header:
+                    yield row
+                else:
+                    values = dict(zip(part_header, row))
+                    yield [values.get(column, 0.0) for column in header]
+
+    def merged_err_rows():
+        """Yield the header and then the rows of every error part."""
+        yield ["id", "username", "error_msg"]
+        for part_name in err_part_names:
+            for row in grades_store.rows_for(parts_dir, part_name):
+                yield row
+
+    grades_store.store_rows(course_id, "{}.csv".format(report_name), merged_rows())
+    if err_part_names:
+        grades_store.store_rows(course_id, "{}_err.csv".format(report_name), merged_err_rows())
+
+    for part_name in part_names:
+        grades_store.delete(parts_dir, part_name)
+
+
+def push_answer_distribution_to_s3(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+    """
+    For a given `course_id`, generate a CSV file with the distribution of the
+    answers given to every graded problem, and store it using a `GradesStore`
+    alongside the grade reports.
+    """
+    start_time = datetime.now(UTC)
+    course = get_course_by_id(course_id)
+
+    def update_task_progress(num_attempted, step):
         """Return a dict containing info about current task"""
-        current_time = datetime.now(UTC)
         progress = {
             'action_name': action_name,
             'attempted': num_attempted,
-            'succeeded': num_succeeded,
-            'failed': num_failed,
-            'total': num_total,
-            'duration_ms': int((current_time - start_time).total_seconds() * 1000),
-            'step': curr_step,
+            'succeeded': num_attempted,
+            'failed': 0,
+            'total': num_attempted,
+            'duration_ms': int((datetime.now(UTC) - start_time).total_seconds() * 1000),
+            'step': step,
         }
         _get_current_task().update_state(state=PROGRESS, meta=progress)
-
         return progress
 
-    # Loop over all our students and build our CSV lists in memory
-    header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
-        # Periodically update task status (this is a cache write)
-        if num_attempted % status_interval == 0:
-            update_task_progress()
-        num_attempted += 1
+    update_task_progress(0, "Calculating Answer Distribution")
+    distribution = answer_distributions(None, course)
 
-        if gradeset:
-            # We were able to successfully grade this student for this course.
-            num_succeeded += 1
-            if not header:
-                # Encode the header row in utf-8 encoding in case there are unicode characters
-                header = [section['label'].encode('utf-8') for section in gradeset[u'section_breakdown']]
-                rows.append(["id", "email", "username", "grade"] + header)
-
-            percents = {
-                section['label']: section.get('percent', 0.0)
-                for section in gradeset[u'section_breakdown']
-                if 'label' in section
-            }
-
-            # Not everybody has the same gradable items. If the item is not
-            # found in the user's gradeset, just assume it's a 0. The aggregated
-            # grades for their sections and overall course will be calculated
-            # without regard for the item they didn't have access to, so it's
-            # possible for a student to have a 0.0 show up in their row but
-            # still have 100% for the course.
-            row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append([student.id, student.email, student.username, gradeset['percent']] + row_percents)
-        else:
-            # An empty gradeset means we failed to grade a student.
-            num_failed += 1
-            err_rows.append([student.id, student.username, err_msg])
+    # The number of student answers that were counted
+    num_answers = 0
+    rows = [["url_name", "display name", "answer id", "answer", "count"]]
+    for (url_name, display_name, answer_id), answers in distribution.iteritems():
+        for answer, count in answers.iteritems():
+            num_answers += count
+            rows.append([
+                unicode(value).encode('utf-8')
+                for value in (url_name, display_name, answer_id, answer, count)
+            ])
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    curr_step = "Uploading CSVs"
-    update_task_progress()
+    update_task_progress(num_answers, "Uploading CSV")
 
-    # Generate parts of the file name
     timestamp_str = start_time.strftime("%Y-%m-%d-%H%M")
     course_id_prefix = urllib.quote(course_id.replace("/", "_"))
-
-    # Perform the actual upload
-    grades_store = GradesStore.from_config()
-    grades_store.store_rows(
+    GradesStore.from_config().store_rows(
         course_id,
-        "{}_grade_report_{}.csv".format(course_id_prefix, timestamp_str),
+        "{}_answer_distribution_{}.csv".format(course_id_prefix, timestamp_str),
         rows
     )
 
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        grades_store.store_rows(
-            course_id,
-            "{}_grade_report_{}_err.csv".format(course_id_prefix, timestamp_str),
-            err_rows
-        )
-
-    # One last update before we close out...
-    return update_task_progress()
+    return update_task_progress(num_answers, "Done")
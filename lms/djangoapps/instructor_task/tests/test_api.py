@@ -15,6 +15,7 @@ from instructor_task.api import (
     submit_reset_problem_attempts_for_all_students,
     submit_delete_problem_state_for_all_students,
     submit_bulk_course_email,
+    submit_calculate_answer_distribution_csv,
 )
 
 from instructor_task.api_helper import AlreadyRunningError
@@ -183,3 +184,16 @@ class InstructorTaskCourseSubmitTest(InstructorTaskCourseTestCase):
 
         with self.assertRaises(AlreadyRunningError):
             instructor_task = submit_bulk_course_email(self.create_task_request(self.instructor), self.course.id, email_id)
+
+    def test_submit_calculate_answer_distribution_csv(self):
+        request = self.create_task_request(self.instructor)
+        instructor_task = submit_calculate_answer_distribution_csv(request, self.course.id)
+        self.assertEquals(instructor_task.task_type, 'answer_distribution')
+
+        # test resubmitting, by updating the existing record:
+        instructor_task = InstructorTask.objects.get(id=instructor_task.id)  # pylint: disable=E1101
+        instructor_task.task_state = PROGRESS
+        instructor_task.save()
+
+        with self.assertRaises(AlreadyRunningError):
+            submit_calculate_answer_distribution_csv(request, self.course.id)
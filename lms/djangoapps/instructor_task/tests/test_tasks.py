@@ -6,23 +6,32 @@ paths actually work.
 
 """
 import json
+import shutil
+from tempfile import mkdtemp
 from uuid import uuid4
 
 from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
 
+from django.test.utils import override_settings
+
+from xmodule.modulestore import Location
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
+from courseware.grades import iterate_grades_for
 from courseware.models import StudentModule
 from courseware.tests.factories import StudentModuleFactory
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
 
-from instructor_task.models import InstructorTask
+from instructor_task.models import InstructorTask, GradesStore
 from instructor_task.tests.test_base import InstructorTaskModuleTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
-from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state
-from instructor_task.tasks_helper import UpdateProblemModuleStateError
+from instructor_task.tasks import (
+    rescore_problem, reset_problem_attempts, delete_problem_state, calculate_grades_csv,
+    calculate_answer_distribution_csv
+)
+from instructor_task.tasks_helper import UpdateProblemModuleStateError, _grade_report_parts_dir
 
 PROBLEM_URL_NAME = "test_urlname"
 
@@ -437,3 +446,137 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                 StudentModule.objects.get(course_id=self.course.id,
                                           student=student,
                                           module_state_key=self.problem_url)
+
+
+@override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=2)
+class TestGradeReportInstructorTask(TestInstructorTasks):
+    """Tests generating a grade report with subtasks."""
+
+    def setUp(self):
+        super(TestGradeReportInstructorTask, self).setUp()
+        self.grades_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.grades_dir)
+
+    def test_grade_report(self):
+        students = [self.create_student('student{}'.format(index)) for index in range(4)]
+        task_entry = self._create_input_entry(use_problem_url=False)
+        with override_settings(GRADES_DOWNLOAD={'STORAGE_TYPE': 'localfs', 'ROOT_PATH': self.grades_dir}):
+            self._run_task_with_mock_celery(calculate_grades_csv, task_entry.id, task_entry.task_id)
+            grades_store = GradesStore.from_config()
+            filenames = [filename for filename, _ in grades_store.links_for(self.course.id)]
+            # The parts have been merged into a single report
+            self.assertEquals(len(filenames), 1)
+            rows = grades_store.rows_for(self.course.id, filenames[0])
+
+        self.assertEquals(rows[0][:4], ["id", "email", "username", "grade"])
+        self.assertEquals(
+            [row[2] for row in rows[1:]],
+            [user.username for user in sorted([self.instructor] + students, key=lambda user: user.id)]
+        )
+
+        # Progress from each subtask is accumulated in the parent task
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, SUCCESS)
+        self.assertEquals(json.loads(entry.subtasks)['total'], 3)
+        status = json.loads(entry.task_output)
+        self.assertEquals(status['total'], 5)
+        self.assertEquals(status['succeeded'], 5)
+        self.assertEquals(status['failed'], 0)
+
+    def test_grade_report_enrollments_out_of_pk_order(self):
+        students = [UserFactory.create(username='late{}'.format(index)) for index in range(4)]
+        # Enroll the students with the highest pks first
+        for student in reversed(students):
+            CourseEnrollmentFactory.create(user=student, course_id=self.course.id)
+        task_entry = self._create_input_entry(use_problem_url=False)
+        with override_settings(GRADES_DOWNLOAD={'STORAGE_TYPE': 'localfs', 'ROOT_PATH': self.grades_dir}):
+            self._run_task_with_mock_celery(calculate_grades_csv, task_entry.id, task_entry.task_id)
+            grades_store = GradesStore.from_config()
+            filenames = [filename for filename, _ in grades_store.links_for(self.course.id)]
+            rows = grades_store.rows_for(self.course.id, filenames[0])
+
+        self.assertEquals(
+            [row[2] for row in rows[1:]],
+            [user.username for user in sorted([self.instructor] + students, key=lambda user: user.id)]
+        )
+        self.assertEquals(json.loads(InstructorTask.objects.get(id=task_entry.id).task_output)['succeeded'], 5)
+
+    def test_grade_report_parts_not_listed(self):
+        for index in range(4):
+            self.create_student('student{}'.format(index))
+        task_entry = self._create_input_entry(use_problem_url=False)
+        with override_settings(GRADES_DOWNLOAD={'STORAGE_TYPE': 'localfs', 'ROOT_PATH': self.grades_dir}):
+            # Stop before the parts are merged, as while the report is still running
+            with patch('instructor_task.tasks_helper.finish_grade_report'):
+                self._run_task_with_mock_celery(calculate_grades_csv, task_entry.id, task_entry.task_id)
+            grades_store = GradesStore.from_config()
+            self.assertEquals(grades_store.links_for(self.course.id), [])
+            self.assertEquals(len(grades_store.links_for(_grade_report_parts_dir(self.course.id))), 3)
+
+    def test_grade_report_with_failed_subtask(self):
+        for index in range(4):
+            self.create_student('student{}'.format(index))
+        task_entry = self._create_input_entry(use_problem_url=False)
+
+        def iterate_grades_failing_for_student0(course_id, students):
+            """Fail the subtask that grades student0."""
+            if any(student.username == 'student0' for student in students):
+                raise ValueError("Grading failed")
+            return iterate_grades_for(course_id, students)
+
+        with override_settings(GRADES_DOWNLOAD={'STORAGE_TYPE': 'localfs', 'ROOT_PATH': self.grades_dir}):
+            with patch('instructor_task.tasks_helper.iterate_grades_for', iterate_grades_failing_for_student0):
+                self._run_task_with_mock_celery(calculate_grades_csv, task_entry.id, task_entry.task_id)
+            # No report, and no parts left behind
+            self.assertEquals(GradesStore.from_config().links_for(self.course.id), [])
+
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, FAILURE)
+        self.assertEquals(json.loads(entry.subtasks)['failed'], 1)
+        self.assertEquals(json.loads(entry.task_output)['exception'], 'GradeReportError')
+
+
+class TestAnswerDistributionInstructorTask(TestInstructorTasks):
+    """Tests generating an answer distribution report."""
+
+    def setUp(self):
+        super(TestAnswerDistributionInstructorTask, self).setUp()
+        self.grades_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, self.grades_dir)
+
+    def test_answer_distribution(self):
+        self.define_option_problem(PROBLEM_URL_NAME)
+        answer_id = Location(self.problem_url).html_id() + '_2_1'
+        for index, answer in enumerate(['Option 1', 'Option 2', 'Option 1']):
+            student = self.create_student('answerer{}'.format(index))
+            StudentModuleFactory.create(
+                course_id=self.course.id,
+                module_state_key=self.problem_url,
+                student=student,
+                state=json.dumps({'attempts': 1, 'student_answers': {answer_id: answer}}),
+            )
+        task_entry = self._create_input_entry(use_problem_url=False)
+
+        with override_settings(GRADES_DOWNLOAD={'STORAGE_TYPE': 'localfs', 'ROOT_PATH': self.grades_dir}):
+            status = self._run_task_with_mock_celery(
+                calculate_answer_distribution_csv, task_entry.id, task_entry.task_id
+            )
+            grades_store = GradesStore.from_config()
+            filenames = [filename for filename, _ in grades_store.links_for(self.course.id)]
+            self.assertEquals(len(filenames), 1)
+            rows = grades_store.rows_for(self.course.id, filenames[0])
+
+        self.assertEquals(rows[0], ["url_name", "display name", "answer id", "answer", "count"])
+        self.assertEquals(
+            sorted(rows[1:]),
+            [
+                [PROBLEM_URL_NAME, PROBLEM_URL_NAME, answer_id, 'Option 1', '2'],
+                [PROBLEM_URL_NAME, PROBLEM_URL_NAME, answer_id, 'Option 2', '1'],
+            ]
+        )
+        # Every counted answer is reported as processed
+        self.assertEquals(status['attempted'], 3)
+        self.assertEquals(status['succeeded'], 3)
+        self.assertEquals(status['step'], 'Done')
+        steps = [call[1]['meta']['step'] for call in self.current_task.update_state.call_args_list]
+        self.assertEquals(steps, ["Calculating Answer Distribution", "Uploading CSV", "Done"])
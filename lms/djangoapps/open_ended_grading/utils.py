@@ -2,7 +2,7 @@ import json
 import logging
 
 from xmodule.modulestore import search
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, get_course_parent_index
 from xmodule.modulestore.exceptions import ItemNotFoundError, NoPathToItem
 from xmodule.open_ended_grading_classes.controller_query_service import ControllerQueryService
 from xmodule.open_ended_grading_classes.grading_service_module import GradingServiceError
@@ -59,7 +59,9 @@ def does_location_exist(course_id, location):
     location - string location
     """
     try:
-        search.path_to_location(modulestore(), course_id, location)
+        search.path_to_location(
+            modulestore(), course_id, location, parent_index=get_course_parent_index(course_id)
+        )
         return True
     except ItemNotFoundError:
         # If the problem cannot be found at the location received from the grading controller server,
@@ -150,11 +152,15 @@ class StudentProblemList(object):
             log.error("Called add_problem_data without a valid problem list" + self.course_error_ending)
             return valid_problems
 
+        parent_index = get_course_parent_index(self.course_id)
+
         # Iterate through all of our problems and add data.
         for problem in self.problem_list:
             try:
                 # Try to load the problem.
-                problem_url_parts = search.path_to_location(modulestore(), self.course_id, problem['location'])
+                problem_url_parts = search.path_to_location(
+                    modulestore(), self.course_id, problem['location'], parent_index=parent_index
+                )
             except (ItemNotFoundError, NoPathToItem):
                 # If the problem cannot be found at the location received from the grading controller server,
                 # it has been deleted by the course author. We should not display it.
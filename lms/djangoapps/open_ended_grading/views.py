@@ -14,7 +14,7 @@ from student.models import unique_id_for_user
 
 import open_ended_notifications
 
-from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.django import modulestore, get_course_parent_index
 from xmodule.modulestore import search
 from xmodule.modulestore.exceptions import ItemNotFoundError, NoPathToItem
 
@@ -96,12 +96,15 @@ def find_peer_grading_module(course):
                                     course_id=course.id)
     #See if any of the modules are centralized modules (ie display info from multiple problems)
     items = [i for i in items if not getattr(i, "use_for_single_location", True)]
+    parent_index = get_course_parent_index(course.id)
     # Loop through all potential peer grading modules, and find the first one that has a path to it.
     for item in items:
         item_location = item.location
         # Generate a url for the first module and redirect the user to it.
         try:
-            problem_url_parts = search.path_to_location(modulestore(), course.id, item_location)
+            problem_url_parts = search.path_to_location(
+                modulestore(), course.id, item_location, parent_index=parent_index
+            )
         except NoPathToItem:
             # In the case of nopathtoitem, the peer grading module that was found is in an invalid state, and
             # can no longer be accessed.  Log an informational message, but this will not impact normal behavior.
@@ -143,6 +143,8 @@ REGISTRATION_OPTIONAL_FIELDS = ENV_TOKENS.get('REGISTRATION_OPTIONAL_FIELDS', RE
 
 CMS_BASE = ENV_TOKENS.get('CMS_BASE', 'studio.edx.org')
 
+STATIC_CONTENT_CACHE_MAX_AGE = ENV_TOKENS.get('STATIC_CONTENT_CACHE_MAX_AGE', STATIC_CONTENT_CACHE_MAX_AGE)
+
 # allow for environments to specify what cookie name our login subsystem should use
 # this is to fix a bug regarding simultaneous logins between edx.org and edge.edx.org which can
 # happen with some browsers (e.g. Firefox)
@@ -333,5 +335,7 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 
 # Grades download
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = ENV_TOKENS.get('GRADES_DOWNLOAD_STUDENTS_PER_TASK', GRADES_DOWNLOAD_STUDENTS_PER_TASK)
+GRADES_DOWNLOAD_STUDENTS_PER_QUERY = ENV_TOKENS.get('GRADES_DOWNLOAD_STUDENTS_PER_QUERY', GRADES_DOWNLOAD_STUDENTS_PER_QUERY)
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
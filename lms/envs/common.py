@@ -158,6 +158,14 @@ FEATURES = {
     # Don't autoplay videos for students
     'AUTOPLAY_VIDEOS': False,
 
+    # Only render the active position of a sequence with the page, and fetch
+    # the others from the server when the student moves to them
+    'ENABLE_LAZY_SEQUENCE_RENDERING': False,
+
+    # List courses on the landing and "find courses" pages from stored course
+    # overviews, rather than by loading every course
+    'ENABLE_COURSE_OVERVIEWS': False,
+
     # Enable instructor dash to submit background tasks
     'ENABLE_INSTRUCTOR_BACKGROUND_TASKS': True,
 
@@ -200,6 +208,10 @@ FEATURES = {
     # Give course staff unrestricted access to grade downloads (if set to False,
     # only edX superusers can perform the downloads)
     'ALLOW_COURSE_STAFF_GRADE_DOWNLOADS': False,
+
+    # Store each student's computed gradeset and reuse it until one of their
+    # scores or the course content changes.
+    'ENABLE_PERSISTENT_GRADES': False,
 }
 
 # Used for A/B testing
@@ -390,6 +402,10 @@ MODULESTORE = {
 CONTENTSTORE = None
 DOC_STORE_CONFIG = None
 
+# The max-age, in seconds, of the Cache-Control header which contentserver sends w/ unlocked
+# course assets. None sends no Cache-Control header (locked assets are always private).
+STATIC_CONTENT_CACHE_MAX_AGE = None
+
 # Should we initialize the modulestores at startup, or wait until they are
 # needed?
 INIT_MODULESTORE_ON_STARTUP = True
@@ -400,6 +416,12 @@ INIT_MODULESTORE_ON_STARTUP = True
 # once the responsibility of XBlock creation is moved out of modulestore - cpennington
 XBLOCK_MIXINS = (LmsBlockMixin, InheritanceMixin, XModuleMixin)
 
+# Counts shared by all students of a module, such as poll votes, are spread
+# over this many rows each, so that concurrent updates don't queue up on one.
+SUMMARY_COUNTER_SHARDS = 8
+# How long, in seconds, the totals of those counts are cached for
+SUMMARY_COUNTER_CACHE_TIMEOUT = 5
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -413,6 +435,14 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Warm sandbox workers for capa code, per LMS process.  A size of 0 starts
+    # a fresh sandbox for every execution.
+    'worker_pool': {
+        'size': 0,
+        # How many jobs a worker runs before it's replaced.
+        'max_jobs': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1078,6 +1108,11 @@ REGISTRATION_OPTIONAL_FIELDS = set([
 ###################### Grade Downloads ######################
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Grade reports are computed by subtasks, each grading at most
+# GRADES_DOWNLOAD_STUDENTS_PER_TASK students.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = 100
+GRADES_DOWNLOAD_STUDENTS_PER_QUERY = 1000
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
@@ -11,3 +11,9 @@ if hasattr(settings, "COMMENTS_SERVICE_KEY"):
     API_KEY = settings.COMMENTS_SERVICE_KEY
 else:
     API_KEY = "PUT_YOUR_API_KEY_HERE"
+
+# the number of keep-alive connections to the comments service each worker process keeps open
+POOL_SIZE = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+
+# how many times to retry a request whose connection to the comments service failed
+MAX_RETRIES = getattr(settings, "COMMENTS_SERVICE_MAX_RETRIES", 0)
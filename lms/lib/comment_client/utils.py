@@ -2,13 +2,20 @@ from contextlib import contextmanager
 from dogapi import dog_stats_api
 import json
 import logging
+import os
 import requests
 import settings
+import sys
+import threading
 from time import time
 from uuid import uuid4
 
 log = logging.getLogger(__name__)
 
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -49,6 +56,62 @@ def request_timer(request_id, method, url):
     )
 
 
+def get_session():
+    """
+    Return this process's requests session for the comments service. Its connections are kept
+    alive and pooled so each request doesn't have to open a new one. The session is shared by
+    the process's threads but never across a fork.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.POOL_SIZE,
+                max_retries=settings.MAX_RETRIES,
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def perform_concurrently(*calls):
+    """
+    Call each of the given functions (which take no arguments) at the same time. Use this for
+    independent comments service requests so that the wait is that of the slowest rather than
+    the sum of them all. Returns a list of the calls' results in the same order. If any of
+    the calls raise an exception, this reraises the first one's.
+
+    The first call runs in the calling thread and the others in new threads. Only the first
+    may use the database as other threads would get their own connection (and transaction).
+    """
+    results = [None] * len(calls)
+    errors = [None] * len(calls)
+
+    def run(index):
+        try:
+            results[index] = calls[index]()
+        except Exception:  # pylint: disable=W0703
+            errors[index] = sys.exc_info()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(1, len(calls))]
+    for thread in threads:
+        thread.start()
+    # make the first call in this thread rather than waiting idle
+    if calls:
+        run(0)
+    for thread in threads:
+        thread.join()
+
+    for error in errors:
+        if error is not None:
+            raise error[0], error[1], error[2]
+    return results
+
+
 def perform_request(method, url, data_or_params=None, *args, **kwargs):
     if data_or_params is None:
         data_or_params = {}
@@ -63,7 +126,7 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
         data = None
         params = merge_dict(data_or_params, request_id_dict)
     with request_timer(request_id, method, url):
-        response = requests.request(
+        response = get_session().request(
             method,
             url,
             data=data,